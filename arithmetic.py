@@ -0,0 +1,105 @@
+from operator import add, sub, mul, truediv
+
+from number_helper import number_is_zero
+from operator_factory import Operator, ZERO_DIVISION_OPERATORS
+
+# the evaluation functions by operator code, see Operator.code
+OPERATIONS = (add, sub, mul, truediv, None)
+
+# the fixed-point evaluation functions (operand1, operand2, scale) by operator code
+FIXED_POINT_OPERATIONS = (
+    lambda operand1, operand2, scale: operand1 + operand2,
+    lambda operand1, operand2, scale: operand1 - operand2,
+    lambda operand1, operand2, scale: divide_round(operand1 * operand2, scale),
+    lambda operand1, operand2, scale: divide_round(operand1 * scale, operand2),
+    None,
+)
+
+# the fixed-point exactness checks (operand1, operand2, result, scale) by operator code
+FIXED_POINT_CHECKS = (
+    lambda operand1, operand2, result, scale: operand1 + operand2 == result,
+    lambda operand1, operand2, result, scale: operand1 - operand2 == result,
+    lambda operand1, operand2, result, scale: operand1 * operand2 == result * scale,
+    lambda operand1, operand2, result, scale: (
+        operand2 != 0 and operand1 * scale == operand2 * result
+    ),
+    None,
+)
+
+
+def calculate(operand1: float, operator: Operator, operand2: float) -> float:
+    """
+    Calculate `operand1 operator operand2`
+
+    The result is the same as evaluating the expression text with eval, but
+    without formatting and compiling it.
+
+    :raises ZeroDivisionError: Division by zero
+    :raises ValueError: Not supported operator
+    """
+    try:
+        operation = OPERATIONS[operator.code]
+    except AttributeError:
+        operation = None
+    if operation is None:
+        raise ValueError(f"Not supported operator: {operator}")
+    return operation(operand1, operand2)
+
+
+def calculate_fixed_point(
+    operand1: int, operator: Operator, operand2: int, scale: int
+) -> int:
+    """
+    Calculate `operand1 operator operand2` with fixed-point numbers
+
+    The numbers are integers scaled by `scale`, the result of the
+    multiplication and the division is rounded half away from zero to the
+    nearest scaled integer.
+
+    :raises ZeroDivisionError: Division by zero
+    :raises ValueError: Not supported operator
+    """
+    try:
+        operation = FIXED_POINT_OPERATIONS[operator.code]
+    except AttributeError:
+        operation = None
+    if operation is None:
+        raise ValueError(f"Not supported operator: {operator}")
+    return operation(operand1, operand2, scale)
+
+
+def is_exact_fixed_point(
+    operand1: int, operator: Operator, operand2: int, result: int, scale: int
+) -> bool:
+    """
+    Returns True if `operand1 operator operand2 = result` holds exactly with
+    fixed-point numbers (integers scaled by `scale`)
+    """
+    try:
+        check = FIXED_POINT_CHECKS[operator.code]
+    except AttributeError:
+        check = None
+    if check is None:
+        raise ValueError(f"Not supported operator: {operator}")
+    return check(operand1, operand2, result, scale)
+
+
+def divide_round(numerator: int, denominator: int) -> int:
+    """
+    Integer division rounded half away from zero
+
+    :raises ZeroDivisionError: Division by zero
+    """
+    if denominator < 0:
+        numerator, denominator = -numerator, -denominator
+    if numerator < 0:
+        return -((-numerator * 2 + denominator) // (denominator * 2))
+    return (numerator * 2 + denominator) // (denominator * 2)
+
+
+def is_zero_division(operator: Operator, operand2: float) -> bool:
+    return ZERO_DIVISION_OPERATORS[operator.code] and number_is_zero(operand2)
+
+
+def is_in_range(value: float, minimum: float, maximum: float) -> bool:
+    return minimum <= value <= maximum
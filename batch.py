@@ -0,0 +1,203 @@
+import argparse
+import contextlib
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, MutableMapping
+
+import main
+from crossmath import StopReason
+from expression_map import ExpressionMap
+from number_factory import NumberFactory
+from resolver.resolver_completion_memo import CompletionMemo
+from resolver.resolver_negative_cache import NegativeResultCache
+from resolver.resolver_solution_index import ExpressionSolutionIndex
+
+# per worker process state, see _init_worker
+_solution_index: ExpressionSolutionIndex | None = None
+_negative_cache: NegativeResultCache | None = None
+_completion_memo: CompletionMemo | None = None
+
+
+class BatchResult:
+    def __init__(
+        self,
+        index: int,
+        seed: int,
+        exp_map: ExpressionMap,
+        number_factory: NumberFactory,
+        elapsed: float,
+        stop_reason: StopReason | None = None,
+        completion_memo_updates: list | None = None,
+    ):
+        """
+        :param completion_memo_updates: The entries added to the completion
+                                        memo of the worker by this board, see
+                                        CompletionMemo.export_updates
+        """
+        self.index = index
+        self.seed = seed
+        self.exp_map = exp_map
+        self.number_factory = number_factory
+        self.elapsed = elapsed
+        self.stop_reason = stop_reason
+        self.completion_memo_updates = completion_memo_updates
+
+
+def derive_seed(base_seed: int, index: int) -> int:
+    """
+    Derive the seed of the board from the seed of the batch
+    """
+    return random.Random(f"{base_seed}:{index}").getrandbits(63)
+
+
+def _init_worker(negative_cache_storage: MutableMapping | None = None):
+    global _solution_index, _negative_cache, _completion_memo
+    _solution_index = main.create_solution_index()
+    _negative_cache = main.create_negative_cache(negative_cache_storage)
+    # warm start from COMPLETION_MEMO_PATH, the updates are merged and saved
+    # by iter_generate_batch
+    _completion_memo = main.create_completion_memo()
+    if _completion_memo is not None:
+        _completion_memo.track_updates()
+
+
+def generate_board(index: int, seed: int) -> BatchResult:
+    """
+    Generate one board, every random decision is derived from the seed
+    """
+    cross_math = main.create_cross_math(
+        random_generator=main.create_seeded_random_generator(seed),
+        solution_index=_solution_index,
+        negative_cache=_negative_cache,
+        completion_memo=_completion_memo,
+    )
+    start_time = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = cross_math.generate(main.create_generation_limits())
+    return BatchResult(
+        index=index,
+        seed=seed,
+        exp_map=cross_math.get_map(),
+        number_factory=cross_math.get_number_factory(),
+        elapsed=time.perf_counter() - start_time,
+        stop_reason=result.stop_reason,
+        completion_memo_updates=(
+            _completion_memo.export_updates() if _completion_memo is not None else None
+        ),
+    )
+
+
+def iter_generate_batch(
+    count: int,
+    jobs: int | None = None,
+    seed: int | None = None,
+    shared_negative_cache: bool = False,
+    window: int | None = None,
+) -> Iterator[BatchResult]:
+    """
+    Generate boards in a process pool
+
+    The negative result cache (NEGATIVE_CACHE=1) is kept per worker process
+    or shared by all of them and the completion memo (COMPLETION_MEMO=1) is
+    kept per worker process, with them the boards depend on the order of the
+    generation, not only on the seed. The completion memo updates of the
+    workers are merged and saved to COMPLETION_MEMO_PATH at the end of the
+    batch, so the next batch starts warm.
+
+    :param count: The number of boards
+    :param jobs: The number of worker processes (CPU count by default)
+    :param seed: The seed of the batch, random by default
+    :param shared_negative_cache: Share the negative result cache between the workers
+    :param window: The maximum number of the submitted and not yet yielded
+                   boards (twice the number of the workers by default)
+    :return: The boards in completion order
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(63)
+    if window is None:
+        window = 2 * (jobs or os.cpu_count() or 1)
+    if window < 1:
+        raise ValueError(f"Window must be greater than 0: {window}")
+    completion_memo = None
+    if main.COMPLETION_MEMO_PATH is not None:
+        completion_memo = main.create_completion_memo()
+    with contextlib.ExitStack() as stack:
+        if completion_memo is not None:
+            # also saved when the iteration is stopped early
+            stack.callback(completion_memo.save, main.COMPLETION_MEMO_PATH)
+        negative_cache_storage = None
+        if shared_negative_cache:
+            manager = stack.enter_context(multiprocessing.Manager())
+            negative_cache_storage = manager.dict()
+        executor = stack.enter_context(
+            ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                initargs=(negative_cache_storage,),
+            )
+        )
+        # a board is submitted for every yielded one, only the boards of the
+        # window are held at a time
+        indexes = iter(range(count))
+        pending = set()
+        while True:
+            for index in indexes:
+                pending.add(
+                    executor.submit(generate_board, index, derive_seed(seed, index))
+                )
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            while done:
+                result = done.pop().result()
+                if completion_memo is not None and result.completion_memo_updates:
+                    completion_memo.merge(result.completion_memo_updates)
+                    result.completion_memo_updates = None
+                yield result
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate cross math boards in batch")
+    parser.add_argument("--count", type=int, default=1, help="number of boards")
+    parser.add_argument(
+        "--jobs", type=int, default=os.cpu_count(), help="number of worker processes"
+    )
+    parser.add_argument("--seed", type=int, default=None, help="seed of the batch")
+    parser.add_argument(
+        "--shared-negative-cache",
+        action="store_true",
+        help="share the negative result cache (NEGATIVE_CACHE=1) between the workers",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    seed = args.seed
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(63)
+    print(f"Batch seed: {seed}", file=sys.stderr)
+    start_time = time.perf_counter()
+    for result in iter_generate_batch(
+        count=args.count,
+        jobs=args.jobs,
+        seed=seed,
+        shared_negative_cache=args.shared_negative_cache,
+    ):
+        print(
+            f"Board {result.index} (seed={result.seed}, {result.elapsed:.3f} sec, "
+            f"stopped: {result.stop_reason})"
+        )
+        result.exp_map.print(number_factory=result.number_factory)
+        print()
+    elapsed = time.perf_counter() - start_time
+    print(
+        f"{args.count} boards in {elapsed:.3f} sec ({args.count / elapsed:.2f} boards/sec)",
+        file=sys.stderr,
+    )
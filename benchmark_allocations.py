@@ -0,0 +1,101 @@
+import argparse
+import contextlib
+import sys
+import tracemalloc
+from typing import Iterator
+
+from expression import Expression, ExpressionValidator
+from expression_map import Direction, ExpressionItem
+from number_factory import NumberFactory
+from operator_factory import Operator, OperatorFactory
+from random_generator import RandomGenerator
+from resolver.expression_resolver import ExpressionResolver
+from resolver.resolver_exceptions import ExpressionResolverException
+
+# the patterns of the generation: an empty map, a crossing at each operand
+PATTERNS = [
+    [None, None, None, Operator.EQ, None],
+    [7.3, None, None, Operator.EQ, None],
+    [None, None, 4.5, Operator.EQ, None],
+    [None, None, None, Operator.EQ, -12.4],
+    [6.0, None, None, Operator.EQ, 18.0],
+]
+
+
+@contextlib.contextmanager
+def _count_expressions() -> Iterator[list[int]]:
+    """
+    Count the constructed Expression objects in the context, yields the
+    counter cell
+    """
+    counter = [0]
+    init = Expression.__init__
+
+    def counting_init(self):
+        counter[0] += 1
+        init(self)
+
+    Expression.__init__ = counting_init
+    try:
+        yield counter
+    finally:
+        Expression.__init__ = init
+
+
+def run(count: int, seed: int):
+    random_generator = RandomGenerator(seed)
+    number_factory = NumberFactory(
+        minimum=-20.0, maximum=20.0, step=0.1, random_generator=random_generator
+    )
+    resolver = ExpressionResolver(
+        validator=ExpressionValidator(minimum=-100, maximum=100),
+        number_factory=number_factory,
+        operator_factory=OperatorFactory(random_generator=random_generator),
+    )
+    patterns = [Expression.from_list(values) for values in PATTERNS]
+    resolved = 0
+    peak_total = 0
+    tracemalloc.start()
+    try:
+        with _count_expressions() as counter:
+            for i in range(count):
+                expression = patterns[i % len(patterns)]
+                baseline, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                try:
+                    resolver.resolve(expression)
+                except ExpressionResolverException:
+                    continue
+                finally:
+                    _, peak = tracemalloc.get_traced_memory()
+                    peak_total += peak - baseline
+                resolved += 1
+    finally:
+        tracemalloc.stop()
+    expression = patterns[0]
+    item = ExpressionItem(0, 0, Direction.HORIZONTAL, expression)
+    print(f"resolved expressions: {resolved} of {count}")
+    print(f"Expression objects per resolved expression: {counter[0] / resolved:.2f}")
+    print(f"transient peak bytes per resolve: {peak_total / count:.0f}")
+    print(
+        f"Expression size: {sys.getsizeof(expression) + _dict_size(expression)} bytes,"
+        f" ExpressionItem size: {sys.getsizeof(item) + _dict_size(item)} bytes"
+    )
+
+
+def _dict_size(instance) -> int:
+    return sys.getsizeof(instance.__dict__) if hasattr(instance, "__dict__") else 0
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Measure the allocations of the expression resolution"
+    )
+    parser.add_argument("--count", type=int, default=20000, help="number of resolves")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the randomness")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    run(count=args.count, seed=args.seed)
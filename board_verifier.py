@@ -0,0 +1,330 @@
+"""
+Board verification
+
+The expression runs of a board are found in one pass over the cell kinds
+of the rows and the columns, the well-shaped runs are validated at once
+(see ExpressionValidator.validate_many).
+"""
+
+import argparse
+import sys
+import time
+from enum import Enum
+from typing import Iterator, Tuple
+
+import numpy
+
+from expression import Expression, ExpressionValidator
+from expression_map import CellKind, Direction, ExpressionMap
+from expression_map_io import BoardCorpus, MappedBoard
+from operator_factory import Operator
+
+# the operator code of the cell kinds, -1 for the other kinds
+_KIND_CODES = numpy.full(len(CellKind), -1, dtype=numpy.int64)
+for _kind in CellKind:
+    if _kind >= CellKind.ADD and _kind != CellKind.EQ:
+        _KIND_CODES[_kind] = _kind.operator().code
+
+
+class BoardFailureReason(Enum):
+    # a run of two or more cells which is not an expression length, e.g.
+    # two slots run together
+    RUN_LENGTH = "run_length"
+    # a run of the expression length which is not number, operator, number,
+    # equal, number
+    SHAPE = "shape"
+    # the expression of the run is not valid (does not evaluate to its
+    # result, divides by zero or is out of the range)
+    INVALID = "invalid"
+    # a filled cell which is not part of any run
+    ORPHAN = "orphan"
+
+    def __str__(self):
+        return self.value
+
+
+class BoardFailure:
+    def __init__(
+        self,
+        reason: BoardFailureReason,
+        x: int,
+        y: int,
+        direction: Direction | None,
+        values: list,
+    ):
+        """
+        :param x: The x of the first cell of the run
+        :param y: The y of the first cell of the run
+        :param direction: The direction of the run (None for an orphan cell)
+        :param values: The cell values of the run
+        """
+        self.reason = reason
+        self.x = x
+        self.y = y
+        self.direction = direction
+        self.values = values
+
+    def __str__(self):
+        values = " ".join("" if value is None else str(value) for value in self.values)
+        where = f"{self.x}, {self.y}"
+        if self.direction is not None:
+            where += f" {self.direction}"
+        return f"{self.reason} at {where}: {values}"
+
+
+def verify_board(
+    board: ExpressionMap | MappedBoard, validator: ExpressionValidator
+) -> list[BoardFailure]:
+    """
+    Verify that every run of the board is a valid expression
+
+    :param board: The board, the failure coordinates are map coordinates
+    :param validator: The rules of the expressions, its scale must match the
+                      numbers of the board
+    :return: The failures, rows first
+    :raises ValueError: The scale of the board is not the one of the validator
+    """
+    if isinstance(board, MappedBoard):
+        if board.get_scale() != validator.get_scale():
+            raise ValueError(
+                f"Board scale {board.get_scale()} is not the validator scale "
+                f"{validator.get_scale()}"
+            )
+        kinds, numbers = board.get_kinds(), board.get_numbers()
+        min_x, min_y = 0, 0
+        width, height = board.width(), board.height()
+    else:
+        kinds, numbers = board.get_cell_arrays()
+        min_x, min_y, max_x, max_y = board.get_bounds()
+        width, height = max_x - min_x + 1, max_y - min_y + 1
+    # zero-copy views, the numbers keep their float64 or int64 type
+    return verify_cells(
+        numpy.frombuffer(kinds, dtype=numpy.uint8).reshape(height, width),
+        numpy.asarray(numbers).reshape(height, width),
+        validator,
+        origin=(min_x, min_y),
+    )
+
+
+def verify_cells(
+    kinds: numpy.ndarray,
+    numbers: numpy.ndarray,
+    validator: ExpressionValidator,
+    origin: Tuple[int, int] = (0, 0),
+) -> list[BoardFailure]:
+    """
+    Verify the cell arrays of a board
+
+    :param kinds: The (height, width) cell kinds, see CellKind
+    :param numbers: The (height, width) numbers
+    :param validator: The rules of the expressions
+    :param origin: The map coordinates of the first cell
+    """
+    height, width = kinds.shape
+    flat_kinds = kinds.reshape(-1)
+    flat_numbers = numbers.reshape(-1)
+    filled = kinds != CellKind.EMPTY
+    failures = []
+    # the runs of both directions: direction, first cell, cell stride, length
+    directions, firsts, strides, lengths = [], [], [], []
+    for direction in Direction.all():
+        if direction.is_horizontal():
+            lines, starts, run_lengths = _find_runs(filled)
+            first, stride = lines * width + starts, 1
+        else:
+            lines, starts, run_lengths = _find_runs(filled.T)
+            first, stride = starts * width + lines, width
+        runs = run_lengths >= 2
+        directions.append(numpy.full(numpy.count_nonzero(runs), direction.value))
+        firsts.append(first[runs])
+        strides.append(numpy.full(numpy.count_nonzero(runs), stride))
+        lengths.append(run_lengths[runs])
+    directions = numpy.concatenate(directions)
+    firsts = numpy.concatenate(firsts)
+    strides = numpy.concatenate(strides)
+    lengths = numpy.concatenate(lengths)
+    for i in numpy.flatnonzero(~numpy.isin(lengths, Expression.SUPPORTED_LENGTHS)):
+        failures.append(
+            _failure(
+                BoardFailureReason.RUN_LENGTH,
+                flat_kinds,
+                flat_numbers,
+                width,
+                directions[i],
+                firsts[i],
+                strides[i],
+                lengths[i],
+                origin,
+            )
+        )
+    for length in Expression.SUPPORTED_LENGTHS:
+        selected = numpy.flatnonzero(lengths == length)
+        cells = firsts[selected, None] + strides[selected, None] * numpy.arange(length)
+        for reason, i in _verify_runs(flat_kinds, flat_numbers, validator, cells):
+            i = selected[i]
+            failures.append(
+                _failure(
+                    reason,
+                    flat_kinds,
+                    flat_numbers,
+                    width,
+                    directions[i],
+                    firsts[i],
+                    strides[i],
+                    length,
+                    origin,
+                )
+            )
+    # a cell of a run has a filled neighbour
+    neighbours = numpy.zeros_like(filled)
+    neighbours[:, 1:] |= filled[:, :-1]
+    neighbours[:, :-1] |= filled[:, 1:]
+    neighbours[1:, :] |= filled[:-1, :]
+    neighbours[:-1, :] |= filled[1:, :]
+    for cell in numpy.flatnonzero(filled & ~neighbours):
+        y, x = divmod(int(cell), width)
+        failures.append(
+            BoardFailure(
+                BoardFailureReason.ORPHAN,
+                x + origin[0],
+                y + origin[1],
+                None,
+                [_decode(flat_kinds[cell], flat_numbers[cell])],
+            )
+        )
+    return failures
+
+
+def _find_runs(
+    filled: numpy.ndarray,
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Find the maximal runs of the filled cells of the rows
+
+    :return: The row, the start and the length of the runs
+    """
+    padded = numpy.zeros((filled.shape[0], filled.shape[1] + 2), dtype=numpy.int8)
+    padded[:, 1:-1] = filled
+    steps = numpy.diff(padded, axis=1)
+    # row-major order, the n-th start and the n-th end are the same run
+    lines, starts = numpy.nonzero(steps == 1)
+    _, ends = numpy.nonzero(steps == -1)
+    return lines, starts, ends - starts
+
+
+def _verify_runs(
+    kinds: numpy.ndarray,
+    numbers: numpy.ndarray,
+    validator: ExpressionValidator,
+    cells: numpy.ndarray,
+) -> Iterator[Tuple[BoardFailureReason, int]]:
+    """
+    Validate the runs of the expression length
+
+    :param cells: The flat cell indexes of the runs, a row per run
+    :return: The (reason, run) of the failed runs
+    """
+    if len(cells) == 0:
+        return
+    run_kinds = kinds[cells]
+    run_numbers = numbers[cells]
+    codes = _KIND_CODES[run_kinds[:, 1]]
+    shaped = (
+        (run_kinds[:, 0] == CellKind.NUMBER)
+        & (codes >= 0)
+        & (run_kinds[:, 2] == CellKind.NUMBER)
+        & (run_kinds[:, 3] == CellKind.EQ)
+        & (run_kinds[:, 4] == CellKind.NUMBER)
+    )
+    valid = validator.validate_many(
+        run_numbers[:, 0], codes, run_numbers[:, 2], run_numbers[:, 4]
+    )
+    for i in numpy.flatnonzero(~shaped):
+        yield BoardFailureReason.SHAPE, i
+    for i in numpy.flatnonzero(shaped & ~valid):
+        yield BoardFailureReason.INVALID, i
+
+
+def _failure(
+    reason: BoardFailureReason,
+    kinds: numpy.ndarray,
+    numbers: numpy.ndarray,
+    width: int,
+    direction: int,
+    first: int,
+    stride: int,
+    length: int,
+    origin: Tuple[int, int],
+) -> BoardFailure:
+    y, x = divmod(int(first), width)
+    cells = range(int(first), int(first) + int(stride) * int(length), int(stride))
+    return BoardFailure(
+        reason,
+        x + origin[0],
+        y + origin[1],
+        Direction(int(direction)),
+        [_decode(kinds[cell], numbers[cell]) for cell in cells],
+    )
+
+
+def _decode(kind: int, number) -> Operator | None | float | int:
+    kind = CellKind(int(kind))
+    if kind == CellKind.EMPTY:
+        return None
+    if kind == CellKind.NUMBER:
+        return number.item()
+    return kind.operator()
+
+
+def verify_corpus(
+    corpus: BoardCorpus, validator: ExpressionValidator
+) -> Iterator[Tuple[int, list[BoardFailure]]]:
+    """
+    Verify every board of a corpus
+
+    :return: The (index, failures) pairs of the boards with failures
+    """
+    for index, board in enumerate(corpus):
+        failures = verify_board(board, validator)
+        if failures:
+            yield index, failures
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Verify the boards of a binary board corpus, the validator "
+        "range is the one of the configuration (see main.py), the scale is the "
+        "one recorded by each board"
+    )
+    parser.add_argument("corpus", help="path of the board corpus")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    import main
+
+    args = _parse_args()
+    # scale -> validator
+    validators: dict[int | None, ExpressionValidator] = {}
+    start_time = time.perf_counter()
+    failed = 0
+    with BoardCorpus(args.corpus) as corpus:
+        for index, board in enumerate(corpus):
+            scale = board.get_scale()
+            if scale not in validators:
+                validators[scale] = ExpressionValidator(
+                    minimum=main.VALIDATOR_MIN, maximum=main.VALIDATOR_MAX, scale=scale
+                )
+            failures = verify_board(board, validators[scale])
+            if failures:
+                failed += 1
+            for failure in failures:
+                print(f"Board {index}: {failure}")
+        count = len(corpus)
+    elapsed = time.perf_counter() - start_time
+    print(
+        f"{failed} of {count} boards failed in {elapsed:.3f} sec "
+        f"({count / elapsed if elapsed > 0 else 0:.0f} boards/sec)",
+        file=sys.stderr,
+    )
+    sys.exit(1 if failed else 0)
@@ -1,5 +1,6 @@
-import random
-from typing import Tuple
+import time
+from enum import Enum
+from typing import Iterator, Tuple
 
 from expression import Expression
 from expression_map import (
@@ -11,7 +12,9 @@ from operator_factory import OperatorFactory
 from resolver.expression_resolver import (
     ExpressionResolver,
 )
+from metrics import GenerationMetrics
 from number_factory import NumberFactory
+from random_generator import RandomGenerator
 from resolver.resolver_exceptions import ExpressionResolverException
 
 
@@ -20,19 +23,112 @@ class DeadPoints:
     Dead points storage
     """
 
-    def __init__(self):
+    def __init__(self, metrics: GenerationMetrics | None = None):
         self._set: set[Tuple] = set()
+        self._metrics = metrics or GenerationMetrics(enabled=False)
+
+    def set_metrics(self, metrics: GenerationMetrics):
+        self._metrics = metrics
 
     def append(self, *args):
         self._set.add(tuple(args))
 
     def exists(self, *args) -> bool:
-        return tuple(args) in self._set
+        exists = tuple(args) in self._set
+        if exists and self._metrics.enabled:
+            self._metrics.count("dead_points.hits")
+        return exists
 
     def clear(self):
         self._set.clear()
 
 
+class StopReason(Enum):
+    COMPLETED = "completed"
+    TIME_BUDGET = "time_budget"
+    MAX_EXPRESSIONS = "max_expressions"
+    TARGET_FILL_RATIO = "target_fill_ratio"
+    NO_PROGRESS = "no_progress"
+
+    def __str__(self):
+        return self.value
+
+
+class GenerationLimits:
+    """
+    Stop conditions of the generation, None disables a condition
+    """
+
+    def __init__(
+        self,
+        time_budget: float | None = None,
+        max_expressions: int | None = None,
+        target_fill_ratio: float | None = None,
+        max_attempts_without_progress: int | None = None,
+    ):
+        """
+        :param time_budget: The wall-clock budget in seconds
+        :param max_expressions: The maximum number of the expressions of the map
+        :param target_fill_ratio: Stop when the fill ratio of the map reaches it
+        :param max_attempts_without_progress: Stop after this many slot attempts
+                                              without a better board
+        """
+        self.time_budget = time_budget
+        self.max_expressions = max_expressions
+        self.target_fill_ratio = target_fill_ratio
+        self.max_attempts_without_progress = max_attempts_without_progress
+
+    def is_bounded(self) -> bool:
+        """
+        Returns whether the generation stops on an unbounded map (by the
+        expression, time or attempt limit)
+        """
+        return (
+            self.time_budget is not None
+            or self.max_expressions is not None
+            or self.max_attempts_without_progress is not None
+        )
+
+    def check(
+        self, exp_map: ExpressionMap, elapsed: float, attempts_without_progress: int
+    ) -> StopReason | None:
+        """
+        :return: The reason to stop or None to go on
+        """
+        if self.time_budget is not None and elapsed >= self.time_budget:
+            return StopReason.TIME_BUDGET
+        if (
+            self.max_expressions is not None
+            and len(exp_map.get_items()) >= self.max_expressions
+        ):
+            return StopReason.MAX_EXPRESSIONS
+        if (
+            self.target_fill_ratio is not None
+            and exp_map.get_fill_ratio() >= self.target_fill_ratio
+        ):
+            return StopReason.TARGET_FILL_RATIO
+        if (
+            self.max_attempts_without_progress is not None
+            and attempts_without_progress >= self.max_attempts_without_progress
+        ):
+            return StopReason.NO_PROGRESS
+        return None
+
+
+class GenerationResult:
+    def __init__(
+        self,
+        exp_map: ExpressionMap,
+        stop_reason: StopReason,
+        elapsed: float,
+    ):
+        self.exp_map = exp_map
+        self.stop_reason = stop_reason
+        self.elapsed = elapsed
+        self.expression_count = len(exp_map.get_items())
+        self.fill_ratio = exp_map.get_fill_ratio()
+
+
 class CrossMath:
     def __init__(
         self,
@@ -40,102 +136,46 @@ class CrossMath:
         number_factory: NumberFactory,
         operator_factory: OperatorFactory,
         expression_resolver: ExpressionResolver,
+        random_generator: RandomGenerator | None = None,
+        metrics: GenerationMetrics | None = None,
     ):
+        """
+        :param metrics: Collect the metrics of the generation into it, it is
+                        shared with the map, the number factory and the resolver
+        """
         self._map = exp_map
         self._number_factory = number_factory
         self._expression_resolver = expression_resolver
         self._dead_points = DeadPoints()
         self._operator_factory = operator_factory
+        self._random_generator: RandomGenerator = random_generator or RandomGenerator()
+        self._metrics = metrics or GenerationMetrics(enabled=False)
+        self._limits = GenerationLimits()
+        self._start_time = 0.0
+        self._attempts_without_progress = 0
+        self._stop_reason: StopReason | None = None
+        if metrics is not None:
+            self._dead_points.set_metrics(metrics)
+            self._map.set_metrics(metrics)
+            self._number_factory.set_metrics(metrics)
+            self._expression_resolver.set_metrics(metrics)
 
-    def _find_potential_positions(self) -> list[Tuple[int, int]]:
-        for point in self._map.get_all_operand_points():
-            yield point
-
-    def _check_expression_frame(
-        self, x: int, y: int, direction: Direction, length: int
-    ) -> bool:
-        if direction.is_horizontal():
-            if x > 0 and self._map.get(x - 1, y) is not None:
-                return False
-            if (
-                x + length + 1 < self._map.width()
-                and self._map.get(x + length + 1, y) is not None
-            ):
-                return False
-        elif direction.is_vertical():
-            if y > 0 and self._map.get(x, y - 1) is not None:
-                return False
-            if (
-                y + length + 1 < self._map.height()
-                and self._map.get(x, y + length + 1) is not None
-            ):
-                return False
-        else:
-            raise ValueError(f"Not supported direction: {direction}")
-        return True
+    def get_metrics(self) -> GenerationMetrics:
+        return self._metrics
 
-    def _check_x_y_overflow(self, x: int, y: int, length: int) -> bool:
-        if x < 0:
-            return False
-        elif x + length >= self._map.width():
-            return False
-        elif y < 0:
-            return False
-        elif y + length >= self._map.height():
-            return False
-        return True
+    def _find_potential_slots(self) -> list[Tuple[int, int, Direction, int]]:
+        frontier = self._map.get_frontier()
+        if self._metrics.enabled:
+            self._metrics.count("crossmath.slots_scanned", len(frontier))
+        return [slot for slot in frontier if not self._dead_points.exists(*slot)]
 
-    def _find_potential_values(
-        self,
-        potential_positions: list[Tuple[int, int]],
-    ) -> list[Tuple[Direction, int, int, list]]:
-        max_expression_length = max(Expression.SUPPORTED_LENGTHS)
-        for next_position in potential_positions:
-            x, y = next_position
-            for direction in Direction.all():
-                for expression_offset in range(0, -max_expression_length - 1, -2):
-                    values_x_offset = (
-                        0 if direction.is_vertical() else expression_offset
-                    )
-                    values_y_offset = (
-                        0 if direction.is_horizontal() else expression_offset
-                    )
-                    values_x = x + values_x_offset
-                    values_y = y + values_y_offset
-                    for expression_length in Expression.SUPPORTED_LENGTHS:
-                        if self._dead_points.exists(
-                            values_x, values_y, direction, expression_length
-                        ):
-                            continue
-                        if not self._check_x_y_overflow(
-                            values_x, values_y, expression_length
-                        ):
-                            continue
-
-                        if not self._check_expression_frame(
-                            values_x, values_y, direction, expression_length
-                        ):
-                            continue
-
-                        values = self._map.get_values(
-                            values_x, values_y, direction, expression_length
-                        )
-                        if all([value is not None for value in values]):
-                            # already filled
-                            continue
-
-                        yield (
-                            direction,
-                            values_x,
-                            values_y,
-                            values,
-                        )
-
-    def _init_generate(self):
+    def _init_generate(self) -> ExpressionItem:
         expression = self._expression_resolver.resolve(Expression())
         if expression is None:
             raise Exception("No expression found")
-        direction = random.choice([Direction.HORIZONTAL, Direction.VERTICAL])
+        direction = self._random_generator.choice(
+            [Direction.HORIZONTAL, Direction.VERTICAL]
+        )
         item = ExpressionItem(
             2,
             2,
@@ -143,31 +183,99 @@ class CrossMath:
             expression,
         )
         self._map.put(item)
+        return item
+
+    def generate(self, limits: GenerationLimits | None = None) -> GenerationResult:
+        """
+        Generate the map
+
+        :param limits: The stop conditions, the generation goes on until no
+                       expression can be put by default
+        :return: The map with the reason of the stop
+        """
+        start_time = self._metrics.start_timer()
+        for _ in self.iter_generate(limits):
+            pass
+        self._metrics.stop_timer("crossmath.generate", start_time)
+        return GenerationResult(
+            self._map, self._stop_reason, time.perf_counter() - self._start_time
+        )
 
-    def generate(self):
+    def get_stop_reason(self) -> StopReason | None:
+        """
+        Returns why the latest generation stopped (None while it is running)
+        """
+        return self._stop_reason
+
+    def _start_limits(self, limits: GenerationLimits | None):
+        self._limits = limits or GenerationLimits()
+        self._start_time = time.perf_counter()
+        self._attempts_without_progress = 0
+        self._stop_reason = None
+
+    def _is_limit_reached(self) -> bool:
+        """
+        Check the limits and keep the stop reason if one is reached
+        """
+        stop_reason = self._limits.check(
+            self._map,
+            time.perf_counter() - self._start_time,
+            self._attempts_without_progress,
+        )
+        if stop_reason is None:
+            return False
+        self._stop_reason = stop_reason
+        return True
+
+    def iter_generate(
+        self, limits: GenerationLimits | None = None
+    ) -> Iterator[Tuple[ExpressionItem, int]]:
+        """
+        Generate the map step by step
+
+        Yields every placed expression item with the map version right after
+        it is put, the generation goes on when the next item is requested.
+        The limits are checked before every slot attempt, see get_stop_reason.
+
+        :param limits: The stop conditions
+        :return: The (expression item, map version) pairs
+        """
+        self._start_limits(limits)
         self._dead_points.clear()
-        self._init_generate()
+        yield self._init_generate(), self._map.get_version()
         latest_version = None
         while latest_version != self._map.get_version():
             latest_version = self._map.get_version()
-            potential_values = self._find_potential_values(
-                potential_positions=self._find_potential_positions(),
-            )
-            pvs = list(potential_values)
-            random.shuffle(pvs)
-            for desc in pvs:
-                direction, _x, _y, values = desc
+            slots = self._find_potential_slots()
+            self._random_generator.shuffle(slots)
+            for _x, _y, direction, length in slots:
+                if self._is_limit_reached():
+                    return
+                self._attempts_without_progress += 1
+                values = self._map.get_values(_x, _y, direction, length)
                 try:
                     expression = self._expression_resolver.resolve(
                         Expression.from_list(values)
                     )
                 except ExpressionResolverException as e:
                     print(e)
-                    self._dead_points.append(_x, _y, direction, len(values))
+                    self._dead_points.append(_x, _y, direction, length)
                     continue
                 expression_item = ExpressionItem(_x, _y, direction, expression)
                 self._map.put(expression_item)
+                self._attempts_without_progress = 0
+                yield expression_item, self._map.get_version()
                 break
+        self._stop_reason = StopReason.COMPLETED
+
+    def get_map(self) -> ExpressionMap:
+        return self._map
+
+    def get_number_factory(self) -> NumberFactory:
+        return self._number_factory
+
+    def get_operator_factory(self) -> OperatorFactory:
+        return self._operator_factory
 
     def print(self):
         self._map.print(number_factory=self._number_factory)
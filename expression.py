@@ -1,7 +1,22 @@
+import math
 from typing import TypeVar
 
-from number_helper import number_is_zero, number_is_equal
-from operator_factory import Operator
+from arithmetic import (
+    calculate,
+    is_exact_fixed_point,
+    is_in_range,
+    is_zero_division,
+)
+from number_helper import number_is_equal, is_number, number_precision_decimals
+from operator_factory import (
+    OP_ADD,
+    OP_DIV,
+    OP_EQ,
+    OP_MUL,
+    OP_SUB,
+    Operator,
+    is_operator_without_eq,
+)
 
 Exp = TypeVar("Exp", bound="Expression")
 Opr = TypeVar("Opr", bound="Operator")
@@ -11,11 +26,13 @@ class Expression:
 
     SUPPORTED_LENGTHS = (5,)
 
+    __slots__ = ("operator", "operand1", "operand2", "result", "_length")
+
     def __init__(self):
         self.operator: Operator | None = None
-        self.operand1: float | None = None
-        self.operand2: float | None = None
-        self.result: float | None = None
+        self.operand1: float | int | None = None
+        self.operand2: float | int | None = None
+        self.result: float | int | None = None
         self._length: int = 5
 
     def values(self) -> list:
@@ -39,25 +56,36 @@ class Expression:
                 f"Invalid values ({len(values)} not in {Expression.SUPPORTED_LENGTHS})"
             )
         expression = Expression()
-        if values[0] is not None and not isinstance(values[0], float):
+        if values[0] is not None and not is_number(values[0]):
             raise ValueError("Invalid values (operand1)")
         expression.operand1 = values[0]
-        if (
-            values[1] is not None
-            and values[1] not in Operator.get_operators_without_eq()
-        ):
+        if values[1] is not None and not is_operator_without_eq(values[1]):
             raise ValueError("Invalid values (operator)")
         expression.operator = values[1]
-        if values[2] is not None and not isinstance(values[2], float):
+        if values[2] is not None and not is_number(values[2]):
             raise ValueError("Invalid values (operand2)")
         expression.operand2 = values[2]
-        if values[3] is not None and values[3] != Operator.EQ:
+        if values[3] is not None and values[3] is not Operator.EQ:
             raise ValueError("Invalid values (EQ)")
-        if values[4] is not None and not isinstance(values[4], float):
+        if values[4] is not None and not is_number(values[4]):
             raise ValueError("Invalid values (result)")
         expression.result = values[4]
         return expression
 
+    @staticmethod
+    def create(
+        operand1: float | int | None,
+        operator: Operator | None,
+        operand2: float | int | None,
+        result: float | int | None,
+    ) -> Exp:
+        expression = Expression()
+        expression.operand1 = operand1
+        expression.operator = operator
+        expression.operand2 = operand2
+        expression.result = result
+        return expression
+
     def clone(self) -> Exp:
         expression = Expression()
         expression.operand1 = self.operand1
@@ -89,7 +117,7 @@ class Expression:
             and (
                 self.operator is None
                 or exp.operator is None
-                or self.operator == exp.operator
+                or self.operator is exp.operator
             )
             and (
                 self.operand2 is None
@@ -109,48 +137,151 @@ class ExpressionValidator:
         self,
         minimum: float = 0.0,
         maximum: float = 100.0,
+        scale: int | None = None,
     ):
-        self._minimum: float = minimum
-        self._maximum: float = maximum
+        """
+        :param scale: Validate fixed-point numbers (integers scaled by scale), see NumberFactory.get_scale
+        """
+        self._scale: int | None = scale
+        self._range: tuple[float, float] = (minimum, maximum)
+        if scale is None:
+            self._minimum: float = minimum
+            self._maximum: float = maximum
+        else:
+            self._minimum: int = math.ceil(minimum * scale)
+            self._maximum: int = math.floor(maximum * scale)
+            # the products of validate_many fit into int64 (in range numbers)
+            bound = max(abs(self._minimum), abs(self._maximum))
+            self._int64_exact = bound * max(bound, scale) < 2**63
+
+    def get_minimum(self) -> float:
+        return self._range[0]
+
+    def get_maximum(self) -> float:
+        return self._range[1]
+
+    def get_scale(self) -> int | None:
+        return self._scale
+
+    def get_array_dtype(self) -> str | type:
+        """
+        Returns the NumPy dtype of the number arrays of validate_many: float64,
+        int64 for fixed-point numbers or object (Python ints) when the range is
+        too large for int64
+        """
+        if self._scale is None:
+            return "float64"
+        return "int64" if self._int64_exact else object
 
     @staticmethod
     def _is_float(value) -> bool:
         return isinstance(value, float)
 
+    def _is_valid_number(self, value) -> bool:
+        if self._scale is None:
+            return self._is_float(value)
+        return type(value) is int
+
     def validate(self, expression: Expression) -> bool:
-        if (
-            expression.operator is None
-            or expression.operand1 is None
-            or expression.operand2 is None
-            or expression.result is None
-        ):
+        return self.validate_values(
+            expression.operand1,
+            expression.operator,
+            expression.operand2,
+            expression.result,
+        )
+
+    def validate_values(
+        self,
+        operand1: float | int | None,
+        operator: Operator | None,
+        operand2: float | int | None,
+        result: float | int | None,
+    ) -> bool:
+        """
+        Validate the parts of an expression without building it
+        """
+        if operator is None or operand1 is None or operand2 is None or result is None:
             return False
         if (
-            not self._is_float(expression.operand1)
-            or not self._is_float(expression.operand2)
-            or not self._is_float(expression.result)
+            not self._is_valid_number(operand1)
+            or not self._is_valid_number(operand2)
+            or not self._is_valid_number(result)
         ):
             return False
-        if not self._check_range(expression.operand1) or not self._is_float(
-            expression.operand1
-        ):
+        if not self._check_range(operand1):
             return False
-        if not self._check_range(expression.operand2) or not self._is_float(
-            expression.operand2
-        ):
+        if not self._check_range(operand2):
             return False
-        if not self._check_range(expression.result):
+        if not self._check_range(result):
             return False
-        if expression.operator == Operator.DIV and number_is_zero(expression.operand2):
+        if is_zero_division(operator, operand2):
             return False
-        return number_is_equal(
-            eval(f"{expression.operand1} {expression.operator} {expression.operand2}"),
-            expression.result,
-        )
+        if self._scale is not None:
+            return is_exact_fixed_point(
+                operand1, operator, operand2, result, self._scale
+            )
+        return number_is_equal(calculate(operand1, operator, operand2), result)
 
-    def _check_range(self, value: float) -> bool:
-        return self._minimum <= value <= self._maximum
+    def validate_many(self, operand1, operator_codes, operand2, result):
+        """
+        Validate many expressions at once with the rules of validate_values
 
+        The parts are NumPy arrays of the same length: the numbers (float64
+        or the int64 fixed-point numbers, a missing float number is NaN)
+        and the operator codes (see Operator.code, a missing operator is
+        negative). The fixed-point products are computed with Python ints
+        when the range is too large for int64, the numbers may be object
+        arrays of Python ints then (see get_array_dtype).
 
-def is_zero_division(operator: Operator, operand2: float) -> bool:
-    return operator == Operator.DIV and number_is_zero(operand2)
+        :return: The boolean mask of the valid expressions
+        """
+        import numpy
+
+        operand1 = numpy.asarray(operand1)
+        operand2 = numpy.asarray(operand2)
+        result = numpy.asarray(result)
+        codes = numpy.asarray(operator_codes)
+        valid = (codes >= 0) & (codes != OP_EQ)
+        for values in (operand1, operand2, result):
+            if values.dtype.kind not in ("f" if self._scale is None else "iO"):
+                return numpy.zeros(codes.shape, dtype=bool)
+            # NaN is out of every range
+            valid &= (self._minimum <= values) & (values <= self._maximum)
+        conditions = [codes == code for code in (OP_ADD, OP_SUB, OP_MUL, OP_DIV)]
+        if self._scale is not None:
+            scale = self._scale
+            valid &= ~(conditions[3] & (operand2 == 0))
+            if not self._int64_exact:
+                operand1, operand2, result = (
+                    values.astype(object) for values in (operand1, operand2, result)
+                )
+            exact = numpy.select(
+                conditions,
+                [
+                    operand1 + operand2 == result,
+                    operand1 - operand2 == result,
+                    operand1 * operand2 == result * scale,
+                    operand1 * scale == operand2 * result,
+                ],
+                False,
+            )
+            return valid & exact.astype(bool)
+        valid &= ~(
+            conditions[3] & (numpy.round(operand2, number_precision_decimals) == 0)
+        )
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            calculated = numpy.select(
+                conditions,
+                [
+                    operand1 + operand2,
+                    operand1 - operand2,
+                    operand1 * operand2,
+                    operand1 / operand2,
+                ],
+                numpy.nan,
+            )
+            exact = numpy.round(calculated - result, number_precision_decimals) == 0
+        return valid & exact
+
+    def _check_range(self, value: float) -> bool:
+        return is_in_range(value, self._minimum, self._maximum)
@@ -1,12 +1,13 @@
 import random
-from enum import Enum
+from array import array
+from enum import Enum, IntEnum
 from typing import Tuple
 
-import pandas
-
 from expression import Expression
+from metrics import GenerationMetrics
 from operator_factory import Operator
 from number_factory import NumberFactory
+from number_helper import is_number
 
 
 class Direction(Enum):
@@ -34,6 +35,8 @@ class Direction(Enum):
 
 
 class ExpressionItem:
+    __slots__ = ("_x", "_y", "_direction", "_expression")
+
     def __init__(self, x: int, y: int, direction: Direction, expression: Expression):
         self._x = x
         self._y = y
@@ -71,6 +74,33 @@ class ExpressionItem:
         return f"x: {self.x()}, y: {self.y()}, direction: {self.direction()}, length: {self.length()}, expression: {self.expression()}"
 
 
+class CellKind(IntEnum):
+    """
+    Compact code of a map cell
+    """
+
+    EMPTY = 0
+    NUMBER = 1
+    ADD = 2
+    SUB = 3
+    MUL = 4
+    DIV = 5
+    EQ = 6
+
+    @staticmethod
+    def of(value: Operator | None | float) -> "CellKind":
+        if value is None:
+            return CellKind.EMPTY
+        if isinstance(value, Operator):
+            return CellKind[value.name]
+        return CellKind.NUMBER
+
+    def operator(self) -> Operator:
+        if self < CellKind.ADD:
+            raise ValueError(f"Cell kind is not an operator: {self.name}")
+        return Operator[self.name]
+
+
 class ExpressionMapException(Exception):
     pass
 
@@ -83,11 +113,26 @@ class ExpressionMap:
     def __init__(self, width: int, height: int):
         self._width = width
         self._height = height
-        self._map: list[list[Operator | None | float]] = [
-            [None for _ in range(width)] for _ in range(height)
-        ]
+        self._init_storage()
         self._operands_point: list[Tuple[int, int]] = []
+        self._items: list[ExpressionItem] = []
+        # the cells newly written by each item, in put order (see rollback)
+        self._item_cells: list[list[Tuple[int, int]]] = []
+        self._checkpoints: list[Tuple[int, int, int]] = []
+        self._filled: int = 0
+        # open slot -> insertion serial, the dict is in serial order unless
+        # _frontier_ordered is False (see get_frontier)
+        self._frontier: dict[Tuple[int, int, Direction, int], int] = {}
+        self._frontier_serial: int = 0
+        self._frontier_ordered: bool = True
+        # the frontier changes while there is a checkpoint, in change order:
+        # (slot, None) for an opened slot, (slot, serial) for a closed one
+        self._frontier_journal: list[Tuple[tuple, int | None]] = []
         self._version: int = 0
+        self._metrics = GenerationMetrics(enabled=False)
+
+    def set_metrics(self, metrics: GenerationMetrics):
+        self._metrics = metrics
 
     def get_version(self) -> int:
         return self._version
@@ -95,76 +140,380 @@ class ExpressionMap:
     def get_all_operand_points(self) -> list[Tuple[int, int]]:
         return self._operands_point
 
+    def get_items(self) -> list[ExpressionItem]:
+        """
+        Returns the put expression items in put order
+        """
+        return self._items
+
+    def get_filled_count(self) -> int:
+        """
+        Returns the number of the non-empty cells
+        """
+        return self._filled
+
+    def get_fill_ratio(self) -> float:
+        min_x, min_y, max_x, max_y = self.get_bounds()
+        return self._filled / ((max_x - min_x + 1) * (max_y - min_y + 1))
+
+    def get_frontier(self) -> list[Tuple[int, int, Direction, int]]:
+        """
+        Returns the open expression slots
+
+        A slot is open if it contains an operand point, fits into the map,
+        its frame is free and it has at least one empty cell. The index is
+        kept up to date by put, only the slots around the written cells are
+        touched.
+
+        :return: The open slots as (x, y, direction, length) tuples
+        """
+        if not self._frontier_ordered:
+            # the slots reopened by rollback are back in their place
+            self._frontier = dict(
+                sorted(self._frontier.items(), key=lambda entry: entry[1])
+            )
+            self._frontier_ordered = True
+        return list(self._frontier)
+
+    def get_frontier_size(self) -> int:
+        """
+        Returns the number of the open slots, see get_frontier
+        """
+        return len(self._frontier)
+
+    def is_frontier_slot(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> bool:
+        """
+        Returns whether the slot is open, see get_frontier
+        """
+        return (x, y, direction, length) in self._frontier
+
     def width(self) -> int:
         return self._width
 
     def height(self) -> int:
         return self._height
 
+    def get_bounds(self) -> Tuple[int, int, int, int]:
+        """
+        Returns the (min x, min y, max x, max y) cell coordinates of the map
+        """
+        return 0, 0, self._width - 1, self._height - 1
+
     def get(self, x: int, y: int) -> Operator | None | float:
-        if x < 0 or y < 0 or x >= self._width or y >= self._height:
-            raise ValueError(f"Invalid x, y: {x}, {y}")
-        return self._map[y][x]
+        self._check_cell_bounds(x, y)
+        return self._read(x, y)
 
     def get_values(self, x: int, y: int, direction: Direction, length: int):
+        self._check_slot_bounds(x, y, direction, length)
+        return self._read_values(x, y, direction, length)
+
+    def _check_value(self, value: Operator | None | float | int):
+        """
+        Check that the storage can hold the value as it is
+
+        :raises ExpressionMapException: The value would be converted
+        """
+
+    def _check_cell_bounds(self, x: int, y: int):
         if x < 0 or y < 0 or x >= self._width or y >= self._height:
             raise ValueError(f"Invalid x, y: {x}, {y}")
+
+    def _check_slot_bounds(self, x: int, y: int, direction: Direction, length: int):
+        self._check_cell_bounds(x, y)
         if direction == Direction.HORIZONTAL:
             if x + length > self._width:
                 raise ValueError(f"Invalid x, length: {x}, {length}")
-            return self._map[y][x : x + length]
-        if y + length > self._height:
+        elif y + length > self._height:
             raise ValueError(f"Invalid y, length: {y}, {length}")
+
+    def _init_storage(self):
+        """
+        Allocate the cells (storage engine primitive)
+        """
+        self._map: list[list[Operator | None | float]] = [
+            [None for _ in range(self._width)] for _ in range(self._height)
+        ]
+
+    def _read(self, x: int, y: int) -> Operator | None | float:
+        """
+        Read a cell without bounds checking (storage engine primitive)
+        """
+        return self._map[y][x]
+
+    def _read_values(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> list[Operator | None | float]:
+        """
+        Read a slot without bounds checking (storage engine primitive)
+        """
+        if direction == Direction.HORIZONTAL:
+            return self._map[y][x : x + length]
         return [self._map[y + i][x] for i in range(length)]
 
+    def _write(self, x: int, y: int, value: Operator | None | float):
+        """
+        Write a cell without bounds checking (storage engine primitive)
+        """
+        self._map[y][x] = value
+
     def put(self, item: ExpressionItem):
+        start_time = self._metrics.start_timer()
         x = item.x()
         y = item.y()
-        if x < 0 or y < 0 or x >= self._width or y >= self._height:
-            raise ValueError(f"Invalid x, y: {x}, {y}")
         values = item.expression().values()
-        if item.is_horizontal():
-            if x + len(values) > self._width:
-                raise ValueError(f"Invalid x, length: {x}, {len(values)}")
-        elif item.is_vertical():
-            if y + len(values) > self._height:
-                raise ValueError(f"Invalid y, length: {y}, {len(values)}")
-        else:
+        if not item.is_horizontal() and not item.is_vertical():
             raise ValueError(f"Not supported direction: {item.direction()}")
+        self._check_slot_bounds(x, y, item.direction(), len(values))
         # pre checking values and destination
+        current_values = self._read_values(x, y, item.direction(), len(values))
         for i in range(len(values)):
-            if item.is_horizontal():
-                if self._map[y][x + i] is not None and self._map[y][x + i] != values[i]:
-                    raise ExpressionMapCellValueMissmatch(
-                        f"Illegal override x, y, values: {x}, {y}, {self._map[y][x + i]}, {values[i]}"
-                    )
-            else:
-                if self._map[y + i][x] is not None and self._map[y + i][x] != values[i]:
-                    raise ExpressionMapCellValueMissmatch(
-                        f"Illegal override x, y, values: {x}, {y}, {self._map[y + i][x]}, {values[i]}"
-                    )
+            if current_values[i] is not None and current_values[i] != values[i]:
+                raise ExpressionMapCellValueMissmatch(
+                    f"Illegal override x, y, values: {x}, {y}, {current_values[i]}, {values[i]}"
+                )
+            self._check_value(values[i])
+        written_cells: list[Tuple[int, int, bool]] = []
+        new_cells: list[Tuple[int, int]] = []
         for i in range(len(values)):
             target_x = x + i if item.is_horizontal() else x
             target_y = y + i if item.is_vertical() else y
-            if isinstance(values[i], float):
+            is_operand = is_number(values[i])
+            if is_operand:
                 self._operands_point.append((target_x, target_y))
-            self._map[target_y][target_x] = values[i]
+            if current_values[i] is None:
+                new_cells.append((target_x, target_y))
+            self._write(target_x, target_y, values[i])
+            written_cells.append((target_x, target_y, is_operand))
+        self._update_frontier(written_cells)
+        self._items.append(item)
+        self._item_cells.append(new_cells)
+        self._filled += len(new_cells)
+        self._version += 1
+        self._metrics.count("map.put")
+        self._metrics.stop_timer("map.put", start_time)
+
+    def checkpoint(self) -> int:
+        """
+        Save the state of the map to roll back to it later
+
+        Checkpoints are nested: rolling back to a checkpoint drops the
+        checkpoints taken after it.
+
+        :return: The checkpoint id, see rollback and release
+        """
+        self._checkpoints.append(
+            (len(self._items), len(self._operands_point), len(self._frontier_journal))
+        )
+        return len(self._checkpoints) - 1
+
+    def rollback(self, checkpoint: int):
+        """
+        Remove the items put since the checkpoint and release it
+
+        The cells written by the removed items are cleared, the version is
+        incremented as for any other change.
+        """
+        items_count, operands_count, journal_count = self._checkpoints[checkpoint]
+        del self._checkpoints[checkpoint:]
+        while len(self._items) > items_count:
+            self._items.pop()
+            cells = self._item_cells.pop()
+            for cell_x, cell_y in cells:
+                self._write(cell_x, cell_y, None)
+            self._filled -= len(cells)
+        del self._operands_point[operands_count:]
+        journal = self._frontier_journal
+        while len(journal) > journal_count:
+            slot, serial = journal.pop()
+            if serial is None:
+                del self._frontier[slot]
+            else:
+                self._frontier[slot] = serial
+                self._frontier_ordered = False
+        if not self._checkpoints:
+            journal.clear()
         self._version += 1
 
-    def print(self, number_factory: NumberFactory | None = None):
-        pandas.set_option("display.max_rows", None)
-        pandas.set_option("display.max_columns", None)
-        pandas.set_option("display.width", 2000)
-        map_clear = [["" for _ in range(self._width)] for _ in range(self._height)]
-        for y in range(self._height):
-            for x in range(self._width):
-                if self._map[y][x] is not None:
-                    map_clear[y][x] = self._map[y][x]
-                    is_numeric = isinstance(self._map[y][x], float)
+    def release(self, checkpoint: int):
+        """
+        Drop the checkpoint and the checkpoints taken after it, keep the items
+        """
+        del self._checkpoints[checkpoint:]
+        if not self._checkpoints:
+            self._frontier_journal.clear()
+
+    def _update_frontier(self, written_cells: list[Tuple[int, int, bool]]):
+        """
+        Update the open slots around the written cells
+
+        Cells are only cleared by rollback, which undoes the journaled
+        changes of the index, so a closed slot cannot be reopened by put:
+        only the slots whose cells or frame cover a written cell have to be
+        rechecked and only the slots crossing a new operand point can be
+        opened.
+
+        :param written_cells: The written (x, y, is_operand) cells
+        """
+        frontier = self._frontier
+        journal = self._frontier_journal if self._checkpoints else None
+        for cell_x, cell_y, _ in written_cells:
+            for direction in Direction.all():
+                for length in Expression.SUPPORTED_LENGTHS:
+                    # the slot covers the cell from x - 1 to x + length + 1
+                    for offset in range(-length - 1, 2):
+                        slot = (
+                            (cell_x + offset, cell_y, direction, length)
+                            if direction.is_horizontal()
+                            else (cell_x, cell_y + offset, direction, length)
+                        )
+                        if slot in frontier and not self._is_open_slot(*slot):
+                            if journal is not None:
+                                journal.append((slot, frontier[slot]))
+                            del frontier[slot]
+        max_expression_length = max(Expression.SUPPORTED_LENGTHS)
+        for cell_x, cell_y, is_operand in written_cells:
+            if not is_operand:
+                continue
+            for direction in Direction.all():
+                for offset in range(0, -max_expression_length - 1, -2):
+                    slot_x = cell_x if direction.is_vertical() else cell_x + offset
+                    slot_y = cell_y if direction.is_horizontal() else cell_y + offset
+                    for length in Expression.SUPPORTED_LENGTHS:
+                        slot = (slot_x, slot_y, direction, length)
+                        if slot not in frontier and self._is_open_slot(*slot):
+                            if journal is not None:
+                                journal.append((slot, None))
+                            frontier[slot] = self._frontier_serial
+                            self._frontier_serial += 1
+
+    def _is_open_slot(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> bool:
+        if not self._check_slot_overflow(x, y, length):
+            return False
+        if not self._check_slot_frame(x, y, direction, length):
+            return False
+        values = self.get_values(x, y, direction, length)
+        # already filled
+        return not all([value is not None for value in values])
+
+    def _check_slot_frame(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> bool:
+        if direction.is_horizontal():
+            if x > 0 and self.get(x - 1, y) is not None:
+                return False
+            if x + length + 1 < self._width and self.get(x + length + 1, y) is not None:
+                return False
+        elif direction.is_vertical():
+            if y > 0 and self.get(x, y - 1) is not None:
+                return False
+            if (
+                y + length + 1 < self._height
+                and self.get(x, y + length + 1) is not None
+            ):
+                return False
+        else:
+            raise ValueError(f"Not supported direction: {direction}")
+        return True
+
+    def _check_slot_overflow(self, x: int, y: int, length: int) -> bool:
+        if x < 0:
+            return False
+        elif x + length >= self._width:
+            return False
+        elif y < 0:
+            return False
+        elif y + length >= self._height:
+            return False
+        return True
+
+    def get_cell_arrays(self) -> Tuple[bytes, array]:
+        """
+        Returns the cells as row-major arrays
+
+        :return: The cell kinds (see CellKind) and the numbers (0 for the
+                 non-number cells), the numbers are float ("d") or fixed-point
+                 ("q") values
+        """
+        min_x, min_y, max_x, max_y = self.get_bounds()
+        width = max_x - min_x + 1
+        kinds = bytearray(width * (max_y - min_y + 1))
+        numbers = []
+        typecode = None
+        for y in range(max_y - min_y + 1):
+            for x, value in enumerate(
+                self._read_values(min_x, min_y + y, Direction.HORIZONTAL, width)
+            ):
+                kind = CellKind.of(value)
+                kinds[y * width + x] = kind
+                if kind != CellKind.NUMBER:
+                    numbers.append(0)
+                    continue
+                value_typecode = "q" if type(value) is int else "d"
+                if typecode is None:
+                    typecode = value_typecode
+                elif typecode != value_typecode:
+                    raise ExpressionMapException("Mixed float and fixed-point numbers")
+                numbers.append(value)
+        return bytes(kinds), array(typecode or "d", numbers)
+
+    def _format_cells(
+        self, number_factory: NumberFactory | None = None
+    ) -> list[list[Operator | float | int | str]]:
+        min_x, min_y, max_x, max_y = self.get_bounds()
+        map_clear = [
+            ["" for _ in range(max_x - min_x + 1)] for _ in range(max_y - min_y + 1)
+        ]
+        for y in range(max_y - min_y + 1):
+            for x in range(max_x - min_x + 1):
+                value = self._read(min_x + x, min_y + y)
+                if value is not None:
+                    map_clear[y][x] = value
+                    is_numeric = is_number(value)
                     if number_factory is not None and is_numeric:
-                        map_clear[y][x] = number_factory.format(self._map[y][x])
-        df = pandas.DataFrame(map_clear)
-        print(df)
-        pandas.reset_option("display.max_rows")
-        pandas.reset_option("display.max_columns")
-        pandas.reset_option("display.width")
+                        map_clear[y][x] = number_factory.format(value)
+        return map_clear
+
+    def render_text(self, number_factory: NumberFactory | None = None) -> str:
+        """
+        Render the map as a fixed-width text table with row and column indexes
+        """
+        min_x, min_y, max_x, max_y = self.get_bounds()
+        cells = [
+            [str(value) for value in row] for row in self._format_cells(number_factory)
+        ]
+        index_width = max(len(str(y)) for y in range(min_y, max_y + 1))
+        column_widths = [
+            max([len(str(min_x + x))] + [len(row[x]) for row in cells])
+            for x in range(max_x - min_x + 1)
+        ]
+        lines = [
+            " " * index_width
+            + "".join(
+                "  " + str(min_x + x).rjust(width)
+                for x, width in enumerate(column_widths)
+            )
+        ]
+        for y, row in enumerate(cells):
+            lines.append(
+                str(min_y + y).ljust(index_width)
+                + "".join(
+                    "  " + value.rjust(width)
+                    for value, width in zip(row, column_widths)
+                )
+            )
+        return "\n".join(lines)
+
+    def to_dataframe(self, number_factory: NumberFactory | None = None):
+        """
+        Returns the map as a pandas DataFrame (pandas is an optional dependency)
+        """
+        import pandas
+
+        return pandas.DataFrame(self._format_cells(number_factory))
+
+    def print(self, number_factory: NumberFactory | None = None):
+        print(self.render_text(number_factory))
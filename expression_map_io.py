@@ -0,0 +1,364 @@
+"""
+Board serialization
+
+Binary record (little-endian), records can be appended to a corpus file:
+    header: magic (4s), version (B), flags (B), decimals (H), width (I), height (I)
+    kinds:  width * height bytes (CellKind), zero padded to 8 bytes
+    values: width * height float64 (int64 scaled by 10**decimals with the
+            fixed-point flag)
+
+Version 1 records have no decimals (the field is reserved), only their
+float boards can be read.
+
+JSONL: a {"width", "height"} header line (with "decimals" for a fixed-point
+board), then one line per expression item.
+
+Both formats have no origin: the cells of a dumped map start at 0, 0 (an
+unbounded SparseExpressionMap with cells at other coordinates is rejected).
+"""
+
+import json
+import mmap
+import struct
+import sys
+from typing import IO, Iterator
+
+from expression import Expression
+from expression_map import (
+    CellKind,
+    Direction,
+    ExpressionItem,
+    ExpressionMap,
+    ExpressionMapException,
+)
+from operator_factory import Operator
+
+BINARY_MAGIC = b"CXMB"
+BINARY_VERSION = 2
+BINARY_FLAG_FIXED_POINT = 1
+_BINARY_HEADER = struct.Struct("<4sBBHII")
+
+
+class ExpressionMapFormatException(ExpressionMapException):
+    pass
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+def dump_binary(exp_map: ExpressionMap, f: IO[bytes], scale: int | None = None):
+    """
+    Write the map as a binary record
+
+    :param scale: The scale of the fixed-point numbers of the map, required
+                  for a fixed-point map (see NumberFactory.get_scale)
+    :raises ValueError: The cells of the map do not start at 0, 0
+    """
+    _check_origin(exp_map)
+    kinds, numbers = exp_map.get_cell_arrays()
+    fixed_point = numbers.typecode == "q"
+    decimals = _get_decimals(fixed_point, scale)
+    f.write(
+        _BINARY_HEADER.pack(
+            BINARY_MAGIC,
+            BINARY_VERSION,
+            BINARY_FLAG_FIXED_POINT if fixed_point else 0,
+            decimals or 0,
+            exp_map.width(),
+            exp_map.height(),
+        )
+    )
+    f.write(kinds)
+    f.write(bytes(_padding(len(kinds))))
+    if sys.byteorder != "little":
+        numbers.byteswap()
+    f.write(numbers.tobytes())
+
+
+def _check_origin(exp_map: ExpressionMap):
+    min_x, min_y, _, _ = exp_map.get_bounds()
+    if (min_x, min_y) != (0, 0):
+        raise ValueError(f"Map cells must start at 0, 0: {min_x}, {min_y}")
+
+
+def _get_decimals(fixed_point: bool, scale: int | None) -> int | None:
+    """
+    Returns the decimals of the scale of a map (None for a float map)
+
+    :raises ValueError: The scale does not match the numbers of the map
+    """
+    if not fixed_point:
+        if scale is not None:
+            raise ValueError(f"Scale of a float map: {scale}")
+        return None
+    if scale is None:
+        raise ValueError("The scale of a fixed-point map is required")
+    decimals = len(str(scale)) - 1
+    if scale != 10**decimals:
+        raise ValueError(f"Scale must be a power of 10: {scale}")
+    return decimals
+
+
+class MappedBoard:
+    """
+    Read-only board view over a binary record, the cells are decoded on access
+    """
+
+    def __init__(self, buffer, offset: int = 0):
+        if sys.byteorder != "little":
+            raise ExpressionMapFormatException("Mapped boards need a little-endian host")
+        magic, version, flags, decimals, width, height = _BINARY_HEADER.unpack_from(
+            buffer, offset
+        )
+        if magic != BINARY_MAGIC:
+            raise ExpressionMapFormatException(f"Invalid magic at {offset}: {magic}")
+        if version not in (1, BINARY_VERSION):
+            raise ExpressionMapFormatException(f"Not supported version: {version}")
+        self._width = width
+        self._height = height
+        self._fixed_point = bool(flags & BINARY_FLAG_FIXED_POINT)
+        if self._fixed_point and version == 1:
+            raise ExpressionMapFormatException(
+                f"Fixed-point board without decimals at {offset} (version 1)"
+            )
+        self._scale = 10**decimals if self._fixed_point else None
+        cells = width * height
+        kinds_offset = offset + _BINARY_HEADER.size
+        numbers_offset = kinds_offset + cells + _padding(cells)
+        view = memoryview(buffer)
+        self._kinds = view[kinds_offset : kinds_offset + cells]
+        self._numbers = view[numbers_offset : numbers_offset + cells * 8].cast(
+            "q" if self._fixed_point else "d"
+        )
+        self._size = numbers_offset + cells * 8 - offset
+
+    @staticmethod
+    def record_size(buffer, offset: int = 0) -> int:
+        """
+        Returns the size of the binary record at the offset (reads the header only)
+        """
+        magic, _, _, _, width, height = _BINARY_HEADER.unpack_from(buffer, offset)
+        if magic != BINARY_MAGIC:
+            raise ExpressionMapFormatException(f"Invalid magic at {offset}: {magic}")
+        cells = width * height
+        return _BINARY_HEADER.size + cells + _padding(cells) + cells * 8
+
+    def width(self) -> int:
+        return self._width
+
+    def height(self) -> int:
+        return self._height
+
+    def is_fixed_point(self) -> bool:
+        return self._fixed_point
+
+    def get_scale(self) -> int | None:
+        """
+        Returns the scale of the fixed-point numbers (None for a float board)
+        """
+        return self._scale
+
+    def get_kinds(self) -> memoryview:
+        """
+        Returns the row-major cell kinds (see CellKind)
+        """
+        return self._kinds
+
+    def get_numbers(self) -> memoryview:
+        """
+        Returns the row-major numbers (0 for the non-number cells)
+        """
+        return self._numbers
+
+    def get(self, x: int, y: int) -> Operator | None | float | int:
+        if x < 0 or y < 0 or x >= self._width or y >= self._height:
+            raise ValueError(f"Invalid x, y: {x}, {y}")
+        index = y * self._width + x
+        kind = CellKind(self._kinds[index])
+        if kind == CellKind.EMPTY:
+            return None
+        if kind == CellKind.NUMBER:
+            return self._numbers[index]
+        return kind.operator()
+
+    def to_expression_map(self, exp_map: ExpressionMap | None = None) -> ExpressionMap:
+        """
+        Rebuild the expression map from the cells
+
+        :param exp_map: The empty target map (ExpressionMap by default)
+        """
+        if exp_map is None:
+            exp_map = ExpressionMap(width=self._width, height=self._height)
+        for item in self.iter_items():
+            exp_map.put(item)
+        return exp_map
+
+    def iter_items(self) -> Iterator[ExpressionItem]:
+        """
+        Returns the expression items: the maximal horizontal and vertical
+        runs of cells shaped as an expression
+        """
+        for direction in Direction.all():
+            lines = self._height if direction.is_horizontal() else self._width
+            line_length = self._width if direction.is_horizontal() else self._height
+            for line in range(lines):
+                start = 0
+                while start < line_length:
+                    end = start
+                    while end < line_length and self._get_on_line(
+                        direction, line, end
+                    ) is not None:
+                        end += 1
+                    if end - start in Expression.SUPPORTED_LENGTHS:
+                        item = self._to_item(direction, line, start, end - start)
+                        if item is not None:
+                            yield item
+                    start = end + 1
+
+    def _get_on_line(self, direction: Direction, line: int, position: int):
+        if direction.is_horizontal():
+            return self.get(position, line)
+        return self.get(line, position)
+
+    def _to_item(
+        self, direction: Direction, line: int, start: int, length: int
+    ) -> ExpressionItem | None:
+        values = [
+            self._get_on_line(direction, line, position)
+            for position in range(start, start + length)
+        ]
+        try:
+            expression = Expression.from_list(values)
+        except ValueError:
+            return None
+        if direction.is_horizontal():
+            return ExpressionItem(start, line, direction, expression)
+        return ExpressionItem(line, start, direction, expression)
+
+
+def load_binary(data: bytes) -> ExpressionMap:
+    """
+    Load the expression map of a binary record
+    """
+    return MappedBoard(data).to_expression_map()
+
+
+class BoardCorpus:
+    """
+    Memory-mapped corpus of binary board records
+
+    Opening the corpus reads the record headers only, the boards are
+    decoded lazily on access.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            self._mmap = b""
+        self._offsets: list[int] = []
+        offset = 0
+        while offset < len(self._mmap):
+            self._offsets.append(offset)
+            offset += MappedBoard.record_size(self._mmap, offset)
+        if offset != len(self._mmap):
+            raise ExpressionMapFormatException(f"Truncated board corpus: {path}")
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> MappedBoard:
+        return MappedBoard(self._mmap, self._offsets[index])
+
+    def __iter__(self) -> Iterator[MappedBoard]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            try:
+                self._mmap.close()
+            except BufferError:
+                # boards are still alive, the mapping is released with them
+                pass
+        self._file.close()
+
+    def __enter__(self) -> "BoardCorpus":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def dump_jsonl(exp_map: ExpressionMap, f: IO[str], scale: int | None = None):
+    """
+    Write the map as JSON lines: a header line and a line per expression item
+
+    :param scale: The scale of the fixed-point numbers of the map, required
+                  for a fixed-point map (see NumberFactory.get_scale)
+    :raises ValueError: The cells of the map do not start at 0, 0
+    """
+    _check_origin(exp_map)
+    items = exp_map.get_items()
+    fixed_point = any(
+        type(value) is int for item in items for value in item.expression().values()
+    )
+    header = {"width": exp_map.width(), "height": exp_map.height()}
+    decimals = _get_decimals(fixed_point, scale)
+    if decimals is not None:
+        header["decimals"] = decimals
+    f.write(json.dumps(header))
+    f.write("\n")
+    for item in items:
+        f.write(
+            json.dumps(
+                {
+                    "x": item.x(),
+                    "y": item.y(),
+                    "direction": item.direction().name,
+                    "values": [
+                        str(value) if isinstance(value, Operator) else value
+                        for value in item.expression().values()
+                    ],
+                }
+            )
+        )
+        f.write("\n")
+
+
+def load_jsonl(
+    f: IO[str], exp_map: ExpressionMap | None = None, scale: int | None = None
+) -> ExpressionMap:
+    """
+    Load a map written by dump_jsonl
+
+    :param exp_map: The empty target map (ExpressionMap by default)
+    :param scale: The scale of the fixed-point numbers of the board, None for
+                  a float board
+    :raises ExpressionMapFormatException: The board has another scale
+    """
+    header = json.loads(f.readline())
+    board_scale = 10 ** header["decimals"] if "decimals" in header else None
+    if board_scale != scale:
+        raise ExpressionMapFormatException(
+            f"Board scale {board_scale} is not the expected scale {scale}"
+        )
+    if exp_map is None:
+        exp_map = ExpressionMap(width=header["width"], height=header["height"])
+    for line in f:
+        if not line.strip():
+            continue
+        exp_map.put(_item_from_json(json.loads(line)))
+    return exp_map
+
+
+def _item_from_json(data: dict) -> ExpressionItem:
+    values = [
+        Operator(value) if isinstance(value, str) else value for value in data["values"]
+    ]
+    return ExpressionItem(
+        data["x"], data["y"], Direction[data["direction"]], Expression.from_list(values)
+    )
@@ -0,0 +1,119 @@
+from array import array
+from typing import Tuple
+
+import numpy
+
+from expression_map import ExpressionMap, ExpressionMapException, CellKind, Direction
+from operator_factory import Operator
+
+_CELL_KIND_OPERATORS: list[Operator | None] = [
+    kind.operator() if kind >= CellKind.ADD else None for kind in CellKind
+]
+
+
+class NumpyExpressionMap(ExpressionMap):
+    """
+    Expression map backed by two NumPy arrays
+
+    The cell kinds are stored in an int8 array (see CellKind) and the numbers
+    in a float64 array (int64 for fixed-point numbers), the row and column
+    slices are handed out as views. A map holds either float or fixed-point
+    numbers, the other kind is rejected instead of converted.
+    """
+
+    def __init__(self, width: int, height: int, fixed_point: bool = False):
+        self._fixed_point = fixed_point
+        super().__init__(width, height)
+
+    def _init_storage(self):
+        self._kinds = numpy.zeros((self._height, self._width), dtype=numpy.int8)
+        self._values = numpy.zeros(
+            (self._height, self._width),
+            dtype=numpy.int64 if self._fixed_point else numpy.float64,
+        )
+
+    def _read(self, x: int, y: int) -> Operator | None | float | int:
+        kind = self._kinds[y, x]
+        if kind == CellKind.NUMBER:
+            return self._values[y, x].item()
+        return _CELL_KIND_OPERATORS[kind]
+
+    def _read_values(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> list[Operator | None | float | int]:
+        kinds = self._slice(self._kinds, x, y, direction, length).tolist()
+        values = self._slice(self._values, x, y, direction, length).tolist()
+        return [
+            values[i] if kind == CellKind.NUMBER else _CELL_KIND_OPERATORS[kind]
+            for i, kind in enumerate(kinds)
+        ]
+
+    def _check_value(self, value: Operator | None | float | int):
+        if isinstance(value, (Operator, type(None))):
+            return
+        if self._fixed_point and type(value) is not int:
+            raise ExpressionMapException(f"Not a fixed-point number: {value!r}")
+        if not self._fixed_point and type(value) is not float:
+            raise ExpressionMapException(f"Not a float number: {value!r}")
+
+    def _write(self, x: int, y: int, value: Operator | None | float | int):
+        kind = CellKind.of(value)
+        self._kinds[y, x] = kind
+        self._values[y, x] = value if kind == CellKind.NUMBER else 0
+
+    @staticmethod
+    def _slice(
+        array: numpy.ndarray, x: int, y: int, direction: Direction, length: int
+    ) -> numpy.ndarray:
+        if direction == Direction.HORIZONTAL:
+            return array[y, x : x + length]
+        return array[y : y + length, x]
+
+    def get_kinds_view(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> numpy.ndarray:
+        """
+        Returns a read-only view of the cell kinds of the slot
+        """
+        self._check_slot_bounds(x, y, direction, length)
+        view = self._slice(self._kinds, x, y, direction, length)
+        view.flags.writeable = False
+        return view
+
+    def get_numbers_view(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> numpy.ndarray:
+        """
+        Returns a read-only view of the numbers of the slot (0.0 for non-number cells)
+        """
+        self._check_slot_bounds(x, y, direction, length)
+        view = self._slice(self._values, x, y, direction, length)
+        view.flags.writeable = False
+        return view
+
+    def get_cell_arrays(self) -> Tuple[bytes, array]:
+        numbers = array("q" if self._fixed_point else "d")
+        numbers.frombytes(self._values.tobytes())
+        return self._kinds.tobytes(), numbers
+
+    def _is_open_slot(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> bool:
+        if not self._check_slot_overflow(x, y, length):
+            return False
+        if direction.is_horizontal():
+            line = self._kinds[y]
+            start = x
+        elif direction.is_vertical():
+            line = self._kinds[:, x]
+            start = y
+        else:
+            raise ValueError(f"Not supported direction: {direction}")
+        # frame
+        if start > 0 and line[start - 1] != CellKind.EMPTY:
+            return False
+        end = start + length + 1
+        if end < line.shape[0] and line[end] != CellKind.EMPTY:
+            return False
+        # already filled
+        return not line[start : start + length].all()
@@ -0,0 +1,120 @@
+from typing import Tuple
+
+from expression_map import ExpressionMap, Direction
+from operator_factory import Operator
+
+
+class SparseExpressionMap(ExpressionMap):
+    """
+    Expression map backed by a dict of fixed-size square tiles
+
+    Only the touched tiles are allocated, so the memory follows the placed
+    expressions instead of the area. Without width and height the map is
+    unbounded: the coordinates can be negative, the map grows in every
+    direction and its size is the bounding box of the cells ever written
+    (see get_bounds, a rollback does not shrink it). The generation of an
+    unbounded map only stops at a limit, see GenerationLimits.
+    """
+
+    def __init__(
+        self,
+        width: int | None = None,
+        height: int | None = None,
+        tile_size: int = 64,
+    ):
+        """
+        :param width: The width of the map, unbounded if width or height is None
+        :param height: The height of the map
+        :param tile_size: The width and height of a tile
+        """
+        if tile_size < 1:
+            raise ValueError(f"Tile size must be greater than 0: {tile_size}")
+        self._tile_size = tile_size
+        self._bounded = width is not None and height is not None
+        # bounding box of the written cells of the unbounded map
+        self._bounds: Tuple[int, int, int, int] | None = None
+        super().__init__(width or 0, height or 0)
+
+    def _init_storage(self):
+        self._tiles: dict[Tuple[int, int], list[Operator | None | float | int]] = {}
+
+    def get_tile_count(self) -> int:
+        return len(self._tiles)
+
+    def is_bounded(self) -> bool:
+        return self._bounded
+
+    def get_bounds(self) -> Tuple[int, int, int, int]:
+        if self._bounded:
+            return super().get_bounds()
+        return self._bounds or (0, 0, 0, 0)
+
+    def width(self) -> int:
+        min_x, _, max_x, _ = self.get_bounds()
+        return max_x - min_x + 1
+
+    def height(self) -> int:
+        _, min_y, _, max_y = self.get_bounds()
+        return max_y - min_y + 1
+
+    def _read(self, x: int, y: int) -> Operator | None | float | int:
+        tile_x, cell_x = divmod(x, self._tile_size)
+        tile_y, cell_y = divmod(y, self._tile_size)
+        tile = self._tiles.get((tile_x, tile_y))
+        if tile is None:
+            return None
+        return tile[cell_y * self._tile_size + cell_x]
+
+    def _read_values(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> list[Operator | None | float | int]:
+        if direction == Direction.HORIZONTAL:
+            return [self._read(x + i, y) for i in range(length)]
+        return [self._read(x, y + i) for i in range(length)]
+
+    def _write(self, x: int, y: int, value: Operator | None | float | int):
+        tile_x, cell_x = divmod(x, self._tile_size)
+        tile_y, cell_y = divmod(y, self._tile_size)
+        tile = self._tiles.get((tile_x, tile_y))
+        if tile is None:
+            if value is None:
+                return
+            tile = self._tiles[(tile_x, tile_y)] = [None] * (
+                self._tile_size * self._tile_size
+            )
+        tile[cell_y * self._tile_size + cell_x] = value
+        if value is not None and not self._bounded:
+            if self._bounds is None:
+                self._bounds = (x, y, x, y)
+            else:
+                min_x, min_y, max_x, max_y = self._bounds
+                self._bounds = (
+                    min(min_x, x),
+                    min(min_y, y),
+                    max(max_x, x),
+                    max(max_y, y),
+                )
+
+    def _check_cell_bounds(self, x: int, y: int):
+        if self._bounded:
+            super()._check_cell_bounds(x, y)
+
+    def _check_slot_bounds(self, x: int, y: int, direction: Direction, length: int):
+        if self._bounded:
+            super()._check_slot_bounds(x, y, direction, length)
+
+    def _check_slot_frame(
+        self, x: int, y: int, direction: Direction, length: int
+    ) -> bool:
+        if self._bounded:
+            return super()._check_slot_frame(x, y, direction, length)
+        if direction.is_horizontal():
+            return (
+                self._read(x - 1, y) is None and self._read(x + length + 1, y) is None
+            )
+        return self._read(x, y - 1) is None and self._read(x, y + length + 1) is None
+
+    def _check_slot_overflow(self, x: int, y: int, length: int) -> bool:
+        if self._bounded:
+            return super()._check_slot_overflow(x, y, length)
+        return True
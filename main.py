@@ -1,42 +1,293 @@
+import json
 import os
+from typing import MutableMapping
 
-from crossmath import CrossMath
+from crossmath import CrossMath, GenerationLimits
+from crossmath_backtracking import BacktrackingCrossMath
 from expression_map import ExpressionMap
+from metrics import GenerationMetrics
 from number_factory import NumberFactory
-from operator_factory import OperatorFactory
+from operator_factory import Operator, OperatorFactory, OperatorPolicy
+from random_generator import (
+    RandomGenerator,
+    RecordingRandomGenerator,
+    ReplayRandomGenerator,
+)
 from resolver.expression_resolver import ExpressionResolver, ExpressionValidator
+from resolver.resolver_completion_memo import CompletionMemo
+from resolver.resolver_negative_cache import NegativeResultCache
+from resolver.resolver_solution_index import ExpressionSolutionIndex
 
 WIDTH = int(os.environ.get("WIDTH", 50))
 HEIGHT = int(os.environ.get("HEIGHT", 50))
+EXPRESSION_MAP_ENGINE = os.environ.get("EXPRESSION_MAP_ENGINE", "list")
+# greedy or backtracking (experimental, see BacktrackingCrossMath)
+GENERATOR = os.environ.get("GENERATOR", "greedy")
 NUMBER_FACTORY_MIN = float(os.environ.get("NUMBER_FACTORY_MIN", -20.0))
 NUMBER_FACTORY_MAX = float(os.environ.get("NUMBER_FACTORY_MAX", 20.0))
 NUMBER_FACTORY_STEP = float(os.environ.get("NUMBER_FACTORY_STEP", 0.1))
+NUMBER_FACTORY_FIXED_POINT = os.environ.get("NUMBER_FACTORY_FIXED_POINT", "0") == "1"
+NUMBER_FACTORY_DEBUG = os.environ.get("NUMBER_FACTORY_DEBUG", "0") == "1"
+SOLUTION_INDEX = os.environ.get("SOLUTION_INDEX", "0") == "1"
+RANDOM_SEED = os.environ.get("RANDOM_SEED")
+RANDOM_GENERATOR_ENGINE = os.environ.get("RANDOM_GENERATOR_ENGINE", "python")
+RANDOM_RECORD = os.environ.get("RANDOM_RECORD")
+RANDOM_REPLAY = os.environ.get("RANDOM_REPLAY")
+METRICS = os.environ.get("METRICS", "0") == "1"
+NEGATIVE_CACHE = os.environ.get("NEGATIVE_CACHE", "0") == "1"
+GENERATION_TIME_BUDGET = os.environ.get("GENERATION_TIME_BUDGET")
+GENERATION_MAX_EXPRESSIONS = os.environ.get("GENERATION_MAX_EXPRESSIONS")
+GENERATION_TARGET_FILL_RATIO = os.environ.get("GENERATION_TARGET_FILL_RATIO")
+GENERATION_MAX_ATTEMPTS_WITHOUT_PROGRESS = os.environ.get(
+    "GENERATION_MAX_ATTEMPTS_WITHOUT_PROGRESS"
+)
+COMPLETION_MEMO = os.environ.get("COMPLETION_MEMO", "0") == "1"
+COMPLETION_MEMO_PATH = os.environ.get("COMPLETION_MEMO_PATH")
+COMPLETION_MEMO_CAPACITY = int(os.environ.get("COMPLETION_MEMO_CAPACITY", 4096))
+COMPLETION_MEMO_POOL_SIZE = int(os.environ.get("COMPLETION_MEMO_POOL_SIZE", 16))
+# off (1) by default: validating the candidates of an attempt at once costs
+# more than the few scalar tries it replaces, see ResultIsNoneResolver
+RESOLVER_CANDIDATES_PER_ATTEMPT = int(
+    os.environ.get("RESOLVER_CANDIDATES_PER_ATTEMPT", 1)
+)
+OPERATOR_POLICY = os.environ.get("OPERATOR_POLICY", "uniform")
+# the weights of the fixed policy, e.g. "+:2,-:2,*:1,/:1"
+OPERATOR_WEIGHTS = os.environ.get("OPERATOR_WEIGHTS")
+VALIDATOR_MIN = -100
+VALIDATOR_MAX = 100
 
-if __name__ == "__main__":
-    exp_map = ExpressionMap(width=WIDTH, height=HEIGHT)
-    number_factory = NumberFactory(
+
+def create_expression_map() -> ExpressionMap:
+    if EXPRESSION_MAP_ENGINE == "numpy":
+        from expression_map_numpy import NumpyExpressionMap
+
+        return NumpyExpressionMap(
+            width=WIDTH, height=HEIGHT, fixed_point=NUMBER_FACTORY_FIXED_POINT
+        )
+    elif EXPRESSION_MAP_ENGINE == "sparse":
+        from expression_map_sparse import SparseExpressionMap
+
+        # 0 means unbounded, see the GENERATION_* limits
+        if not (WIDTH and HEIGHT) and not create_generation_limits().is_bounded():
+            raise ValueError(
+                "An unbounded sparse map needs GENERATION_MAX_EXPRESSIONS, "
+                "GENERATION_TIME_BUDGET or GENERATION_MAX_ATTEMPTS_WITHOUT_PROGRESS"
+            )
+        return SparseExpressionMap(width=WIDTH or None, height=HEIGHT or None)
+    elif EXPRESSION_MAP_ENGINE == "list":
+        return ExpressionMap(width=WIDTH, height=HEIGHT)
+    raise ValueError(f"Not supported expression map engine: {EXPRESSION_MAP_ENGINE}")
+
+
+def create_number_factory(
+    random_generator: RandomGenerator | None = None,
+) -> NumberFactory:
+    return NumberFactory(
         minimum=NUMBER_FACTORY_MIN,
         maximum=NUMBER_FACTORY_MAX,
         step=NUMBER_FACTORY_STEP,
+        random_generator=random_generator,
+        fixed_point=NUMBER_FACTORY_FIXED_POINT,
+        debug=NUMBER_FACTORY_DEBUG,
+    )
+
+
+def create_operator_factory(
+    random_generator: RandomGenerator | None = None,
+) -> OperatorFactory:
+    weights = None
+    if OPERATOR_WEIGHTS is not None:
+        weights = {}
+        for weight in OPERATOR_WEIGHTS.split(","):
+            symbol, value = weight.split(":")
+            weights[Operator(symbol.strip())] = int(value)
+    return OperatorFactory(
+        random_generator=random_generator,
+        policy=OperatorPolicy(OPERATOR_POLICY),
+        weights=weights,
+    )
+
+
+def create_validator(number_factory: NumberFactory) -> ExpressionValidator:
+    return ExpressionValidator(
+        minimum=VALIDATOR_MIN, maximum=VALIDATOR_MAX, scale=number_factory.get_scale()
+    )
+
+
+def create_solution_index() -> ExpressionSolutionIndex | None:
+    """
+    Returns the solution index of the configuration (None if it is disabled)
+    """
+    if not SOLUTION_INDEX:
+        return None
+    number_factory = create_number_factory()
+    return ExpressionSolutionIndex(
+        number_factory=number_factory,
+        validator=create_validator(number_factory),
+        operators=OperatorFactory().operators(),
+    )
+
+
+def create_negative_cache(
+    storage: MutableMapping | None = None,
+) -> NegativeResultCache | None:
+    """
+    Returns a negative result cache of the configuration (None if it is disabled)
+
+    :param storage: The shared storage of the cache, see NegativeResultCache
+    """
+    if not NEGATIVE_CACHE:
+        return None
+    # a shared storage is read through a local copy, see NegativeResultCache
+    return NegativeResultCache(storage=storage, local_cache=storage is not None)
+
+
+def create_completion_memo() -> CompletionMemo | None:
+    """
+    Returns the completion memo of the configuration (None if it is disabled),
+    it is loaded from COMPLETION_MEMO_PATH if the file exists
+    """
+    if not COMPLETION_MEMO:
+        return None
+    if COMPLETION_MEMO_PATH is not None and os.path.exists(COMPLETION_MEMO_PATH):
+        return CompletionMemo.load(
+            COMPLETION_MEMO_PATH,
+            capacity=COMPLETION_MEMO_CAPACITY,
+            pool_size=COMPLETION_MEMO_POOL_SIZE,
+        )
+    return CompletionMemo(
+        capacity=COMPLETION_MEMO_CAPACITY, pool_size=COMPLETION_MEMO_POOL_SIZE
+    )
+
+
+def create_generation_limits() -> GenerationLimits:
+    """
+    Returns the stop conditions of the configuration
+    """
+    return GenerationLimits(
+        time_budget=(
+            float(GENERATION_TIME_BUDGET) if GENERATION_TIME_BUDGET is not None else None
+        ),
+        max_expressions=(
+            int(GENERATION_MAX_EXPRESSIONS)
+            if GENERATION_MAX_EXPRESSIONS is not None
+            else None
+        ),
+        target_fill_ratio=(
+            float(GENERATION_TARGET_FILL_RATIO)
+            if GENERATION_TARGET_FILL_RATIO is not None
+            else None
+        ),
+        max_attempts_without_progress=(
+            int(GENERATION_MAX_ATTEMPTS_WITHOUT_PROGRESS)
+            if GENERATION_MAX_ATTEMPTS_WITHOUT_PROGRESS is not None
+            else None
+        ),
     )
-    operator_factory = OperatorFactory()
+
+
+def create_seeded_random_generator(seed: int | None = None) -> RandomGenerator:
+    """
+    Create the random generator of the engine of the configuration
+
+    :param seed: The seed of the stream, random by default
+    """
+    if RANDOM_GENERATOR_ENGINE == "numpy":
+        from random_generator_numpy import NumpyRandomGenerator
+
+        return NumpyRandomGenerator(seed)
+    elif RANDOM_GENERATOR_ENGINE == "python":
+        return RandomGenerator(seed)
+    raise ValueError(
+        f"Not supported random generator engine: {RANDOM_GENERATOR_ENGINE}"
+    )
+
+
+def create_random_generator() -> RandomGenerator:
+    """
+    Create the random generator of the configuration (seeded, recording or replaying)
+    """
+    if RANDOM_REPLAY is not None:
+        return ReplayRandomGenerator.load(RANDOM_REPLAY)
+    random_generator = create_seeded_random_generator(
+        int(RANDOM_SEED) if RANDOM_SEED is not None else None
+    )
+    if RANDOM_RECORD is not None:
+        return RecordingRandomGenerator(random_generator)
+    return random_generator
+
+
+def create_cross_math(
+    random_generator: RandomGenerator | None = None,
+    solution_index: ExpressionSolutionIndex | None = None,
+    metrics: GenerationMetrics | None = None,
+    negative_cache: NegativeResultCache | None = None,
+    completion_memo: CompletionMemo | None = None,
+) -> CrossMath:
+    """
+    Create a cross math generator of the configuration
+
+    :param random_generator: The source of every random decision
+    :param solution_index: The shared solution index, see create_solution_index
+    :param metrics: Collect the generation metrics into it
+    :param negative_cache: The shared negative result cache, see create_negative_cache
+    :param completion_memo: The shared completion memo, see create_completion_memo
+    """
+    random_generator = random_generator or RandomGenerator()
+    number_factory = create_number_factory(random_generator=random_generator)
+    operator_factory = create_operator_factory(random_generator=random_generator)
     resolver = ExpressionResolver(
-        validator=ExpressionValidator(minimum=-100, maximum=100),
+        validator=create_validator(number_factory),
         number_factory=number_factory,
         operator_factory=operator_factory,
+        solution_index=solution_index,
+        negative_cache=negative_cache,
+        completion_memo=completion_memo,
+        candidates_per_attempt=RESOLVER_CANDIDATES_PER_ATTEMPT,
     )
-    cross_math = CrossMath(
-        exp_map=exp_map,
+    if GENERATOR == "greedy":
+        cross_math_class = CrossMath
+    elif GENERATOR == "backtracking":
+        cross_math_class = BacktrackingCrossMath
+    else:
+        raise ValueError(f"Not supported generator: {GENERATOR}")
+    return cross_math_class(
+        exp_map=create_expression_map(),
         number_factory=number_factory,
         expression_resolver=resolver,
-        operator_factory=OperatorFactory(),
+        operator_factory=operator_factory,
+        random_generator=random_generator,
+        metrics=metrics,
+    )
+
+
+if __name__ == "__main__":
+    random_generator = create_random_generator()
+    metrics = GenerationMetrics() if METRICS else None
+    completion_memo = create_completion_memo()
+    cross_math = create_cross_math(
+        random_generator=random_generator,
+        solution_index=create_solution_index(),
+        metrics=metrics,
+        negative_cache=create_negative_cache(),
+        completion_memo=completion_memo,
     )
     # try:
-    cross_math.generate()
+    result = cross_math.generate(create_generation_limits())
+    if isinstance(random_generator, RecordingRandomGenerator):
+        random_generator.save(RANDOM_RECORD)
+    if completion_memo is not None and COMPLETION_MEMO_PATH is not None:
+        completion_memo.save(COMPLETION_MEMO_PATH)
     print()
     cross_math.print()
-    number_factory.print_statistic()
-    operator_factory.print_statistic()
+    cross_math.get_number_factory().print_statistic()
+    cross_math.get_operator_factory().print_statistic()
+    print(
+        f"Stopped: {result.stop_reason} ({result.expression_count} expressions, "
+        f"fill ratio {result.fill_ratio:.3f}, {result.elapsed:.3f} sec)"
+    )
+    if metrics is not None:
+        print(json.dumps(metrics.snapshot(), indent=2))
     # except Exception as e:
     #     print(e)
     # finally:
@@ -0,0 +1,60 @@
+import time
+
+
+class GenerationMetrics:
+    """
+    Counters and timers of the generation
+
+    A disabled instance returns from every hook without recording, the
+    components hold a disabled instance until set_metrics is called.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._counters: dict[str, int] = {}
+        self._timers: dict[str, list] = {}
+
+    def count(self, name: str, value: int = 1):
+        if not self.enabled:
+            return
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def start_timer(self) -> float:
+        """
+        Returns the start time of a timer (0.0 when disabled, see stop_timer)
+        """
+        if not self.enabled:
+            return 0.0
+        return time.perf_counter()
+
+    def stop_timer(self, name: str, start_time: float):
+        """
+        Add the time elapsed since start_time (see start_timer) to the timer
+        """
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - start_time
+        timer = self._timers.get(name)
+        if timer is None:
+            self._timers[name] = [1, elapsed]
+        else:
+            timer[0] += 1
+            timer[1] += elapsed
+
+    def reset(self):
+        self._counters.clear()
+        self._timers.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Returns the counters and the timers
+
+        :return: {"counters": {name: count}, "timers": {name: {"count": count, "total_sec": sec}}}
+        """
+        return {
+            "counters": dict(sorted(self._counters.items())),
+            "timers": {
+                name: {"count": count, "total_sec": total}
+                for name, (count, total) in sorted(self._timers.items())
+            },
+        }
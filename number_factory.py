@@ -1,17 +1,9 @@
 import math
-import random
-import time
 
+from arithmetic import divide_round
+from metrics import GenerationMetrics
 from number_helper import number_is_zero, number_is_equal, number_fix
-
-
-class RandomGenerator:
-    def __init__(self, seed: int = None):
-        self._seed = seed
-        self._random = random.Random(seed)
-
-    def next_int(self, maximum: int) -> int:
-        return self._random.randint(0, maximum)
+from random_generator import RandomGenerator
 
 
 class NumberFactory:
@@ -22,7 +14,13 @@ class NumberFactory:
         maximum: float = 10.0,
         step: float = 1,
         random_generator: RandomGenerator | None = None,
+        fixed_point: bool = False,
+        debug: bool = False,
     ):
+        """
+        :param fixed_point: Hand out integers scaled by 10**decimals instead of floats
+        :param debug: Check the invariants of every drawn number (slower)
+        """
         self._number_stat: dict[str, int] = {}
         self._min: float = minimum
         self._max: float = maximum
@@ -30,7 +28,19 @@ class NumberFactory:
             raise ValueError("Step must be greater than 0")
         self._step = step
         self._decimals = NumberFactory._get_decimals_from_step(step)
+        self._fixed_point = fixed_point
+        self._scale = 10**self._decimals
+        # the factory step on the lattice of 10**-decimals units
+        self._lattice_step = round(step * self._scale)
+        # the factory range in lattice units
+        self._minimum_units = math.ceil(number_fix(minimum * self._scale))
+        self._maximum_units = math.floor(number_fix(maximum * self._scale))
+        self._debug = debug
         self._random_generator: RandomGenerator = random_generator or RandomGenerator()
+        self._metrics = GenerationMetrics(enabled=False)
+
+    def set_metrics(self, metrics: GenerationMetrics):
+        self._metrics = metrics
 
     @staticmethod
     def _get_decimals_from_step(step: float) -> int:
@@ -51,79 +61,193 @@ class NumberFactory:
     def get_decimals(self) -> int:
         return self._decimals
 
+    def get_lattice_step(self) -> int:
+        """
+        Returns the step in lattice units (10**-decimals)
+        """
+        return self._lattice_step
+
+    def to_lattice_units(self, value: float | int) -> int | None:
+        """
+        Convert a number to lattice units (10**-decimals)
+
+        :return: The units or None if the number is not on the lattice
+        """
+        if self._fixed_point:
+            return value
+        units = round(value * self._scale)
+        if not number_is_equal(units / self._scale, value):
+            return None
+        return units
+
+    def from_lattice_units(self, units: int) -> float | int:
+        """
+        Convert lattice units (10**-decimals) to a number of the factory
+        """
+        if self._fixed_point:
+            return units
+        return self._from_units(units)
+
+    def get_random_generator(self) -> RandomGenerator:
+        return self._random_generator
+
+    def is_fixed_point(self) -> bool:
+        return self._fixed_point
+
+    def get_scale(self) -> int | None:
+        """
+        Returns the scale of the fixed-point numbers (None in float mode)
+        """
+        return self._scale if self._fixed_point else None
+
+    def to_fixed_point(self, value: float) -> int:
+        """
+        Convert a float to a fixed-point number
+        """
+        return int(round(value * self._scale))
+
+    def to_float(self, value: float | int) -> float:
+        """
+        Convert a number of the factory to float
+        """
+        if self._fixed_point:
+            return value / self._scale
+        return value
+
     def next(
         self,
-        minimum: float | None = None,
-        maximum: float | None = None,
-        dividable_by: float | None = None,
+        minimum: float | int | None = None,
+        maximum: float | int | None = None,
+        dividable_by: float | int | None = None,
         zero_allowed: bool = True,
-    ) -> float:
-        minimum = max(self._min, minimum or self._min)
-        maximum = min(self._max, maximum or self._max)
-        if minimum > maximum:
-            raise ValueError(f"Minimum is greater than maximum: {minimum} > {maximum}")
-        if dividable_by is not None:
-            if number_is_zero(dividable_by):
-                dividable_by = self._step
-            else:
-                dividable_by = abs(dividable_by)
-                a = int(dividable_by * 10**self._decimals)
-                b = int(self._step * 10**self._decimals)
-                if a % b != 0:
-                    raise ValueError(
-                        f"Dividable by must be dividable by step: {dividable_by} vs {self._step}"
-                    )
+    ) -> float | int:
+        """
+        Returns a random number of the factory
+
+        The number is drawn uniformly and directly from the lattice of the
+        multiples of `dividable_by` (the factory step by default) in the
+        range, zero is excluded by construction if it is not allowed. In
+        fixed-point mode the parameters and the result are fixed-point numbers.
+
+        :raises ValueError: There is no admissible number
+        """
+        if minimum or maximum:
+            minimum = max(self._min, self.to_float(minimum) if minimum else self._min)
+            maximum = min(self._max, self.to_float(maximum) if maximum else self._max)
+            if minimum > maximum:
+                raise ValueError(
+                    f"Minimum is greater than maximum: {minimum} > {maximum}"
+                )
+            minimum_units = math.ceil(number_fix(minimum * self._scale))
+            maximum_units = math.floor(number_fix(maximum * self._scale))
         else:
-            dividable_by = self._step
-        minimum_start = math.ceil(minimum / dividable_by) * dividable_by
-        maximum_end = math.floor(maximum / dividable_by) * dividable_by
-        full_range = abs(maximum_end - minimum_start)
-        range_int = int(full_range / dividable_by)
-        start_time = time.time()
-        if (
-            not zero_allowed
-            and dividable_by > abs(minimum_start)
-            and dividable_by > abs(maximum_end)
-        ):
+            if self._min > self._max:
+                raise ValueError(
+                    f"Minimum is greater than maximum: {self._min} > {self._max}"
+                )
+            minimum_units = self._minimum_units
+            maximum_units = self._maximum_units
+        # lattice units are 10**-decimals
+        step = self._lattice_step
+        if dividable_by is not None and not number_is_zero(dividable_by):
+            dividable_by = abs(dividable_by)
+            dividable_by_units = (
+                dividable_by
+                if self._fixed_point
+                else round(dividable_by * self._scale)
+            )
+            if dividable_by_units % step != 0:
+                raise ValueError(
+                    f"Dividable by must be dividable by step: {self.to_float(dividable_by)} vs {self._step}"
+                )
+            step = dividable_by_units
+        # admissible values: k * step, k_start <= k <= k_end
+        k_start = -(-minimum_units // step)
+        k_end = maximum_units // step
+        if k_start > k_end:
+            self._metrics.count("number_factory.rejections")
             raise ValueError(
-                f"Dividable by / step must be less than minimum or maximum: {dividable_by} vs [{minimum_start}, {maximum_end}]"
+                f"Minimum is greater than maximum (modified): {self._from_units(k_start * step)} > {self._from_units(k_end * step)}"
             )
-        if minimum_start > maximum_end:
+        count = k_end - k_start + 1
+        skip_zero = not zero_allowed and k_start <= 0 <= k_end
+        if skip_zero:
+            count -= 1
+        if count < 1:
+            self._metrics.count("number_factory.rejections")
             raise ValueError(
-                f"Minimum is greater than maximum (modified): {minimum_start} > {maximum_end}"
+                f"Dividable by / step must be less than minimum or maximum: {self._from_units(step)} vs [{self._from_units(k_start * step)}, {self._from_units(k_end * step)}]"
             )
-        max_runtime_sec = 0.1
-        while time.time() - start_time < max_runtime_sec:
-            random_in_range = self._random_generator.next_int(range_int)
-            value = minimum_start + random_in_range * dividable_by
-            value_fixed = self.fix(value, dividable_by)
-            if not number_is_equal(value, self.fix(value, dividable_by)):
-                raise RuntimeError(
-                    f"Value is not equal to fixed value: {value} vs {value_fixed}"
-                )
-            if number_fix(value) < number_fix(minimum_start):
-                raise RuntimeError(
-                    f"Value is less than minimum: {value} < {minimum_start} minimum={minimum}"
-                )
-            if number_fix(value) > number_fix(maximum_end):
-                raise RuntimeError(
-                    f"Value is greater than maximum: {value} > {maximum_end} maximum={maximum}"
-                )
-            if not zero_allowed and number_is_zero(value):
-                continue
-            return self.fix(value)
-        raise RuntimeError(
-            f"Cannot find random value in {max_runtime_sec} second, paramters: minimum={minimum}, maximum={maximum}, dividable_by={dividable_by}, zero_allowed={zero_allowed}"
-        )
-
-    def format(self, value: float | None, decimals: int | None = None) -> str:
+        self._metrics.count("number_factory.next")
+        k = k_start + self._random_generator.next_int(count - 1)
+        if skip_zero and k >= 0:
+            k += 1
+        value_units = k * step
+        if self._debug:
+            self._check_value_units(
+                value_units, minimum_units, maximum_units, step, zero_allowed
+            )
+        if self._fixed_point:
+            return value_units
+        return self._from_units(value_units)
+
+    @staticmethod
+    def _check_value_units(
+        value_units: int,
+        minimum_units: int,
+        maximum_units: int,
+        step: int,
+        zero_allowed: bool,
+    ):
+        """
+        Check the invariants of a drawn number in lattice units
+
+        :raises RuntimeError: An invariant is broken
+        """
+        if value_units < minimum_units:
+            raise RuntimeError(
+                f"Value is less than minimum: {value_units} < {minimum_units}"
+            )
+        if value_units > maximum_units:
+            raise RuntimeError(
+                f"Value is greater than maximum: {value_units} > {maximum_units}"
+            )
+        if value_units % step != 0:
+            raise RuntimeError(f"Value is not dividable by step: {value_units} vs {step}")
+        if not zero_allowed and value_units == 0:
+            raise RuntimeError("Value is zero")
+
+    def _from_units(self, value: int) -> float:
+        return float(round(value / self._scale, self._decimals))
+
+    def format(self, value: float | int | None, decimals: int | None = None) -> str:
         if value is None:
             return ""
         if decimals is None:
             decimals = self._decimals
-        return f"{value:.{0 if decimals < 1 else decimals}f}"
+        return f"{self.to_float(value):.{0 if decimals < 1 else decimals}f}"
+
+    def fix(self, value: float | int, step: float | int | None = None) -> float | int:
+        """
+        Round the value to the step (to the factory step by default)
+
+        In fixed-point mode the value, the step and the result are fixed-point numbers.
+        """
+        if self._fixed_point:
+            return self._fix_fixed_point(value, step)
+        return self._fix_float(value, step)
+
+    def _fix_fixed_point(self, value: int, step: int | None = None) -> int:
+        factory_step = self._lattice_step
+        if step is None:
+            step = factory_step
+        elif step < factory_step:
+            raise ValueError(
+                f"Step must be greater than or equal to the factory step: {factory_step} vs {step}"
+            )
+        return divide_round(value, step) * step
 
-    def fix(self, value: float, step: float | None = None) -> float:
+    def _fix_float(self, value: float, step: float | None = None) -> float:
         if step is None:
             step = self._step
         elif step < self._step:
@@ -4,9 +4,19 @@ number_precision_decimals = 6
 def number_fix(value: float | None) -> float | None:
     if value is None:
         return None
+    if type(value) is int:
+        # fixed-point numbers are exact
+        return value
     return round(value, number_precision_decimals)
 
 
+def is_number(value) -> bool:
+    """
+    Returns True if value is a float or a fixed-point (int) number
+    """
+    return isinstance(value, (float, int)) and not isinstance(value, bool)
+
+
 def number_is_zero(value: float | None):
     if value is None:
         return False
@@ -1,5 +1,9 @@
-import random
+from bisect import bisect_right
 from enum import Enum
+from itertools import accumulate
+from typing import Iterable
+
+from random_generator import RandomGenerator
 
 
 class Operator(Enum):
@@ -9,6 +13,9 @@ class Operator(Enum):
     DIV = "/"
     EQ = "="
 
+    # the compact integer code of the operator, see OPERATORS_BY_CODE
+    code: int
+
     @staticmethod
     def get_operators_without_eq() -> list:
         """
@@ -20,43 +27,184 @@ class Operator(Enum):
         return self.value
 
 
+# Compact integer codes of the operators. The hot paths look up the tables
+# below by the code instead of comparing enum members or searching lists,
+# the Operator enum stays at the API edge.
+OP_ADD, OP_SUB, OP_MUL, OP_DIV, OP_EQ = range(5)
+OPERATORS_BY_CODE = (
+    Operator.ADD,
+    Operator.SUB,
+    Operator.MUL,
+    Operator.DIV,
+    Operator.EQ,
+)
+for _code, _operator in enumerate(OPERATORS_BY_CODE):
+    _operator.code = _code
+
+# a + b = c -> c - b = a, a - b = c -> c + b = a,
+# a * b = c -> c / b = a, a / b = c -> c * b = a
+INVERSE_OPERATORS = (Operator.SUB, Operator.ADD, Operator.DIV, Operator.MUL, None)
+# a op b = b op a
+COMMUTATIVE_OPERATORS = (True, False, True, False, False)
+# operand2 must not be zero
+ZERO_DIVISION_OPERATORS = (False, False, False, True, False)
+
+
+def is_operator_without_eq(value) -> bool:
+    """
+    Returns True if the value is an operator other than the equal operator
+    """
+    return value.__class__ is Operator and value.code != OP_EQ
+
+
+class OperatorPolicy(Enum):
+    """
+    Balancing policy of the operator sampling
+    """
+
+    # every allowed operator has the same chance
+    UNIFORM = "uniform"
+    # the weight of an operator is 1 + the most uses - its uses, so the less
+    # used operators catch up
+    BALANCED = "balanced"
+    # the weights are given, see OperatorFactory
+    FIXED = "fixed"
+
+
 class OperatorFactory:
-    def __init__(self, operators: list[Operator] | None = None):
+    """
+    Weighted operator sampler
+
+    The weights and the usage order of the operators (least used first,
+    ties in the order of the operators) are kept up to date by fly_back.
+    The excludes are applied as a bit mask of the operator codes, the
+    cumulative weights are cached per mask until the next change, so a draw
+    is one random number and a bisect.
+    """
+
+    def __init__(
+        self,
+        operators: list[Operator] | None = None,
+        random_generator: RandomGenerator | None = None,
+        policy: OperatorPolicy = OperatorPolicy.UNIFORM,
+        weights: dict[Operator, int] | None = None,
+    ):
+        """
+        :param operators: The operators to draw, all but the equal by default
+        :param random_generator: The source of the draws
+        :param policy: The balancing policy of the draws
+        :param weights: The positive weights of the FIXED policy by operator
+        """
         self._operators = (
             operators if operators is not None else Operator.get_operators_without_eq()
         )
         self._stats = {operator: 0 for operator in self._operators}
+        self._random_generator: RandomGenerator = random_generator or RandomGenerator()
+        self._policy = policy
+        # the weights by operator code
+        self._weights = [0] * len(OPERATORS_BY_CODE)
+        for operator in self._operators:
+            if policy == OperatorPolicy.FIXED:
+                if weights is None or weights.get(operator, 0) < 1:
+                    raise ValueError(f"Weight must be greater than 0: {operator}")
+                self._weights[operator.code] = weights[operator]
+            else:
+                self._weights[operator.code] = 1
+        self._max_count = 0
+        # the operators by usage, see operators_weighted
+        self._ordered: list[Operator] = list(self._operators)
+        # the position of the operators by code, the tie-break of the usage order
+        self._positions = [0] * len(OPERATORS_BY_CODE)
+        for position, operator in enumerate(self._operators):
+            self._positions[operator.code] = position
+        # exclude mask -> (operators, cumulative weights)
+        self._samplers: dict[int, tuple[tuple[Operator, ...], list[int]]] = {}
+
+    def get_policy(self) -> OperatorPolicy:
+        return self._policy
+
+    def get_weight(self, operator: Operator) -> int:
+        """
+        Returns the current sampling weight of the operator
+        """
+        return self._weights[operator.code]
 
     def next_weighted_operator(
-        self, excludes: list[Operator] | None = None
+        self, excludes: Iterable[Operator] | None = None
     ) -> Operator:
-        operators = self.operators_weighted(excludes=excludes)
-        return random.choice(operators)
+        """
+        Draw an operator by the weights of the policy
+
+        :raises ValueError: Every operator is excluded
+        """
+        operators, cumulative = self._sampler(excludes)
+        if not operators:
+            raise ValueError("Every operator is excluded")
+        value = self._random_generator.next_int(cumulative[-1] - 1)
+        return operators[bisect_right(cumulative, value)]
 
     def operators_weighted(
-        self, excludes: list[Operator] | None = None
+        self, excludes: Iterable[Operator] | None = None
     ) -> list[Operator]:
-        if excludes is None:
-            excludes = []
-        # TODO smarter weighting
-        operators = sorted(self._operators, key=lambda operator: self._stats[operator])
-        for operator in excludes:
-            operators.remove(operator)
-        return operators
-
-    def iter_weighted_operators(self, excludes: list) -> Operator:
-        # TODO smarter weighting
-        for operator in self.operators_weighted(excludes):
-            yield operator
+        """
+        Returns the not excluded operators, the least used first
+        """
+        return list(self._sampler(excludes)[0])
+
+    def iter_weighted_operators(self, excludes: Iterable[Operator]) -> Operator:
+        operators = self._sampler(excludes)[0]
+        yield from operators
         for operator in self._operators:
-            if operator not in excludes:
+            if operator in operators:
                 yield operator
 
     def operators(self) -> list[Operator]:
         return self._operators
 
     def fly_back(self, operator: Operator):
-        self._stats[operator] += 1
+        count = self._stats[operator] + 1
+        self._stats[operator] = count
+        if self._policy == OperatorPolicy.BALANCED:
+            if count > self._max_count:
+                self._max_count = count
+                for other in self._operators:
+                    if other is not operator:
+                        self._weights[other.code] += 1
+            else:
+                self._weights[operator.code] -= 1
+            self._samplers.clear()
+        # keep the usage order stable sorted, the operator can only move back
+        ordered = self._ordered
+        i = ordered.index(operator)
+        position = self._positions[operator.code]
+        while i + 1 < len(ordered):
+            following = ordered[i + 1]
+            following_count = self._stats[following]
+            if following_count > count or (
+                following_count == count
+                and self._positions[following.code] > position
+            ):
+                break
+            ordered[i] = following
+            i += 1
+            ordered[i] = operator
+            self._samplers.clear()
+
+    def _sampler(
+        self, excludes: Iterable[Operator] | None
+    ) -> tuple[tuple[Operator, ...], list[int]]:
+        mask = 0
+        if excludes is not None:
+            for operator in excludes:
+                mask |= 1 << operator.code
+        sampler = self._samplers.get(mask)
+        if sampler is None:
+            operators = tuple(
+                operator for operator in self._ordered if not mask >> operator.code & 1
+            )
+            weights = [self._weights[operator.code] for operator in operators]
+            sampler = self._samplers[mask] = (operators, list(accumulate(weights)))
+        return sampler
 
     def print_statistic(self):
         for operator, count in self._stats.items():
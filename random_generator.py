@@ -0,0 +1,120 @@
+import random
+from typing import MutableSequence, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class RandomGenerator:
+    """
+    Source of every random decision
+
+    All decisions are made through next_int, so a decision stream can be
+    recorded and replayed (see RecordingRandomGenerator, ReplayRandomGenerator).
+    """
+
+    def __init__(self, seed: int = None):
+        self._seed = seed
+        self._random = random.Random(seed)
+
+    def next_int(self, maximum: int) -> int:
+        return self._random.randint(0, maximum)
+
+    def choice(self, values: Sequence[T]) -> T:
+        if len(values) == 0:
+            raise IndexError("Cannot choose from an empty sequence")
+        return values[self.next_int(len(values) - 1)]
+
+    def shuffle(self, values: MutableSequence):
+        """
+        Shuffle the values in place (Fisher-Yates)
+        """
+        for i in range(len(values) - 1, 0, -1):
+            j = self.next_int(i)
+            values[i], values[j] = values[j], values[i]
+
+
+class RandomReplayException(Exception):
+    pass
+
+
+class RecordingRandomGenerator(RandomGenerator):
+    """
+    Record the decisions of a random generator
+    """
+
+    MAGIC = b"CMRR\x01"
+
+    def __init__(self, random_generator: RandomGenerator | None = None):
+        super().__init__()
+        self._random_generator = random_generator or RandomGenerator()
+        self._decisions: list[int] = []
+
+    def next_int(self, maximum: int) -> int:
+        value = self._random_generator.next_int(maximum)
+        self._decisions.append(value)
+        return value
+
+    def get_decisions(self) -> list[int]:
+        return self._decisions
+
+    def save(self, path: str):
+        """
+        Save the decision stream (unsigned LEB128 varints)
+        """
+        data = bytearray(RecordingRandomGenerator.MAGIC)
+        for value in self._decisions:
+            while value > 0x7F:
+                data.append((value & 0x7F) | 0x80)
+                value >>= 7
+            data.append(value)
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+class ReplayRandomGenerator(RandomGenerator):
+    """
+    Replay a recorded decision stream
+    """
+
+    def __init__(self, decisions: list[int]):
+        super().__init__()
+        self._decisions = decisions
+        self._position = 0
+
+    @staticmethod
+    def load(path: str) -> "ReplayRandomGenerator":
+        with open(path, "rb") as f:
+            data = f.read()
+        magic = RecordingRandomGenerator.MAGIC
+        if not data.startswith(magic):
+            raise RandomReplayException(f"Not a random decision stream: {path}")
+        decisions = []
+        value = 0
+        shift = 0
+        for byte in data[len(magic) :]:
+            value |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+                continue
+            decisions.append(value)
+            value = 0
+            shift = 0
+        if shift != 0:
+            raise RandomReplayException(f"Truncated random decision stream: {path}")
+        return ReplayRandomGenerator(decisions)
+
+    def next_int(self, maximum: int) -> int:
+        if self._position >= len(self._decisions):
+            raise RandomReplayException(
+                f"Random decision stream is exhausted after {self._position} decisions"
+            )
+        value = self._decisions[self._position]
+        if value > maximum:
+            raise RandomReplayException(
+                f"Random decision stream diverged at {self._position}: {value} > {maximum}"
+            )
+        self._position += 1
+        return value
+
+    def is_exhausted(self) -> bool:
+        return self._position >= len(self._decisions)
@@ -0,0 +1,60 @@
+import numpy
+
+from random_generator import RandomGenerator
+
+
+class NumpyRandomGenerator(RandomGenerator):
+    """
+    Random generator backed by numpy.random.Generator with prefetched blocks
+
+    Every requested range has its own buffer, it is refilled with one
+    vectorised draw of a block of integers. The block of a range starts
+    small and doubles up to block_size on every refill, so the rarely
+    requested ranges do not hold large buffers.
+
+    The stream of a seed is reproducible (the same seed and the same
+    sequence of the requested ranges give the same numbers), but it is not
+    the stream of RandomGenerator with the same seed.
+    """
+
+    def __init__(
+        self,
+        seed: int | None = None,
+        block_size: int = 4096,
+        initial_block_size: int = 16,
+    ):
+        """
+        :param seed: The seed of the stream, random by default
+        :param block_size: The maximum number of the prefetched integers of a range
+        :param initial_block_size: The number of the integers of the first block
+        """
+        if block_size < 1:
+            raise ValueError(f"Block size must be greater than 0: {block_size}")
+        if not 1 <= initial_block_size <= block_size:
+            raise ValueError(
+                f"Initial block size must be between 1 and {block_size}: {initial_block_size}"
+            )
+        super().__init__(seed)
+        self._generator = numpy.random.default_rng(seed)
+        self._block_size = block_size
+        self._initial_block_size = initial_block_size
+        # maximum -> the remaining integers, served from the end
+        self._buffers: dict[int, list[int]] = {}
+        # maximum -> the size of the next block
+        self._block_sizes: dict[int, int] = {}
+
+    def next_int(self, maximum: int) -> int:
+        buffer = self._buffers.get(maximum)
+        if buffer:
+            return buffer.pop()
+        if maximum < 0:
+            raise ValueError(f"Maximum must not be negative: {maximum}")
+        return self._refill(maximum).pop()
+
+    def _refill(self, maximum: int) -> list[int]:
+        size = self._block_sizes.get(maximum, self._initial_block_size)
+        self._block_sizes[maximum] = min(size * 2, self._block_size)
+        buffer = self._buffers[maximum] = self._generator.integers(
+            0, maximum, size=size, endpoint=True
+        ).tolist()
+        return buffer
@@ -1,10 +1,22 @@
 from expression import Expression, ExpressionValidator
+from metrics import GenerationMetrics
 from number_factory import NumberFactory
 from operator_factory import OperatorFactory
 from resolver.resolver_base import ExpressionResolverBase
+from resolver.resolver_exceptions import (
+    ExpressionResolverException,
+    ExpressionResolverNotResolvable,
+)
+from resolver.resolver_completion_memo import CompletionMemo
+from resolver.resolver_negative_cache import NegativeResultCache
 from resolver.resolver_only_operator_missing import OnlyOperatorMissingResolver
 from resolver.resolver_result_is_available import ResultIsAvailableResolver
+from resolver.resolver_pattern import PatternKey, create_pattern_key
 from resolver.resolver_result_is_none import ResultIsNoneResolver
+from resolver.resolver_solution_index import (
+    ExpressionSolutionIndex,
+    SolutionIndexResolver,
+)
 
 
 class ExpressionResolver:
@@ -13,32 +25,191 @@ class ExpressionResolver:
         validator: ExpressionValidator,
         number_factory: NumberFactory,
         operator_factory: OperatorFactory,
+        solution_index: ExpressionSolutionIndex | None = None,
+        negative_cache: NegativeResultCache | None = None,
+        completion_memo: CompletionMemo | None = None,
+        candidates_per_attempt: int = 1,
     ):
+        """
+        :param solution_index: Resolve the expressions covered by the index with one pick from the index
+        :param negative_cache: Skip the patterns known to be not resolvable
+        :param completion_memo: Draw the completions of the frequent patterns from a memo
+        :param candidates_per_attempt: Validate this many candidates at once
+                                       per attempt, see ResultIsNoneResolver
+        """
         self._validator = validator
         self._number_factory = number_factory
         self._operator_factory = operator_factory
+        self._metrics = GenerationMetrics(enabled=False)
+        self._negative_cache = negative_cache
+        self._completion_memo = completion_memo
+        self._config_key = self.get_config_key()
         self._resolvers: list[ExpressionResolverBase] = [
-            ResultIsNoneResolver(validator, number_factory, operator_factory),
+            ResultIsNoneResolver(
+                validator,
+                number_factory,
+                operator_factory,
+                candidates_per_attempt=candidates_per_attempt,
+            ),
             OnlyOperatorMissingResolver(validator, number_factory, operator_factory),
             ResultIsAvailableResolver(validator, number_factory, operator_factory),
         ]
+        if solution_index is not None:
+            self._resolvers.insert(
+                0,
+                SolutionIndexResolver(
+                    validator, number_factory, operator_factory, solution_index
+                ),
+            )
+        # the (timer, attempts counter, failures counter) names by resolver
+        self._metric_names: list[tuple[str, str, str]] = []
+        for resolver in self._resolvers:
+            name = f"resolver.{type(resolver).__name__}"
+            self._metric_names.append((name, f"{name}.attempts", f"{name}.failures"))
+
+    def set_metrics(self, metrics: GenerationMetrics):
+        self._metrics = metrics
+
+    def get_config_key(self) -> tuple:
+        """
+        Returns the key of the configuration which decides the resolvability
+        of the patterns
+        """
+        return (
+            self._number_factory.get_minimum(),
+            self._number_factory.get_maximum(),
+            self._number_factory.get_step(),
+            self._number_factory.is_fixed_point(),
+            self._validator.get_minimum(),
+            self._validator.get_maximum(),
+            tuple(operator.value for operator in self._operator_factory.operators()),
+        )
 
-    def resolve(self, expression: Expression) -> Expression | None:
+    def resolve(self, expression: Expression, fly_back: bool = True) -> Expression | None:
         """
         Resolve the expression
 
         :param expression: The expression to resolve
+        :param fly_back: Fly back the resolved parts, False for a trial which
+                         may be dropped (see fly_back)
         :return: The resolved expression
         """
+        pattern_key = self._create_pattern_key(expression)
+        self._check_negative_cache(expression, pattern_key)
+        resolved_expression = self._draw_completion(expression, pattern_key)
+        if resolved_expression is None:
+            for resolver, metric_names in zip(self._resolvers, self._metric_names):
+                if resolver.match(expression):
+                    break
+            else:
+                return None
+            name, attempts_name, failures_name = metric_names
+            start_time = self._metrics.start_timer()
+            self._metrics.count(attempts_name)
+            try:
+                resolved_expression = resolver.resolve(expression)
+            except ExpressionResolverException as e:
+                self._metrics.count(failures_name)
+                self._add_negative_cache(pattern_key, e)
+                raise
+            finally:
+                self._metrics.stop_timer(name, start_time)
+            if self._completion_memo is not None:
+                self._completion_memo.add(pattern_key, resolved_expression)
+        if fly_back:
+            self.fly_back(expression, resolved_expression)
+        return resolved_expression
+
+    def is_resolvable(self, expression: Expression, attempts: int = 1) -> bool:
+        """
+        Check whether the expression can be resolved
+
+        The matching resolver is tried without flying back the result, a
+        maybe not resolvable expression is retried up to attempts times. The
+        failed tries are not added to the negative cache, a probe may fail
+        where resolve would still succeed.
+
+        :param expression: The expression to check
+        :param attempts: The number of the tries
+        """
+        pattern_key = self._create_pattern_key(expression)
+        try:
+            self._check_negative_cache(expression, pattern_key)
+        except ExpressionResolverNotResolvable:
+            return False
+        if self._completion_memo is not None and self._completion_memo.has_completion(
+            pattern_key
+        ):
+            return True
         for resolver in self._resolvers:
             if resolver.match(expression):
-                resolved_expression = resolver.resolve(expression)
-                self._fly_back(expression, resolved_expression)
-                return resolved_expression
+                for _ in range(attempts):
+                    try:
+                        resolver.resolve(expression)
+                        return True
+                    except ExpressionResolverNotResolvable:
+                        return False
+                    except ExpressionResolverException:
+                        continue
+                return False
+        return False
+
+    def _create_pattern_key(self, expression: Expression) -> PatternKey | None:
+        """
+        :return: The pattern key of the expression (None without cache and memo)
+        """
+        if self._negative_cache is None and self._completion_memo is None:
+            return None
+        return create_pattern_key(self._config_key, expression, self._number_factory)
+
+    def _check_negative_cache(
+        self, expression: Expression, pattern_key: PatternKey | None
+    ):
+        """
+        :raises ExpressionResolverNotResolvable: The pattern is cached as not resolvable
+        """
+        if self._negative_cache is None:
+            return
+        if self._negative_cache.is_not_resolvable(pattern_key):
+            self._metrics.count("resolver.negative_cache.hits")
+            raise ExpressionResolverNotResolvable(
+                message="Expression is cached as not resolvable", expression=expression
+            )
+
+    def _draw_completion(
+        self, expression: Expression, pattern_key: PatternKey | None
+    ) -> Expression | None:
+        if self._completion_memo is None:
+            return None
+        completion = self._completion_memo.draw(
+            pattern_key, self._number_factory.get_random_generator()
+        )
+        if completion is None:
+            return None
+        self._metrics.count("resolver.completion_memo.hits")
+        # the known numbers are kept as they are, the key only normalizes them
+        if expression.operand1 is not None:
+            completion.operand1 = expression.operand1
+        if expression.operand2 is not None:
+            completion.operand2 = expression.operand2
+        if expression.result is not None:
+            completion.result = expression.result
+        return completion
+
+    def _add_negative_cache(
+        self, pattern_key: PatternKey | None, exception: ExpressionResolverException
+    ):
+        if self._negative_cache is None:
+            return
+        if isinstance(exception, ExpressionResolverNotResolvable):
+            self._negative_cache.add_not_resolvable(pattern_key)
+        else:
+            self._negative_cache.add_maybe_not_resolvable(pattern_key)
 
-    def _fly_back(self, base: Expression, result: Expression):
+    def fly_back(self, base: Expression, result: Expression):
         """
-        Fly back expression parts
+        Fly back the resolved expression parts to the number and operator
+        factories (their usage statistics)
 
         :param base: The base expression
         :param result: The result expression
@@ -1,6 +1,7 @@
+from arithmetic import calculate, calculate_fixed_point
 from expression import ExpressionValidator, Expression
 from number_factory import NumberFactory
-from operator_factory import OperatorFactory
+from operator_factory import Operator, OperatorFactory
 
 
 class ExpressionResolverBase:
@@ -27,14 +28,19 @@ class ExpressionResolverBase:
         """
         raise NotImplementedError()
 
-    def _fix(self, value: float) -> float:
+    def _fix(self, value: float | int) -> float | int:
         """
-        Fix float value
+        Fix float (or fixed-point) value
         """
         return self._number_factory.fix(value)
 
-    def _calculate(self, *args):
+    def _calculate(
+        self, operand1: float | int, operator: Operator, operand2: float | int
+    ) -> float | int:
         """
         Calculate the expression result
         """
-        return self._fix(eval(" ".join(map(str, args))))
+        scale = self._number_factory.get_scale()
+        if scale is not None:
+            return self._fix(calculate_fixed_point(operand1, operator, operand2, scale))
+        return self._fix(calculate(operand1, operator, operand2))
@@ -0,0 +1,211 @@
+import json
+from collections import OrderedDict
+from typing import Tuple
+
+from expression import Expression
+from operator_factory import Operator
+from random_generator import RandomGenerator
+from resolver.resolver_pattern import PatternKey
+
+# (operand1, operator, operand2, result), the operator is its symbol
+Completion = Tuple[float | int, str, float | int, float | int]
+
+
+class CompletionMemoException(Exception):
+    pass
+
+
+class CompletionMemo:
+    """
+    Bounded LRU memo of the resolved completions of the expression patterns
+
+    Every pattern (see create_pattern_key) has a pool of up to pool_size
+    distinct valid completions. The pool is filled by the first pool_size
+    resolutions of the pattern, after that the completions are drawn from
+    the pool at random. The least recently used pattern is evicted above
+    capacity patterns.
+    """
+
+    MAGIC = "crossmath-completion-memo"
+    VERSION = 1
+
+    def __init__(self, capacity: int = 4096, pool_size: int = 16):
+        """
+        :param capacity: The maximum number of the patterns
+        :param pool_size: The number of the resolutions of a pattern before
+                          drawing from its pool
+        """
+        if capacity < 1:
+            raise ValueError(f"Capacity must be greater than 0: {capacity}")
+        if pool_size < 1:
+            raise ValueError(f"Pool size must be greater than 0: {pool_size}")
+        self._capacity = capacity
+        self._pool_size = pool_size
+        # pattern key -> [completions, resolutions], least recently used first
+        self._entries: OrderedDict[PatternKey, list] = OrderedDict()
+        # the keys added since the last export_updates, in add order (None
+        # until track_updates)
+        self._updated: dict[PatternKey, None] | None = None
+
+    def get_capacity(self) -> int:
+        return self._capacity
+
+    def get_pool_size(self) -> int:
+        return self._pool_size
+
+    def track_updates(self):
+        """
+        Record the added patterns for export_updates, e.g. in a worker process
+        """
+        if self._updated is None:
+            self._updated = {}
+
+    def draw(
+        self, key: PatternKey, random_generator: RandomGenerator
+    ) -> Expression | None:
+        """
+        Draw a completion of the pattern
+
+        :return: The completed expression or None if the pool is not filled yet
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        completions, resolutions = entry
+        if resolutions < self._pool_size or not completions:
+            return None
+        return self._to_expression(
+            completions[random_generator.next_int(len(completions) - 1)]
+        )
+
+    def has_completion(self, key: PatternKey) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and len(entry[0]) > 0
+
+    def add(self, key: PatternKey, expression: Expression):
+        """
+        Add a resolved completion of the pattern
+        """
+        entry = self._get_entry(key)
+        if self._updated is not None:
+            self._updated[key] = None
+        entry[1] += 1
+        completion = (
+            expression.operand1,
+            expression.operator.value,
+            expression.operand2,
+            expression.result,
+        )
+        if len(entry[0]) < self._pool_size and completion not in entry[0]:
+            entry[0].append(completion)
+
+    def export_updates(self) -> list:
+        """
+        Returns the entries added since the last call, see merge
+
+        :return: The [key, completions, resolutions] entries
+        :raises CompletionMemoException: The updates are not tracked, see
+                                         track_updates
+        """
+        if self._updated is None:
+            raise CompletionMemoException("The updates are not tracked")
+        updates = []
+        for key in self._updated:
+            entry = self._entries[key]
+            updates.append([key, list(entry[0]), entry[1]])
+        self._updated.clear()
+        return updates
+
+    def merge(self, entries: list):
+        """
+        Merge the entries of another memo, e.g. of a worker process
+
+        The completions are added up to pool_size, the resolutions of a
+        pattern are the larger of the two counts.
+
+        :param entries: The [key, completions, resolutions] entries, see export_updates
+        """
+        for key, completions, resolutions in entries:
+            entry = self._get_entry(key)
+            for completion in completions:
+                if len(entry[0]) >= self._pool_size:
+                    break
+                if completion not in entry[0]:
+                    entry[0].append(completion)
+            entry[1] = max(entry[1], resolutions)
+
+    def _get_entry(self, key: PatternKey) -> list:
+        """
+        Returns the entry of the pattern as the most recently used one, a new
+        entry evicts the least recently used pattern above capacity
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [[], 0]
+            if len(self._entries) > self._capacity:
+                evicted, _ = self._entries.popitem(last=False)
+                if self._updated is not None:
+                    self._updated.pop(evicted, None)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        if self._updated is not None:
+            self._updated.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _to_expression(completion: Completion) -> Expression:
+        operand1, operator, operand2, result = completion
+        return Expression.from_list(
+            [operand1, Operator(operator), operand2, Operator.EQ, result]
+        )
+
+    def save(self, path: str):
+        """
+        Save the memo as JSON, the least recently used pattern first
+        """
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "magic": CompletionMemo.MAGIC,
+                    "version": CompletionMemo.VERSION,
+                    "entries": [
+                        [key, completions, resolutions]
+                        for key, (completions, resolutions) in self._entries.items()
+                    ],
+                },
+                f,
+            )
+
+    @staticmethod
+    def load(path: str, capacity: int = 4096, pool_size: int = 16) -> "CompletionMemo":
+        with open(path) as f:
+            data = json.load(f)
+        if (
+            not isinstance(data, dict)
+            or data.get("magic") != CompletionMemo.MAGIC
+            or data.get("version") != CompletionMemo.VERSION
+        ):
+            raise CompletionMemoException(f"Not a completion memo: {path}")
+        memo = CompletionMemo(capacity=capacity, pool_size=pool_size)
+        for key, completions, resolutions in data["entries"]:
+            memo._entries[CompletionMemo._to_tuple(key)] = [
+                [tuple(completion) for completion in completions[:pool_size]],
+                resolutions,
+            ]
+            if len(memo._entries) > capacity:
+                memo._entries.popitem(last=False)
+        return memo
+
+    @staticmethod
+    def _to_tuple(value):
+        # JSON has no tuples, the pattern keys are nested tuples
+        if isinstance(value, list):
+            return tuple(CompletionMemo._to_tuple(item) for item in value)
+        return value
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+from typing import MutableMapping
+
+from resolver.resolver_pattern import PatternKey
+
+
+class NegativeResultCache:
+    """
+    Cache of the expression patterns which are known to be not resolvable
+
+    The patterns are shared across the positions of the map and across the
+    generations. A not resolvable pattern is cached at once, a maybe not
+    resolvable pattern (the random tries of the resolver failed) after
+    maybe_threshold failures.
+
+    The storage can be any mutable mapping, e.g. a multiprocessing manager
+    dict to share the cache between processes. A shared or reused cache
+    skips resolver loops and random decisions, so the boards of a seed
+    depend on the content of the cache. The failure count is read and
+    written back without a lock, so the concurrent failures of a pattern in
+    other processes may be lost: a shared count is a lower bound, the
+    pattern is cached after a few more failures then.
+
+    With local_cache the lookups are served from a local copy of the read
+    entries (up to local_capacity, the least recently used one is
+    dropped), so a shared storage is not asked on every lookup. A not
+    resolvable pattern stays so, the other entries are read again after
+    refresh_interval lookups to see the failures of the other processes.
+    """
+
+    def __init__(
+        self,
+        storage: MutableMapping | None = None,
+        maybe_threshold: int = 3,
+        local_cache: bool = False,
+        refresh_interval: int = 64,
+        local_capacity: int = 4096,
+    ):
+        """
+        :param storage: The failure counts by pattern key (a new dict by default)
+        :param maybe_threshold: The number of the maybe not resolvable
+                                failures which makes a pattern not resolvable
+        :param local_cache: Read the storage through a local copy
+        :param refresh_interval: The number of the lookups of a local entry
+                                 until the storage is read again
+        :param local_capacity: The maximum number of the local entries
+        """
+        if maybe_threshold < 1:
+            raise ValueError(
+                f"Maybe threshold must be greater than 0: {maybe_threshold}"
+            )
+        if refresh_interval < 1:
+            raise ValueError(
+                f"Refresh interval must be greater than 0: {refresh_interval}"
+            )
+        if local_capacity < 1:
+            raise ValueError(
+                f"Local capacity must be greater than 0: {local_capacity}"
+            )
+        self._storage: MutableMapping = storage if storage is not None else {}
+        self._maybe_threshold = maybe_threshold
+        self._refresh_interval = refresh_interval
+        self._local_capacity = local_capacity
+        # key -> [failure count, lookups until the storage is read again],
+        # least recently used first
+        self._local: OrderedDict[PatternKey, list] | None = (
+            OrderedDict() if local_cache else None
+        )
+
+    def is_not_resolvable(self, key: PatternKey) -> bool:
+        if self._local is None:
+            return self._storage.get(key, 0) >= self._maybe_threshold
+        entry = self._local.get(key)
+        if entry is None or (entry[0] < self._maybe_threshold and entry[1] <= 0):
+            entry = self._set_local(key, self._storage.get(key, 0))
+        else:
+            self._local.move_to_end(key)
+            entry[1] -= 1
+        return entry[0] >= self._maybe_threshold
+
+    def add_not_resolvable(self, key: PatternKey):
+        self._storage[key] = self._maybe_threshold
+        if self._local is not None:
+            self._set_local(key, self._maybe_threshold)
+
+    def add_maybe_not_resolvable(self, key: PatternKey):
+        # not atomic on a shared storage, see the class docstring
+        count = self._storage.get(key, 0) + 1
+        self._storage[key] = count
+        if self._local is not None:
+            self._set_local(key, count)
+
+    def _set_local(self, key: PatternKey, count: int) -> list:
+        entry = self._local[key] = [count, self._refresh_interval]
+        self._local.move_to_end(key)
+        if len(self._local) > self._local_capacity:
+            self._local.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._storage.clear()
+        if self._local is not None:
+            self._local.clear()
+
+    def __len__(self) -> int:
+        return sum(
+            1 for count in self._storage.values() if count >= self._maybe_threshold
+        )
@@ -36,18 +36,17 @@ class OnlyOperatorMissingResolver(ExpressionResolverBase):
             excludes=operator_excludes
         )
         for operator in operators:
-            exp_result = expression.clone()
-            exp_result.operator = operator
-            exp_result.result = self._calculate(
-                exp_result.operand1, operator, exp_result.operand2
-            )
-
-            if not number_is_equal(exp_result.result, expression.result):
+            result = self._calculate(expression.operand1, operator, expression.operand2)
+            if not number_is_equal(result, expression.result):
                 continue
-
+            if not self._validator.validate_values(
+                expression.operand1, operator, expression.operand2, result
+            ):
+                continue
+            exp_result = Expression.create(
+                expression.operand1, operator, expression.operand2, result
+            )
             if not expression.is_match(exp_result):
                 raise RuntimeError(f"Result is not match: {expression} vs {exp_result}")
-            if not self._validator.validate(exp_result):
-                continue
             return exp_result
         raise ExpressionResolverNotResolvable(expression=expression)
@@ -0,0 +1,36 @@
+from typing import Tuple
+
+from expression import Expression
+from number_factory import NumberFactory
+from number_helper import number_fix
+
+# (configuration key, operand1, operator, operand2, result), the numbers are
+# in lattice units and the operator is its symbol, so the key is plain data
+# with a stable hash in every process
+PatternKey = Tuple[
+    tuple, int | float | None, str | None, int | float | None, int | float | None
+]
+
+
+def create_pattern_key(
+    config_key: tuple, expression: Expression, number_factory: NumberFactory
+) -> PatternKey:
+    """
+    Returns the normalized key of the expression pattern
+
+    :param config_key: The key of the resolver configuration, see ExpressionResolver.get_config_key
+    """
+
+    def normalize(value: float | int | None) -> float | int | None:
+        if value is None:
+            return None
+        units = number_factory.to_lattice_units(value)
+        return units if units is not None else number_fix(value)
+
+    return (
+        config_key,
+        normalize(expression.operand1),
+        expression.operator.value if expression.operator is not None else None,
+        normalize(expression.operand2),
+        normalize(expression.result),
+    )
@@ -1,7 +1,13 @@
-import random
-
-from expression import ExpressionValidator, Expression, is_zero_division
-from operator_factory import Operator, OperatorFactory
+from arithmetic import is_zero_division
+from expression import ExpressionValidator, Expression
+from operator_factory import (
+    COMMUTATIVE_OPERATORS,
+    INVERSE_OPERATORS,
+    OP_DIV,
+    OP_EQ,
+    OP_MUL,
+    OperatorFactory,
+)
 from number_factory import NumberFactory
 from resolver.resolver_base import ExpressionResolverBase
 from resolver.resolver_exceptions import (
@@ -36,121 +42,65 @@ class ResultIsAvailableResolver(ExpressionResolverBase):
         )
 
     def _try_resolve(self, expression: Expression) -> Expression | None:
-        exp_calc = expression.clone()
-        exp_result = expression.clone()
+        """
+        One resolve attempt, the expression is built only if it is valid
+        """
+        operand1 = expression.operand1
+        operand2 = expression.operand2
+        result = expression.result
         operator = (
             expression.operator
             if expression.operator is not None
             else self._operator_factory.next_weighted_operator()
         )
-        if exp_result.operator is None:
-            exp_result.operator = operator
-        operands_is_empty = exp_calc.operand1 is None and exp_calc.operand2 is None
-        if operands_is_empty:
-            exp_result.operand1 = exp_calc.operand1 = self._number_factory.next()
-
-        # branches by operator
-        if operator == Operator.ADD:
-            ResultIsAvailableResolver._resolve_add(exp_calc)
-        elif operator == Operator.SUB:
-            ResultIsAvailableResolver._resolve_sub(exp_calc, exp_result)
-        elif operator == Operator.MUL:
-            if not self._resolve_mul(
-                exp_calc, exp_result, operands_is_empty, expression
-            ):
+        code = operator.code
+        if code == OP_EQ:
+            raise RuntimeError(f"Invalid operator: {operator}")
+        if operand1 is None and operand2 is None:
+            operand1 = self._number_factory.next()
+            if code == OP_MUL:
+                # one operand must be dividable by result
+                try:
+                    operand1 = self._number_factory.next(
+                        dividable_by=result,
+                        zero_allowed=False,
+                    )
+                except ValueError as e:
+                    if expression.operator is None:
+                        return None
+                    raise ExpressionResolverNotResolvable(
+                        expression=expression, parent=e
+                    )
+            elif code == OP_DIV:
+                # make the simplest case with multiplication
+                operand1 = None
+                operand2 = self._number_factory.next()
+
+        if operand1 is None:
+            # a + b = c -> c - b = a, a - b = c -> c + b = a,
+            # a * b = c -> c / b = a, a / b = c -> c * b = a
+            calc_operator = INVERSE_OPERATORS[code]
+            if is_zero_division(calc_operator, operand2):
                 return None
-        elif operator == Operator.DIV:
-            self._resolve_div(exp_calc, exp_result, operands_is_empty)
+            operand1 = self._calculate(result, calc_operator, operand2)
+        elif operand2 is None:
+            if COMMUTATIVE_OPERATORS[code]:
+                # a + b = c -> c - a = b, a * b = c -> c / a = b
+                calc_operator = INVERSE_OPERATORS[code]
+                if is_zero_division(calc_operator, operand1):
+                    return None
+                operand2 = self._calculate(result, calc_operator, operand1)
+            else:
+                # a - b = c -> a - c = b, a / b = c -> a / c = b
+                if is_zero_division(operator, result):
+                    return None
+                operand2 = self._calculate(operand1, operator, result)
         else:
-            raise RuntimeError(f"Invalid operator: {operator}")
+            raise RuntimeError("Invalid state: only one operand is missing")
 
-        if not self._calculate_result(exp_calc, exp_result):
+        if not self._validator.validate_values(operand1, operator, operand2, result):
             return None
-
+        exp_result = Expression.create(operand1, operator, operand2, result)
         if not expression.is_match(exp_result):
             raise RuntimeError(f"Result is not match: {expression} vs {exp_result}")
-        if not self._validator.validate(exp_result):
-            return None
         return exp_result
-
-    @staticmethod
-    def _resolve_add(exp_calc: Expression):
-        # a + b = c
-        # a + ? = c -> c - a = b
-        # ? + b = c -> c - b = a
-        exp_calc.operator = Operator.SUB
-
-    @staticmethod
-    def _resolve_sub(exp_calc: Expression, exp_result: Expression):
-        # a - b = c
-        if exp_result.operand1 is None:
-            # ? - b = c -> c + b = a
-            exp_calc.operator = Operator.ADD
-            return
-        #  a - ? = c -> a - c = b
-        exp_calc.operator = Operator.SUB
-        _tmp = exp_calc.operand1
-        exp_calc.operand1 = exp_calc.result
-        exp_calc.result = _tmp
-
-    def _resolve_div(
-        self, exp_calc: Expression, exp_result: Expression, operands_is_empty: bool
-    ):
-        # a / b = c
-        if operands_is_empty:
-            # make the simplest case with multiplication
-            exp_result.operand1 = exp_calc.operand1 = None
-            exp_result.operand2 = exp_calc.operand2 = self._number_factory.next()
-        if exp_calc.operand1 is None:
-            # ? / b = c -> b * c = ?
-            exp_calc.operator = Operator.MUL
-            return
-        # a / ? = c -> a / c = ?
-        exp_calc.operator = Operator.DIV
-        _tmp = exp_calc.operand1
-        exp_calc.operand1 = exp_calc.result
-        exp_calc.result = _tmp
-
-    def _resolve_mul(
-        self,
-        exp_calc: Expression,
-        exp_result: Expression,
-        operands_is_empty: bool,
-        expression: Expression,
-    ) -> bool:
-        # a * b = c
-        # a * ? = c -> c / a = b
-        # ? * b = c -> c / b = a
-        exp_calc.operator = Operator.DIV
-        if not operands_is_empty:
-            # one operand is missing -> will be calculated
-            return True
-
-        # one operand must be dividable by result
-        try:
-            exp_result.operand1 = exp_calc.operand1 = self._number_factory.next(
-                dividable_by=exp_result.result,
-                zero_allowed=False,
-            )
-            return True
-        except ValueError as e:
-            if expression.operator is None:
-                return False
-            raise ExpressionResolverNotResolvable(expression=expression, parent=e)
-
-    def _calculate_result(self, exp_calc: Expression, exp_result: Expression) -> bool:
-        if exp_result.operand1 is None:
-            if is_zero_division(exp_calc.operator, exp_calc.operand2):
-                return False
-            exp_result.operand1 = self._calculate(
-                exp_calc.result, exp_calc.operator, exp_calc.operand2
-            )
-            return True
-        if exp_result.operand2 is None:
-            if is_zero_division(exp_calc.operator, exp_calc.operand1):
-                return False
-            exp_result.operand2 = self._calculate(
-                exp_calc.result, exp_calc.operator, exp_calc.operand1
-            )
-            return True
-        raise RuntimeError("Invalid state: only one operand is missing")
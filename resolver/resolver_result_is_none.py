@@ -1,7 +1,6 @@
-import random
-
+from arithmetic import is_zero_division
 from expression import ExpressionValidator, Expression
-from operator_factory import Operator, OperatorFactory
+from operator_factory import OP_DIV, OP_SUB, Operator, OperatorFactory
 from number_factory import NumberFactory
 from number_helper import number_is_zero
 from resolver.resolver_base import ExpressionResolverBase
@@ -18,17 +17,38 @@ class ResultIsNoneResolver(ExpressionResolverBase):
         validator: ExpressionValidator,
         number_factory: NumberFactory,
         operator_factory: OperatorFactory,
+        candidates_per_attempt: int = 1,
     ):
+        """
+        :param candidates_per_attempt: The number of the candidates of an
+                                       attempt with a missing operand, they
+                                       are validated at once (see
+                                       ExpressionValidator.validate_many).
+                                       The batch is slower than the scalar
+                                       tries for the usual ranges, 1 turns
+                                       it off.
+        """
         super().__init__(validator, number_factory, operator_factory)
+        if candidates_per_attempt < 1:
+            raise ValueError(
+                f"Candidates per attempt must be greater than 0: {candidates_per_attempt}"
+            )
         self._resolve_maximum_loop_count = 8
+        self._candidates_per_attempt = candidates_per_attempt
 
     def match(self, expression: Expression) -> bool:
         return expression.result is None
 
     def resolve(self, expression: Expression) -> Expression:
         operators = self._operators(expression)
+        try_resolve = (
+            self._try_resolve_many
+            if self._candidates_per_attempt > 1
+            and (expression.operand1 is None or expression.operand2 is None)
+            else self._try_resolve
+        )
         for _ in range(self._resolve_maximum_loop_count):
-            result = self._try_resolve(expression, operators)
+            result = try_resolve(expression, operators)
             if result is not None:
                 return result
 
@@ -40,51 +60,107 @@ class ResultIsNoneResolver(ExpressionResolverBase):
     def _try_resolve(
         self, expression: Expression, operators: list[Operator]
     ) -> Expression | None:
-        exp_result = expression.clone()
-        if exp_result.operator is None:
-            try:
-                exp_result.operator = next(operators)
-            except StopIteration:
-                raise ExpressionResolverNotResolvable(expression=expression)
-        if exp_result.operator == Operator.DIV and number_is_zero(exp_result.operand2):
+        """
+        One resolve attempt, the expression is built only if it is valid
+        """
+        operator = self._next_operator(expression, operators)
+        operand1 = expression.operand1
+        operand2 = expression.operand2
+        if is_zero_division(operator, operand2):
             return None
-        if exp_result.operand1 is None:
-            exp_result.operand1 = self._number_factory.next()
-        if exp_result.operand2 is None:
-            if not self._fill_operand2(exp_result, expression):
+        if operand1 is None:
+            operand1 = self._number_factory.next()
+        if operand2 is None:
+            operand2 = self._next_operand2(operand1, operator, expression)
+            if operand2 is None:
                 return None
-        exp_result.result = self._calculate(
-            exp_result.operand1, exp_result.operator, exp_result.operand2
-        )
-
+        result = self._calculate(operand1, operator, operand2)
+        if not self._validator.validate_values(operand1, operator, operand2, result):
+            return None
+        exp_result = Expression.create(operand1, operator, operand2, result)
         if not expression.is_match(exp_result):
             raise RuntimeError(f"Result is not match: {expression} vs {exp_result}")
-        if not self._validator.validate(exp_result):
+        return exp_result
+
+    def _try_resolve_many(
+        self, expression: Expression, operators: list[Operator]
+    ) -> Expression | None:
+        """
+        One resolve attempt with candidates_per_attempt candidates, the first
+        valid one is built
+        """
+        import numpy
+
+        operator = self._next_operator(expression, operators)
+        if is_zero_division(operator, expression.operand2):
+            return None
+        operands1 = []
+        operands2 = []
+        results = []
+        for _ in range(self._candidates_per_attempt):
+            operand1 = expression.operand1
+            if operand1 is None:
+                operand1 = self._number_factory.next()
+            operand2 = expression.operand2
+            if operand2 is None:
+                operand2 = self._next_operand2(operand1, operator, expression)
+                if operand2 is None:
+                    continue
+            operands1.append(operand1)
+            operands2.append(operand2)
+            results.append(self._calculate(operand1, operator, operand2))
+        if not results:
             return None
+        dtype = self._validator.get_array_dtype()
+        mask = self._validator.validate_many(
+            numpy.array(operands1, dtype=dtype),
+            numpy.full(len(results), operator.code),
+            numpy.array(operands2, dtype=dtype),
+            numpy.array(results, dtype=dtype),
+        )
+        valid = numpy.flatnonzero(mask)
+        if len(valid) == 0:
+            return None
+        i = int(valid[0])
+        exp_result = Expression.create(operands1[i], operator, operands2[i], results[i])
+        if not expression.is_match(exp_result):
+            raise RuntimeError(f"Result is not match: {expression} vs {exp_result}")
         return exp_result
 
-    def _fill_operand2(self, exp_result: Expression, expression: Expression) -> bool:
-        if exp_result.operator == Operator.SUB:
+    def _next_operator(
+        self, expression: Expression, operators: list[Operator]
+    ) -> Operator:
+        if expression.operator is not None:
+            return expression.operator
+        try:
+            return next(operators)
+        except StopIteration:
+            raise ExpressionResolverNotResolvable(expression=expression)
+
+    def _next_operand2(
+        self, operand1: float | int, operator: Operator, expression: Expression
+    ) -> float | int | None:
+        """
+        :return: The operand2 or None if there is no one for the operator
+        """
+        code = operator.code
+        if code == OP_SUB:
             try:
-                exp_result.operand2 = self._number_factory.next(
-                    maximum=exp_result.operand1
-                )
+                return self._number_factory.next(maximum=operand1)
             except ValueError as e:
                 raise ExpressionResolverNotResolvable(expression=expression, parent=e)
-        elif exp_result.operator == Operator.DIV:
+        if code == OP_DIV:
             try:
-                exp_result.operand2 = self._number_factory.next(
-                    maximum=exp_result.operand1,
-                    dividable_by=exp_result.operand1,
+                return self._number_factory.next(
+                    maximum=operand1,
+                    dividable_by=operand1,
                     zero_allowed=False,
                 )
             except ValueError as e:
                 if expression.operator is None:
-                    return False
+                    return None
                 raise ExpressionResolverNotResolvable(expression=expression, parent=e)
-        else:
-            exp_result.operand2 = self._number_factory.next()
-        return True
+        return self._number_factory.next()
 
     def _operators(self, expression: Expression) -> list[Operator]:
         if expression.operator is not None:
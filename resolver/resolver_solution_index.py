@@ -0,0 +1,247 @@
+import math
+from operator import itemgetter
+from typing import Tuple
+
+from expression import Expression, ExpressionValidator
+from number_factory import NumberFactory
+from number_helper import number_fix
+from operator_factory import OP_ADD, OP_DIV, OP_MUL, OP_SUB, Operator, OperatorFactory
+from resolver.resolver_base import ExpressionResolverBase
+from resolver.resolver_exceptions import ExpressionResolverNotResolvable
+
+# (operand1, operator, operand2, result), the numbers are in lattice units
+Solution = Tuple[int, Operator, int, int]
+Pattern = Tuple[int | None, Operator | None, int | None, int | None]
+
+
+class ExpressionSolutionIndex:
+    """
+    Index of every valid expression of a number factory and validator configuration
+
+    The operands are the factory numbers, the results are the numbers of the
+    factory step in the validator range. The numbers are stored in lattice
+    units (see NumberFactory.to_lattice_units). The solutions are indexed by
+    the known fields of the pattern: the patterns with one known field or
+    with a known operator and one known number are built up front, the more
+    specific ones are filtered from them on first use and kept.
+    """
+
+    # known field masks: operand1 = 1, operator = 2, operand2 = 4, result = 8
+    _PRIMARY_MASKS = (1, 2, 4, 8, 3, 6, 10)
+
+    def __init__(
+        self,
+        number_factory: NumberFactory,
+        validator: ExpressionValidator,
+        operators: list[Operator] | None = None,
+    ):
+        self._number_factory = number_factory
+        self._operators = (
+            operators if operators is not None else Operator.get_operators_without_eq()
+        )
+        self._scale = 10 ** number_factory.get_decimals()
+        self._step = number_factory.get_lattice_step()
+        self._operand_range = self._units_range(
+            max(number_factory.get_minimum(), validator.get_minimum()),
+            min(number_factory.get_maximum(), validator.get_maximum()),
+        )
+        self._result_range = self._units_range(
+            validator.get_minimum(), validator.get_maximum()
+        )
+        self._solutions: list[Solution] = self._build_solutions()
+        self._buckets: dict[int, dict[tuple, list[Solution]]] = {
+            mask: {} for mask in range(1, 16)
+        }
+        for mask in ExpressionSolutionIndex._PRIMARY_MASKS:
+            buckets = self._buckets[mask]
+            get_key = itemgetter(*ExpressionSolutionIndex._fields(mask))
+            for solution in self._solutions:
+                key = get_key(solution)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = [solution]
+                else:
+                    bucket.append(solution)
+
+    def _units_range(self, minimum: float, maximum: float) -> Tuple[int, int]:
+        minimum_units = math.ceil(number_fix(minimum * self._scale))
+        maximum_units = math.floor(number_fix(maximum * self._scale))
+        return (
+            -(-minimum_units // self._step) * self._step,
+            maximum_units // self._step * self._step,
+        )
+
+    def _build_solutions(self) -> list[Solution]:
+        scale = self._scale
+        step = self._step
+        result_minimum, result_maximum = self._result_range
+        operands = range(self._operand_range[0], self._operand_range[1] + 1, step)
+        solutions = []
+        for operator in self._operators:
+            code = operator.code
+            for operand1 in operands:
+                for operand2 in operands:
+                    if code == OP_ADD:
+                        result = operand1 + operand2
+                    elif code == OP_SUB:
+                        result = operand1 - operand2
+                    elif code == OP_MUL:
+                        result, remainder = divmod(operand1 * operand2, scale)
+                        if remainder != 0:
+                            continue
+                    elif code == OP_DIV:
+                        if operand2 == 0:
+                            continue
+                        result, remainder = divmod(operand1 * scale, operand2)
+                        if remainder != 0:
+                            continue
+                    else:
+                        raise ValueError(f"Not supported operator: {operator}")
+                    if result % step != 0:
+                        continue
+                    if not result_minimum <= result <= result_maximum:
+                        continue
+                    solutions.append((operand1, operator, operand2, result))
+        return solutions
+
+    @staticmethod
+    def _fields(mask: int) -> Tuple[int, ...]:
+        return tuple(field for field in range(4) if mask & (1 << field))
+
+    def __len__(self) -> int:
+        return len(self._solutions)
+
+    def to_pattern(self, expression: Expression) -> Pattern | None:
+        """
+        Convert the expression to an index pattern
+
+        :return: The pattern or None if a known field is out of the index
+        """
+        if expression.operator is not None and expression.operator not in self._operators:
+            return None
+        operand1 = self._to_units(expression.operand1, self._operand_range)
+        operand2 = self._to_units(expression.operand2, self._operand_range)
+        result = self._to_units(expression.result, self._result_range)
+        if (
+            operand1 is False
+            or operand2 is False
+            or result is False
+        ):
+            return None
+        return operand1, expression.operator, operand2, result
+
+    def _to_units(
+        self, value: float | int | None, units_range: Tuple[int, int]
+    ) -> int | None | bool:
+        if value is None:
+            return None
+        units = self._number_factory.to_lattice_units(value)
+        if units is None or units % self._step != 0:
+            return False
+        if not units_range[0] <= units <= units_range[1]:
+            return False
+        return units
+
+    def to_expression(self, solution: Solution) -> Expression:
+        expression = Expression()
+        expression.operand1 = self._number_factory.from_lattice_units(solution[0])
+        expression.operator = solution[1]
+        expression.operand2 = self._number_factory.from_lattice_units(solution[2])
+        expression.result = self._number_factory.from_lattice_units(solution[3])
+        return expression
+
+    def get_solutions(self, pattern: Pattern) -> list[Solution]:
+        """
+        Returns every solution of the pattern (do not modify the list)
+        """
+        mask = 0
+        for field in range(4):
+            if pattern[field] is not None:
+                mask |= 1 << field
+        if mask == 0:
+            return self._solutions
+        key = ExpressionSolutionIndex._key(pattern)
+        buckets = self._buckets[mask]
+        bucket = buckets.get(key)
+        if bucket is not None:
+            return bucket
+        if mask in ExpressionSolutionIndex._PRIMARY_MASKS:
+            return []
+        bucket = [
+            solution
+            for solution in self._smallest_primary_bucket(mask, pattern)
+            if all(
+                solution[field] == pattern[field]
+                for field in ExpressionSolutionIndex._fields(mask)
+            )
+        ]
+        buckets[key] = bucket
+        return bucket
+
+    @staticmethod
+    def _key(pattern: Pattern) -> tuple | int | Operator:
+        """
+        Returns the bucket key: the known field or the tuple of the known fields
+        """
+        key = tuple(value for value in pattern if value is not None)
+        return key[0] if len(key) == 1 else key
+
+    def _smallest_primary_bucket(self, mask: int, pattern: Pattern) -> list[Solution]:
+        smallest = None
+        for primary_mask in ExpressionSolutionIndex._PRIMARY_MASKS:
+            if primary_mask & mask != primary_mask:
+                continue
+            key = itemgetter(*ExpressionSolutionIndex._fields(primary_mask))(pattern)
+            bucket = self._buckets[primary_mask].get(key, [])
+            if smallest is None or len(bucket) < len(smallest):
+                smallest = bucket
+        return smallest
+
+
+class SolutionIndexResolver(ExpressionResolverBase):
+    """
+    Resolve the expression with one random pick from the solution index
+
+    Matches the expressions whose known fields are in the index, for these
+    an empty bucket is a definite not resolvable answer.
+    """
+
+    def __init__(
+        self,
+        validator: ExpressionValidator,
+        number_factory: NumberFactory,
+        operator_factory: OperatorFactory,
+        solution_index: ExpressionSolutionIndex,
+    ):
+        super().__init__(validator, number_factory, operator_factory)
+        self._solution_index = solution_index
+
+    def match(self, expression: Expression) -> bool:
+        return self._solution_index.to_pattern(expression) is not None
+
+    def resolve(self, expression: Expression) -> Expression:
+        operand1, operator, operand2, result = self._solution_index.to_pattern(
+            expression
+        )
+        if operator is None:
+            operators = self._operator_factory.operators()
+            operator_excludes = [
+                operator
+                for operator in operators
+                if not self._solution_index.get_solutions(
+                    (operand1, operator, operand2, result)
+                )
+            ]
+            if len(operator_excludes) == len(operators):
+                raise ExpressionResolverNotResolvable(expression=expression)
+            operator = self._operator_factory.next_weighted_operator(
+                excludes=operator_excludes
+            )
+        solutions = self._solution_index.get_solutions(
+            (operand1, operator, operand2, result)
+        )
+        if not solutions:
+            raise ExpressionResolverNotResolvable(expression=expression)
+        random_generator = self._number_factory.get_random_generator()
+        solution = solutions[random_generator.next_int(len(solutions) - 1)]
+        return self._solution_index.to_expression(solution)
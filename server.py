@@ -0,0 +1,731 @@
+"""
+Board serving daemon
+
+An asyncio HTTP/1.1 server (TCP or unix socket, no external dependencies)
+which hands out pre-generated boards. Every parameter set has a bounded
+pool of boards, a served board is replaced in the background by a worker
+of a process pool (see batch.generate_board).
+
+Endpoints:
+    GET /board?width=&height=&min=&max=&step=&fixed_point=&validator_min=&validator_max=
+        a board as JSON lines (see expression_map_io.dump_jsonl), the
+        omitted parameters are the ones of the configuration (see main.py).
+        The numbers of a fixed-point board are integers scaled by
+        10**decimals, the decimals are in the header line.
+    GET /metrics
+        the pool depths, the refill latencies, the counters and the running
+        generations as JSON
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterator
+from urllib.parse import parse_qs, urlsplit
+
+import batch
+import main
+from expression_map_io import dump_jsonl
+from metrics import GenerationMetrics
+
+MAX_BOARD_SIZE = 1000
+# the bounds of the number factory and validator ranges
+MAX_ABS_NUMBER = 10**6
+MIN_STEP = 0.0001
+# the maximum number of the steps between the number factory bounds
+MAX_LATTICE_SIZE = 10**7
+
+# the maximum number of the parameter sets with a state in a worker process
+MAX_WORKER_STATES = 4
+
+# per worker process state (solution index, negative cache, completion memo)
+# by parameter key, least recently used first, see _generate_board
+_worker_states: OrderedDict[tuple, tuple] = OrderedDict()
+
+
+class BoardParameters:
+    """
+    The parameter set of the boards of a pool
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        number_factory_min: float,
+        number_factory_max: float,
+        number_factory_step: float,
+        number_factory_fixed_point: bool,
+        validator_min: float,
+        validator_max: float,
+    ):
+        for name, size in (("Width", width), ("Height", height)):
+            if not 1 <= size <= MAX_BOARD_SIZE:
+                raise ValueError(
+                    f"{name} must be between 1 and {MAX_BOARD_SIZE}: {size}"
+                )
+        for name, value in (
+            ("Minimum", number_factory_min),
+            ("Maximum", number_factory_max),
+            ("Validator minimum", validator_min),
+            ("Validator maximum", validator_max),
+        ):
+            # also rejects nan
+            if not (math.isfinite(value) and abs(value) <= MAX_ABS_NUMBER):
+                raise ValueError(
+                    f"{name} must be between {-MAX_ABS_NUMBER} and "
+                    f"{MAX_ABS_NUMBER}: {value}"
+                )
+        if not (math.isfinite(number_factory_step) and number_factory_step >= MIN_STEP):
+            raise ValueError(
+                f"Step must be at least {MIN_STEP}: {number_factory_step}"
+            )
+        if number_factory_min > number_factory_max:
+            raise ValueError(
+                f"Minimum is greater than maximum: {number_factory_min} > {number_factory_max}"
+            )
+        if validator_min > validator_max:
+            raise ValueError(
+                f"Validator minimum is greater than maximum: {validator_min} > {validator_max}"
+            )
+        lattice_size = (number_factory_max - number_factory_min) / number_factory_step
+        if lattice_size > MAX_LATTICE_SIZE:
+            raise ValueError(
+                f"Too many steps between minimum and maximum (at most "
+                f"{MAX_LATTICE_SIZE}): {lattice_size:.0f}"
+            )
+        self.width = width
+        self.height = height
+        self.number_factory_min = number_factory_min
+        self.number_factory_max = number_factory_max
+        self.number_factory_step = number_factory_step
+        self.number_factory_fixed_point = number_factory_fixed_point
+        self.validator_min = validator_min
+        self.validator_max = validator_max
+
+    @staticmethod
+    def from_configuration() -> "BoardParameters":
+        """
+        Returns the parameters of the configuration, see main.py
+        """
+        return BoardParameters(
+            width=main.WIDTH,
+            height=main.HEIGHT,
+            number_factory_min=main.NUMBER_FACTORY_MIN,
+            number_factory_max=main.NUMBER_FACTORY_MAX,
+            number_factory_step=main.NUMBER_FACTORY_STEP,
+            number_factory_fixed_point=main.NUMBER_FACTORY_FIXED_POINT,
+            validator_min=main.VALIDATOR_MIN,
+            validator_max=main.VALIDATOR_MAX,
+        )
+
+    def with_query(self, query: dict[str, list[str]]) -> "BoardParameters":
+        """
+        Returns the parameters overridden by the query parameters
+
+        :raises ValueError: Unknown or invalid query parameter
+        """
+        unknown = set(query) - set(_QUERY_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+        values = self.to_dict()
+        for name, (attribute, convert) in _QUERY_PARAMETERS.items():
+            if name in query:
+                values[attribute] = convert(query[name][-1])
+        return BoardParameters(**values)
+
+    def to_dict(self) -> dict:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "number_factory_min": self.number_factory_min,
+            "number_factory_max": self.number_factory_max,
+            "number_factory_step": self.number_factory_step,
+            "number_factory_fixed_point": self.number_factory_fixed_point,
+            "validator_min": self.validator_min,
+            "validator_max": self.validator_max,
+        }
+
+    def key(self) -> tuple:
+        return tuple(self.to_dict().values())
+
+    def apply(self):
+        """
+        Set the parameters as the configuration of this process
+
+        main.py keeps its configuration in module globals, so only a worker
+        process (one board at a time) may apply parameters.
+        """
+        main.WIDTH = self.width
+        main.HEIGHT = self.height
+        main.NUMBER_FACTORY_MIN = self.number_factory_min
+        main.NUMBER_FACTORY_MAX = self.number_factory_max
+        main.NUMBER_FACTORY_STEP = self.number_factory_step
+        main.NUMBER_FACTORY_FIXED_POINT = self.number_factory_fixed_point
+        main.VALIDATOR_MIN = self.validator_min
+        main.VALIDATOR_MAX = self.validator_max
+
+
+def _parse_bool(value: str) -> bool:
+    if value not in ("0", "1"):
+        raise ValueError(f"Invalid flag (0 or 1): {value}")
+    return value == "1"
+
+
+# query parameter -> (BoardParameters attribute, conversion)
+_QUERY_PARAMETERS = {
+    "width": ("width", int),
+    "height": ("height", int),
+    "min": ("number_factory_min", float),
+    "max": ("number_factory_max", float),
+    "step": ("number_factory_step", float),
+    "fixed_point": ("number_factory_fixed_point", _parse_bool),
+    "validator_min": ("validator_min", float),
+    "validator_max": ("validator_max", float),
+}
+
+
+def _generate_board(parameters: BoardParameters, seed: int) -> str:
+    """
+    Generate a board in a worker process
+
+    :return: The board as JSON lines
+    """
+    parameters.apply()
+    # the state of batch._init_worker depends on the parameters
+    key = parameters.key()
+    state = _worker_states.get(key)
+    if state is None:
+        state = _worker_states[key] = (
+            main.create_solution_index(),
+            main.create_negative_cache(),
+            main.create_completion_memo(),
+        )
+        if len(_worker_states) > MAX_WORKER_STATES:
+            _worker_states.popitem(last=False)
+    else:
+        _worker_states.move_to_end(key)
+    batch._solution_index, batch._negative_cache, batch._completion_memo = state
+    result = batch.generate_board(0, seed)
+    buffer = io.StringIO()
+    dump_jsonl(result.exp_map, buffer, scale=result.number_factory.get_scale())
+    return buffer.getvalue()
+
+
+class BoardPoolException(Exception):
+    pass
+
+
+class BoardPool:
+    """
+    Bounded pool of the boards of a parameter set
+
+    The pool keeps capacity boards (plus one per waiting request) generated
+    or in generation, a board is generated as soon as one is taken. The
+    generations are started by the server (see BoardServer.dispatch), which
+    shares the worker processes between the pools.
+
+    A failed generation delays the refill, the delay doubles with every
+    consecutive failure. After MAX_FAILURES consecutive failures the pool
+    is broken: the requests fail at once until BROKEN_SEC has passed, then
+    one more generation is tried.
+    """
+
+    # the delay of the refill after the first failed generation
+    RETRY_DELAY_SEC = 1.0
+    MAX_RETRY_DELAY_SEC = 30.0
+    MAX_FAILURES = 5
+    BROKEN_SEC = 60.0
+
+    def __init__(
+        self,
+        parameters: BoardParameters,
+        capacity: int,
+        seeds: Iterator[int],
+        dispatch: Callable[[], None],
+    ):
+        """
+        :param capacity: The number of the ready boards
+        :param seeds: The seeds of the boards
+        :param dispatch: Start the generations the pools need, see demand
+        """
+        if capacity < 1:
+            raise ValueError(f"Capacity must be greater than 0: {capacity}")
+        self._parameters = parameters
+        self._capacity = capacity
+        self._seeds = seeds
+        self._dispatch = dispatch
+        self._boards: deque[str] = deque()
+        self._waiters: deque[asyncio.Future] = deque()
+        # the generations in the executor
+        self._futures: set[asyncio.Future] = set()
+        self._pending = 0
+        self._last_refill_sec: float | None = None
+        self._metrics = GenerationMetrics()
+        self._closed = False
+        self._failures = 0
+        # the loop time until the refill is delayed, see _on_failed
+        self._retry_at = 0.0
+        self._retry_handle: asyncio.TimerHandle | None = None
+        self._last_error: str | None = None
+
+    def get_parameters(self) -> BoardParameters:
+        return self._parameters
+
+    def depth(self) -> int:
+        """
+        Returns the number of the ready boards
+        """
+        return len(self._boards)
+
+    def is_waited(self) -> bool:
+        """
+        Returns whether a request waits for a board
+        """
+        return bool(self._waiters)
+
+    def is_broken(self) -> bool:
+        """
+        Returns whether the generation keeps failing, see BoardPool
+        """
+        return (
+            self._failures >= self.MAX_FAILURES
+            and asyncio.get_running_loop().time() < self._retry_at
+        )
+
+    def demand(self) -> int:
+        """
+        Returns the number of the generations to start
+        """
+        if self._closed or asyncio.get_running_loop().time() < self._retry_at:
+            return 0
+        if self._failures >= self.MAX_FAILURES:
+            # broken pool: one generation at a time until it succeeds
+            return 1 - self._pending
+        return self._capacity + len(self._waiters) - len(self._boards) - self._pending
+
+    def refill(self):
+        """
+        Start the generation of the missing boards (as the workers allow)
+        """
+        self._dispatch()
+
+    def submit(self, executor: Executor) -> asyncio.Future:
+        """
+        Start the generation of a board
+
+        :return: The future of the generation
+        """
+        start_time = self._metrics.start_timer()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                executor, _generate_board, self._parameters, next(self._seeds)
+            )
+        except Exception as e:
+            # e.g. a broken process pool
+            self._on_failed(e)
+            raise
+        self._pending += 1
+        self._futures.add(future)
+        future.add_done_callback(
+            lambda done, start_time=start_time: self._on_generated(done, start_time)
+        )
+        return future
+
+    async def get(self, timeout: float | None = None) -> str:
+        """
+        Take a board, wait for the next generated one if the pool is empty
+
+        :raises asyncio.TimeoutError: No board in timeout seconds
+        :raises BoardPoolException: The generation keeps failing
+        """
+        if self._boards:
+            board = self._boards.popleft()
+            try:
+                self.refill()
+            except Exception:
+                self._boards.appendleft(board)
+                raise
+            self._metrics.count("pool.served")
+            return board
+        if self.is_broken():
+            self._metrics.count("pool.rejected")
+            raise BoardPoolException(f"Board generation is failing: {self._last_error}")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            self.refill()
+        except Exception:
+            self._waiters.remove(waiter)
+            raise
+        self._metrics.count("pool.misses")
+        try:
+            board = await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            self._metrics.count("pool.timeouts")
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if waiter.done() and not waiter.cancelled() and not waiter.exception():
+                # generated meanwhile, keep it for the next request
+                self._boards.append(waiter.result())
+            raise
+        self._metrics.count("pool.served")
+        return board
+
+    def _on_generated(self, future: asyncio.Future, start_time: float):
+        self._pending -= 1
+        self._futures.discard(future)
+        if self._closed or future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._on_failed(error)
+            return
+        self._failures = 0
+        self._last_refill_sec = time.perf_counter() - start_time
+        self._metrics.stop_timer("pool.refill", start_time)
+        board = future.result()
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(board)
+                break
+        else:
+            self._boards.append(board)
+        self.refill()
+
+    def _on_failed(self, error: BaseException):
+        self._metrics.count("pool.refill_failures")
+        self._failures += 1
+        self._last_error = repr(error)
+        print(f"Board generation failed: {error!r}", file=sys.stderr)
+        loop = asyncio.get_running_loop()
+        if self._failures >= self.MAX_FAILURES:
+            delay = self.BROKEN_SEC
+            for waiter in self._waiters:
+                if not waiter.done():
+                    waiter.set_exception(
+                        BoardPoolException(f"Board generation is failing: {error!r}")
+                    )
+            self._waiters.clear()
+        else:
+            delay = min(
+                self.RETRY_DELAY_SEC * 2 ** (self._failures - 1),
+                self.MAX_RETRY_DELAY_SEC,
+            )
+        if self._retry_handle is not None:
+            self._retry_handle.cancel()
+        self._retry_at = loop.time() + delay
+        self._retry_handle = loop.call_later(delay, self.refill)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the state and the metrics of the pool
+        """
+        snapshot = self._metrics.snapshot()
+        refill = snapshot["timers"].get("pool.refill", {"count": 0, "total_sec": 0.0})
+        return {
+            "parameters": self._parameters.to_dict(),
+            "depth": len(self._boards),
+            "capacity": self._capacity,
+            "pending": self._pending,
+            "waiting": len(self._waiters),
+            "failures": self._failures,
+            "broken": self.is_broken(),
+            "refill": {
+                "count": refill["count"],
+                "mean_sec": (
+                    refill["total_sec"] / refill["count"] if refill["count"] else None
+                ),
+                "last_sec": self._last_refill_sec,
+            },
+            "counters": snapshot["counters"],
+        }
+
+    def close(self):
+        """
+        Stop the pool, the generations not started yet are cancelled
+        """
+        self._closed = True
+        if self._retry_handle is not None:
+            self._retry_handle.cancel()
+        for future in list(self._futures):
+            future.cancel()
+        for waiter in self._waiters:
+            waiter.cancel()
+        self._waiters.clear()
+
+
+class BoardServer:
+    """
+    HTTP front of the board pools
+    """
+
+    def __init__(
+        self,
+        parameters: BoardParameters | None = None,
+        capacity: int = 8,
+        jobs: int | None = None,
+        max_pools: int = 16,
+        seed: int | None = None,
+        wait_timeout: float = 30.0,
+        executor: Executor | None = None,
+    ):
+        """
+        :param parameters: The default parameters (of the configuration by default)
+        :param capacity: The number of the ready boards per parameter set
+        :param jobs: The number of the worker processes (CPU count by default),
+                     at most jobs generations are submitted at a time
+        :param max_pools: The maximum number of the parameter sets, the least
+                          recently used idle pool is dropped for a new one
+        :param seed: The seed of the boards, random by default
+        :param wait_timeout: The maximum wait for a board of an empty pool
+        :param executor: The generator processes (a process pool by default)
+        """
+        self._parameters = parameters or BoardParameters.from_configuration()
+        self._capacity = capacity
+        self._max_pools = max_pools
+        self._seed = seed if seed is not None else random.SystemRandom().getrandbits(63)
+        self._wait_timeout = wait_timeout
+        self._executor = executor or ProcessPoolExecutor(max_workers=jobs)
+        self._max_jobs = jobs or os.cpu_count() or 1
+        self._running_jobs = 0
+        # parameter key -> pool, least recently used first
+        self._pools: OrderedDict[tuple, BoardPool] = OrderedDict()
+        self._pool_count = 0
+        self._closed = False
+        self._servers: list[asyncio.AbstractServer] = []
+
+    def get_pool(self, parameters: BoardParameters) -> BoardPool:
+        """
+        Returns the pool of the parameters, a new pool is started on first use
+
+        :raises BoardPoolException: Too many busy parameter sets
+        """
+        key = parameters.key()
+        pool = self._pools.get(key)
+        if pool is not None:
+            self._pools.move_to_end(key)
+            return pool
+        if len(self._pools) >= self._max_pools:
+            self._evict_pool()
+        pool = self._pools[key] = BoardPool(
+            parameters,
+            self._capacity,
+            self._iter_seeds(self._pool_count),
+            self.dispatch,
+        )
+        self._pool_count += 1
+        pool.refill()
+        return pool
+
+    def _evict_pool(self):
+        """
+        Drop the least recently used pool without waiting requests, the pool
+        of the default parameters is kept
+        """
+        default_key = self._parameters.key()
+        for key, pool in self._pools.items():
+            if key != default_key and not pool.is_waited():
+                del self._pools[key]
+                pool.close()
+                return
+        raise BoardPoolException(f"Too many busy parameter sets ({self._max_pools})")
+
+    def dispatch(self):
+        """
+        Start the generations of the pools while a worker is free
+
+        A free worker goes to a pool with waiting requests first, then to the
+        pool of the default parameters, then to the emptiest pool. Only the
+        started generations are in the executor, so the work of a dropped
+        pool does not delay the other pools.
+        """
+        while self._running_jobs < self._max_jobs:
+            pool = self._next_pool()
+            if pool is None:
+                return
+            future = pool.submit(self._executor)
+            self._running_jobs += 1
+            future.add_done_callback(self._on_job_done)
+
+    def _next_pool(self) -> BoardPool | None:
+        default_key = self._parameters.key()
+        candidates = [
+            (not pool.is_waited(), key != default_key, pool.depth(), index)
+            for index, (key, pool) in enumerate(self._pools.items())
+            if pool.demand() > 0
+        ]
+        if not candidates:
+            return None
+        pools = list(self._pools.values())
+        return pools[min(candidates)[3]]
+
+    def _on_job_done(self, future: asyncio.Future):
+        self._running_jobs -= 1
+        if not self._closed:
+            self.dispatch()
+
+    def _iter_seeds(self, pool_index: int) -> Iterator[int]:
+        pool_seed = batch.derive_seed(self._seed, pool_index)
+        index = 0
+        while True:
+            yield batch.derive_seed(pool_seed, index)
+            index += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "jobs": {"running": self._running_jobs, "max": self._max_jobs},
+            "pools": [pool.snapshot() for pool in self._pools.values()],
+        }
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 8080, unix: str | None = None
+    ) -> asyncio.AbstractServer:
+        """
+        Start listening and fill the pool of the default parameters
+
+        :param unix: Listen on this unix socket path instead of host and port
+        """
+        if unix is not None:
+            server = await asyncio.start_unix_server(self._handle, path=unix)
+        else:
+            server = await asyncio.start_server(self._handle, host=host, port=port)
+        self._servers.append(server)
+        self.get_pool(self._parameters)
+        return server
+
+    def close(self):
+        self._closed = True
+        for server in self._servers:
+            server.close()
+        for pool in self._pools.values():
+            pool.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                status, content_type, body = await self._respond(reader)
+            except ConnectionError:
+                raise
+            except Exception as e:
+                # e.g. a broken process pool
+                print(f"Request failed: {e!r}", file=sys.stderr)
+                status, content_type, body = _error(
+                    "500 Internal Server Error", f"Internal error: {e!r}"
+                )
+            writer.write(
+                (
+                    f"HTTP/1.1 {status}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode("latin-1")
+                + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+        """
+        :return: The status, the content type and the body of the response
+        """
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            # the headers are not used
+            pass
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return _error("400 Bad Request", "Invalid request line")
+        if method != "GET":
+            return _error("405 Method Not Allowed", f"Not supported method: {method}")
+        url = urlsplit(target)
+        if url.path == "/metrics":
+            return _json("200 OK", self.snapshot())
+        if url.path != "/board":
+            return _error("404 Not Found", f"Not found: {url.path}")
+        try:
+            parameters = self._parameters.with_query(parse_qs(url.query))
+            pool = self.get_pool(parameters)
+        except ValueError as e:
+            return _error("400 Bad Request", str(e))
+        except BoardPoolException as e:
+            return _error("503 Service Unavailable", str(e))
+        try:
+            board = await pool.get(timeout=self._wait_timeout)
+        except asyncio.TimeoutError:
+            return _error("503 Service Unavailable", "No board is ready")
+        except BoardPoolException as e:
+            return _error("503 Service Unavailable", str(e))
+        return "200 OK", "application/x-ndjson", board.encode()
+
+
+def _json(status: str, data: dict) -> tuple[str, str, bytes]:
+    return status, "application/json", json.dumps(data).encode()
+
+
+def _error(status: str, message: str) -> tuple[str, str, bytes]:
+    return _json(status, {"error": message})
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve pre-generated cross math boards over HTTP"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--unix", default=None, help="listen on a unix socket path")
+    parser.add_argument(
+        "--capacity", type=int, default=8, help="ready boards per parameter set"
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes")
+    parser.add_argument(
+        "--max-pools", type=int, default=16, help="maximum number of parameter sets"
+    )
+    parser.add_argument("--seed", type=int, default=None, help="seed of the boards")
+    parser.add_argument(
+        "--wait-timeout",
+        type=float,
+        default=30.0,
+        help="maximum wait for a board of an empty pool in seconds",
+    )
+    return parser.parse_args()
+
+
+async def _serve(args: argparse.Namespace):
+    board_server = BoardServer(
+        capacity=args.capacity,
+        jobs=args.jobs,
+        max_pools=args.max_pools,
+        seed=args.seed,
+        wait_timeout=args.wait_timeout,
+    )
+    try:
+        server = await board_server.start(
+            host=args.host, port=args.port, unix=args.unix
+        )
+        address = args.unix or f"http://{args.host}:{args.port}"
+        print(f"Serving boards on {address}", file=sys.stderr)
+        await server.serve_forever()
+    finally:
+        board_server.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_serve(_parse_args()))
+    except KeyboardInterrupt:
+        pass
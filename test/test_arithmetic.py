@@ -0,0 +1,102 @@
+import pytest
+
+from arithmetic import (
+    calculate,
+    calculate_fixed_point,
+    divide_round,
+    is_exact_fixed_point,
+    is_zero_division,
+    is_in_range,
+)
+from operator_factory import (
+    COMMUTATIVE_OPERATORS,
+    INVERSE_OPERATORS,
+    OPERATORS_BY_CODE,
+    Operator,
+)
+
+
+def lattice(minimum: float, maximum: float, step: float) -> list[float]:
+    count = int(round((maximum - minimum) / step))
+    return [round(minimum + i * step, 6) for i in range(count + 1)]
+
+
+@pytest.mark.parametrize("operator", Operator.get_operators_without_eq())
+def test_calculate_matches_eval(operator: Operator):
+    values = lattice(-20.0, 20.0, 0.3) + [1e-07, -2.5e-05, 123456.789, 0.1]
+    for operand1 in values:
+        for operand2 in values:
+            expression = f"{operand1} {operator} {operand2}"
+            if operator == Operator.DIV and operand2 == 0.0:
+                with pytest.raises(ZeroDivisionError):
+                    eval(expression)
+                with pytest.raises(ZeroDivisionError):
+                    calculate(operand1, operator, operand2)
+                continue
+            expected = eval(expression)
+            assert calculate(operand1, operator, operand2).hex() == expected.hex()
+
+
+def test_calculate_not_supported_operator():
+    with pytest.raises(ValueError):
+        calculate(1.0, Operator.EQ, 1.0)
+    with pytest.raises(ValueError):
+        calculate(1.0, "+", 1.0)
+    with pytest.raises(ValueError):
+        calculate_fixed_point(10, Operator.EQ, 10, 10)
+
+
+def test_operator_tables():
+    assert [operator.code for operator in OPERATORS_BY_CODE] == list(range(5))
+    values = lattice(-5.0, 5.0, 0.7)
+    for operator in Operator.get_operators_without_eq():
+        inverse = INVERSE_OPERATORS[operator.code]
+        assert INVERSE_OPERATORS[inverse.code] is operator
+        for operand1 in values:
+            for operand2 in values:
+                if operand2 == 0.0 or operand1 == 0.0:
+                    continue
+                result = calculate(operand1, operator, operand2)
+                assert calculate(result, inverse, operand2) == pytest.approx(operand1)
+                if COMMUTATIVE_OPERATORS[operator.code]:
+                    assert calculate(operand2, operator, operand1) == result
+    assert COMMUTATIVE_OPERATORS[Operator.SUB.code] is False
+    assert COMMUTATIVE_OPERATORS[Operator.DIV.code] is False
+
+
+def test_is_zero_division():
+    assert is_zero_division(Operator.DIV, 0.0)
+    assert is_zero_division(Operator.DIV, -0.0000001)
+    assert not is_zero_division(Operator.DIV, 0.1)
+    assert not is_zero_division(Operator.MUL, 0.0)
+
+
+def test_is_in_range():
+    assert is_in_range(0.0, 0.0, 100.0)
+    assert is_in_range(100.0, 0.0, 100.0)
+    assert not is_in_range(-0.1, 0.0, 100.0)
+    assert not is_in_range(100.1, 0.0, 100.0)
+
+
+def test_calculate_fixed_point():
+    assert calculate_fixed_point(15, Operator.ADD, -25, 10) == -10
+    assert calculate_fixed_point(15, Operator.SUB, -25, 10) == 40
+    assert calculate_fixed_point(15, Operator.MUL, -25, 10) == -38
+    assert calculate_fixed_point(15, Operator.DIV, -25, 10) == -6
+    with pytest.raises(ZeroDivisionError):
+        calculate_fixed_point(15, Operator.DIV, 0, 10)
+
+
+def test_is_exact_fixed_point():
+    assert is_exact_fixed_point(15, Operator.MUL, 20, 30, 10)
+    assert not is_exact_fixed_point(15, Operator.MUL, 25, 38, 10)
+    assert is_exact_fixed_point(30, Operator.DIV, 20, 15, 10)
+    assert not is_exact_fixed_point(30, Operator.DIV, 0, 0, 10)
+
+
+def test_divide_round():
+    assert divide_round(5, 2) == 3
+    assert divide_round(-5, 2) == -3
+    assert divide_round(5, -2) == -3
+    assert divide_round(7, 3) == 2
+    assert divide_round(-7, -3) == 2
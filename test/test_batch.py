@@ -0,0 +1,31 @@
+from batch import derive_seed, generate_board, iter_generate_batch
+from expression_map import Direction, ExpressionMap
+
+
+def cells(exp_map: ExpressionMap) -> list:
+    return [
+        exp_map.get_values(0, y, Direction.HORIZONTAL, exp_map.width())
+        for y in range(exp_map.height())
+    ]
+
+
+def test_derive_seed():
+    assert derive_seed(1, 0) == derive_seed(1, 0)
+    assert derive_seed(1, 0) != derive_seed(1, 1)
+    assert derive_seed(1, 0) != derive_seed(2, 0)
+
+
+def test_generate_board_is_deterministic():
+    first = generate_board(3, derive_seed(42, 3))
+    second = generate_board(3, derive_seed(42, 3))
+    assert first.index == 3
+    assert first.exp_map.get_version() > 1
+    assert cells(first.exp_map) == cells(second.exp_map)
+
+
+def test_iter_generate_batch():
+    results = list(iter_generate_batch(count=5, jobs=2, seed=7, window=3))
+    assert sorted(result.index for result in results) == list(range(5))
+    for result in results:
+        expected = generate_board(result.index, derive_seed(7, result.index))
+        assert cells(result.exp_map) == cells(expected.exp_map)
@@ -0,0 +1,157 @@
+import io
+
+import pytest
+
+from crossmath import CrossMath
+from expression import Expression, ExpressionValidator
+from expression_map import CellKind, Direction, ExpressionItem, ExpressionMap
+from expression_map_io import BoardCorpus, MappedBoard, dump_binary
+from expression_map_sparse import SparseExpressionMap
+from number_factory import NumberFactory
+from operator_factory import Operator, OperatorFactory
+from random_generator import RandomGenerator
+from resolver.expression_resolver import ExpressionResolver
+
+numpy = pytest.importorskip("numpy")
+board_verifier = pytest.importorskip("board_verifier")
+BoardFailureReason = board_verifier.BoardFailureReason
+
+
+def generate(exp_map: ExpressionMap, fixed_point: bool = False) -> ExpressionValidator:
+    random_generator = RandomGenerator(1)
+    number_factory = NumberFactory(
+        minimum=-20.0,
+        maximum=20.0,
+        step=0.1,
+        random_generator=random_generator,
+        fixed_point=fixed_point,
+    )
+    operator_factory = OperatorFactory(random_generator=random_generator)
+    validator = ExpressionValidator(
+        minimum=-100, maximum=100, scale=number_factory.get_scale()
+    )
+    CrossMath(
+        exp_map,
+        number_factory,
+        operator_factory,
+        ExpressionResolver(validator, number_factory, operator_factory),
+        random_generator=random_generator,
+    ).generate()
+    return validator
+
+
+def cell_arrays(exp_map: ExpressionMap):
+    kinds, numbers = exp_map.get_cell_arrays()
+    shape = (exp_map.height(), exp_map.width())
+    return (
+        numpy.frombuffer(kinds, dtype=numpy.uint8).reshape(shape).copy(),
+        numpy.asarray(numbers).reshape(shape).copy(),
+    )
+
+
+@pytest.mark.parametrize("fixed_point", [False, True])
+def test_generated_board(fixed_point: bool):
+    exp_map = ExpressionMap(width=30, height=30)
+    validator = generate(exp_map, fixed_point)
+    assert len(exp_map.get_items()) > 10
+    assert board_verifier.verify_board(exp_map, validator) == []
+    buffer = io.BytesIO()
+    dump_binary(exp_map, buffer, scale=validator.get_scale())
+    board = MappedBoard(buffer.getvalue())
+    assert board_verifier.verify_board(board, validator) == []
+    # the numbers of another scale are not verified
+    other = ExpressionValidator(
+        minimum=-100, maximum=100, scale=None if fixed_point else 100
+    )
+    with pytest.raises(ValueError):
+        board_verifier.verify_board(board, other)
+
+
+def test_unbounded_board():
+    exp_map = SparseExpressionMap(tile_size=8)
+    expression = Expression.from_list([1.5, Operator.ADD, 2.0, Operator.EQ, 3.5])
+    exp_map.put(ExpressionItem(-3, -7, Direction.HORIZONTAL, expression))
+    assert board_verifier.verify_board(exp_map, ExpressionValidator()) == []
+    expression = Expression.from_list([1.5, Operator.ADD, 2.0, Operator.EQ, 4.5])
+    exp_map.put(ExpressionItem(4, 2, Direction.VERTICAL, expression))
+    failures = board_verifier.verify_board(exp_map, ExpressionValidator())
+    assert [(f.reason, f.x, f.y, f.direction) for f in failures] == [
+        (BoardFailureReason.INVALID, 4, 2, Direction.VERTICAL)
+    ]
+
+
+def test_failures():
+    exp_map = ExpressionMap(width=12, height=10)
+    exp_map.put(
+        ExpressionItem(
+            1,
+            2,
+            Direction.HORIZONTAL,
+            Expression.from_list([1.5, Operator.ADD, 2.0, Operator.EQ, 3.5]),
+        )
+    )
+    exp_map.put(
+        ExpressionItem(
+            5,
+            2,
+            Direction.VERTICAL,
+            Expression.from_list([3.5, Operator.MUL, -2.0, Operator.EQ, -7.0]),
+        )
+    )
+    validator = ExpressionValidator(minimum=-100, maximum=100)
+    kinds, numbers = cell_arrays(exp_map)
+    assert board_verifier.verify_cells(kinds, numbers, validator) == []
+
+    # wrong result of the vertical run
+    numbers[6, 5] = -7.5
+    # the horizontal run runs into another cell
+    kinds[2, 6] = CellKind.NUMBER
+    numbers[2, 6] = 1.0
+    # an operator in place of a number
+    kinds[8, 1:6] = [CellKind.ADD, CellKind.ADD, CellKind.NUMBER, CellKind.EQ, 1]
+    # an isolated cell
+    kinds[0, 10] = CellKind.NUMBER
+    numbers[0, 10] = 4.0
+    failures = board_verifier.verify_cells(kinds, numbers, validator, origin=(1, 1))
+    assert sorted(
+        (f.reason.value, f.x, f.y, str(f.direction), f.values) for f in failures
+    ) == [
+        ("invalid", 6, 3, "VERTICAL", [3.5, Operator.MUL, -2.0, Operator.EQ, -7.5]),
+        ("orphan", 11, 1, "None", [4.0]),
+        (
+            "run_length",
+            2,
+            3,
+            "HORIZONTAL",
+            [1.5, Operator.ADD, 2.0, Operator.EQ, 3.5, 1.0],
+        ),
+        (
+            "shape",
+            2,
+            9,
+            "HORIZONTAL",
+            [Operator.ADD, Operator.ADD, 0.0, Operator.EQ, 0.0],
+        ),
+    ]
+
+
+def test_verify_corpus(tmp_path):
+    path = str(tmp_path / "corpus.bin")
+    exp_map = ExpressionMap(width=20, height=20)
+    validator = generate(exp_map)
+    broken = ExpressionMap(width=12, height=10)
+    broken.put(
+        ExpressionItem(
+            1,
+            2,
+            Direction.HORIZONTAL,
+            Expression.from_list([1.5, Operator.ADD, 2.0, Operator.EQ, 4.5]),
+        )
+    )
+    with open(path, "wb") as f:
+        for board in (exp_map, broken, exp_map):
+            dump_binary(board, f, scale=validator.get_scale())
+    with BoardCorpus(path) as corpus:
+        results = list(board_verifier.verify_corpus(corpus, validator))
+    assert [(index, len(failures)) for index, failures in results] == [(1, 1)]
+    assert str(results[0][1][0]) == "invalid at 1, 2 HORIZONTAL: 1.5 + 2.0 = 4.5"
@@ -0,0 +1,116 @@
+import pytest
+
+from expression import Expression, ExpressionValidator
+from metrics import GenerationMetrics
+from number_factory import NumberFactory
+from operator_factory import Operator, OperatorFactory
+from random_generator import RandomGenerator
+from resolver.expression_resolver import ExpressionResolver
+from resolver.resolver_completion_memo import CompletionMemo, CompletionMemoException
+
+
+def create_expression(values: list) -> Expression:
+    return Expression.from_list(values)
+
+
+def test_draw_after_pool_is_filled():
+    memo = CompletionMemo(capacity=2, pool_size=2)
+    random_generator = RandomGenerator(1)
+    completion = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    memo.add("key", completion)
+    assert memo.draw("key", random_generator) is None
+    memo.add("key", completion)
+    assert memo.draw("key", random_generator).values() == completion.values()
+
+
+def test_lru_eviction():
+    memo = CompletionMemo(capacity=2, pool_size=1)
+    completion = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    memo.add("a", completion)
+    memo.add("b", completion)
+    memo.draw("a", RandomGenerator(1))
+    memo.add("c", completion)
+    assert len(memo) == 2
+    assert memo.has_completion("a")
+    assert not memo.has_completion("b")
+
+
+def test_save_and_load(tmp_path):
+    number_factory = NumberFactory(minimum=1.0, maximum=10.0)
+    resolver = ExpressionResolver(
+        validator=ExpressionValidator(),
+        number_factory=number_factory,
+        operator_factory=OperatorFactory(),
+        completion_memo=CompletionMemo(pool_size=4),
+    )
+    expression = create_expression([None, Operator.ADD, None, Operator.EQ, None])
+    for _ in range(4):
+        resolver.resolve(expression)
+    path = tmp_path / "memo.json"
+    resolver._completion_memo.save(str(path))
+
+    metrics = GenerationMetrics()
+    warm_resolver = ExpressionResolver(
+        validator=ExpressionValidator(),
+        number_factory=number_factory,
+        operator_factory=OperatorFactory(),
+        completion_memo=CompletionMemo.load(str(path), pool_size=4),
+    )
+    warm_resolver.set_metrics(metrics)
+    resolved = warm_resolver.resolve(expression)
+    assert resolved.operand1 + resolved.operand2 == resolved.result
+    assert metrics.snapshot()["counters"] == {"resolver.completion_memo.hits": 1}
+
+
+def test_load_invalid(tmp_path):
+    path = tmp_path / "memo.json"
+    path.write_text("{}")
+    with pytest.raises(CompletionMemoException):
+        CompletionMemo.load(str(path))
+
+
+def test_export_and_merge():
+    worker = CompletionMemo(pool_size=2)
+    with pytest.raises(CompletionMemoException):
+        worker.export_updates()
+    worker.track_updates()
+    first = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    second = create_expression([2.0, Operator.ADD, 1.0, Operator.EQ, 3.0])
+    worker.add("key", first)
+    worker.add("key", second)
+    updates = worker.export_updates()
+    assert updates == [["key", [(1.0, "+", 2.0, 3.0), (2.0, "+", 1.0, 3.0)], 2]]
+    assert worker.export_updates() == []
+
+    memo = CompletionMemo(pool_size=2)
+    memo.track_updates()
+    memo.add("key", second)
+    memo.merge(updates)
+    assert memo.draw("key", RandomGenerator(1)) is not None
+    assert memo.export_updates() == [
+        ["key", [(2.0, "+", 1.0, 3.0), (1.0, "+", 2.0, 3.0)], 2]
+    ]
+
+
+def test_export_evicted():
+    memo = CompletionMemo(capacity=2)
+    memo.track_updates()
+    expression = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    for key in ("a", "b", "c"):
+        memo.add(key, expression)
+    # the evicted pattern is not exported
+    assert [key for key, _, _ in memo.export_updates()] == ["b", "c"]
+
+
+def test_batch_saves_worker_memos(tmp_path, monkeypatch):
+    import batch
+    import main
+
+    path = str(tmp_path / "memo.json")
+    monkeypatch.setattr(main, "WIDTH", 20)
+    monkeypatch.setattr(main, "HEIGHT", 20)
+    monkeypatch.setattr(main, "COMPLETION_MEMO", True)
+    monkeypatch.setattr(main, "COMPLETION_MEMO_PATH", path)
+    results = list(batch.iter_generate_batch(count=3, jobs=2, seed=1))
+    assert all(result.completion_memo_updates is None for result in results)
+    assert len(CompletionMemo.load(path)) > 0
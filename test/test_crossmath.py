@@ -0,0 +1,137 @@
+import pytest
+
+import main
+from crossmath import CrossMath, GenerationLimits, StopReason
+from expression import Expression, ExpressionValidator
+from expression_map import ExpressionMap, Direction
+from metrics import GenerationMetrics
+from number_factory import NumberFactory
+from operator_factory import OperatorFactory
+from resolver.expression_resolver import ExpressionResolver
+
+
+def create_cross_math(
+    exp_map: ExpressionMap, metrics: GenerationMetrics | None = None
+) -> CrossMath:
+    number_factory = NumberFactory(minimum=-20.0, maximum=20.0, step=0.1)
+    operator_factory = OperatorFactory()
+    resolver = ExpressionResolver(
+        validator=ExpressionValidator(minimum=-100, maximum=100),
+        number_factory=number_factory,
+        operator_factory=operator_factory,
+    )
+    return CrossMath(
+        exp_map=exp_map,
+        number_factory=number_factory,
+        operator_factory=operator_factory,
+        expression_resolver=resolver,
+        metrics=metrics,
+    )
+
+
+def full_scan_frontier(exp_map: ExpressionMap) -> set:
+    max_expression_length = max(Expression.SUPPORTED_LENGTHS)
+    slots = set()
+    for x, y in exp_map.get_all_operand_points():
+        for direction in Direction.all():
+            for offset in range(0, -max_expression_length - 1, -2):
+                slot_x = x if direction.is_vertical() else x + offset
+                slot_y = y if direction.is_horizontal() else y + offset
+                for length in Expression.SUPPORTED_LENGTHS:
+                    if exp_map._is_open_slot(slot_x, slot_y, direction, length):
+                        slots.add((slot_x, slot_y, direction, length))
+    return slots
+
+
+def test_frontier_matches_full_scan():
+    exp_map = ExpressionMap(width=20, height=20)
+    cross_math = create_cross_math(exp_map)
+    cross_math.generate()
+    assert exp_map.get_version() > 1
+    assert set(exp_map.get_frontier()) == full_scan_frontier(exp_map)
+
+
+def test_iter_generate():
+    exp_map = ExpressionMap(width=20, height=20)
+    cross_math = create_cross_math(exp_map)
+    versions = []
+    for item, version in cross_math.iter_generate():
+        assert version == exp_map.get_version()
+        assert exp_map.get_values(
+            item.x(), item.y(), item.direction(), item.length()
+        ) == item.expression().values()
+        versions.append(version)
+    assert versions == list(range(1, exp_map.get_version() + 1))
+
+
+def test_iter_generate_stop_early():
+    exp_map = ExpressionMap(width=20, height=20)
+    cross_math = create_cross_math(exp_map)
+    for item, version in cross_math.iter_generate():
+        if version == 2:
+            break
+    assert exp_map.get_version() == 2
+
+
+def test_generate_metrics():
+    exp_map = ExpressionMap(width=20, height=20)
+    metrics = GenerationMetrics()
+    cross_math = create_cross_math(exp_map, metrics)
+    cross_math.generate()
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    assert counters["map.put"] == exp_map.get_version()
+    assert snapshot["timers"]["map.put"]["count"] == exp_map.get_version()
+    assert snapshot["timers"]["crossmath.generate"]["count"] == 1
+    attempts = sum(v for k, v in counters.items() if k.endswith(".attempts"))
+    failures = sum(v for k, v in counters.items() if k.endswith(".failures"))
+    assert attempts - failures == exp_map.get_version()
+    assert counters["number_factory.next"] > 0
+
+
+def test_metrics_disabled():
+    metrics = GenerationMetrics(enabled=False)
+    metrics.count("a")
+    assert metrics.start_timer() == 0.0
+    metrics.stop_timer("b", metrics.start_timer())
+    assert metrics.snapshot() == {"counters": {}, "timers": {}}
+
+
+def test_generate_limits():
+    exp_map = ExpressionMap(width=20, height=20)
+    result = create_cross_math(exp_map).generate(GenerationLimits(time_budget=0))
+    assert result.stop_reason == StopReason.TIME_BUDGET
+    assert result.expression_count == 1
+
+    exp_map = ExpressionMap(width=20, height=20)
+    result = create_cross_math(exp_map).generate(GenerationLimits(max_expressions=5))
+    assert result.stop_reason == StopReason.MAX_EXPRESSIONS
+    assert len(exp_map.get_items()) == 5
+
+    exp_map = ExpressionMap(width=20, height=20)
+    result = create_cross_math(exp_map).generate(
+        GenerationLimits(target_fill_ratio=0.1)
+    )
+    assert result.stop_reason == StopReason.TARGET_FILL_RATIO
+    assert 0.1 <= result.fill_ratio == exp_map.get_fill_ratio()
+
+    exp_map = ExpressionMap(width=20, height=20)
+    result = create_cross_math(exp_map).generate(
+        GenerationLimits(max_attempts_without_progress=0)
+    )
+    assert result.stop_reason == StopReason.NO_PROGRESS
+
+    exp_map = ExpressionMap(width=20, height=20)
+    result = create_cross_math(exp_map).generate()
+    assert result.stop_reason == StopReason.COMPLETED
+
+
+def test_unbounded_sparse_map_needs_limit(monkeypatch):
+    assert not GenerationLimits(target_fill_ratio=0.5).is_bounded()
+    assert GenerationLimits(max_expressions=10).is_bounded()
+    monkeypatch.setattr(main, "EXPRESSION_MAP_ENGINE", "sparse")
+    monkeypatch.setattr(main, "WIDTH", 0)
+    with pytest.raises(ValueError):
+        main.create_expression_map()
+    monkeypatch.setattr(main, "GENERATION_MAX_EXPRESSIONS", "10")
+    assert main.create_expression_map().get_items() == []
@@ -0,0 +1,93 @@
+from crossmath import GenerationLimits, StopReason
+from crossmath_backtracking import BacktrackingCrossMath
+from expression import Expression, ExpressionValidator
+from expression_map import ExpressionMap
+from number_factory import NumberFactory
+from operator_factory import OperatorFactory
+from random_generator import RandomGenerator
+from resolver.expression_resolver import ExpressionResolver
+from test_crossmath import full_scan_frontier
+
+
+def create_cross_math(exp_map: ExpressionMap, seed: int) -> BacktrackingCrossMath:
+    random_generator = RandomGenerator(seed)
+    number_factory = NumberFactory(
+        minimum=-20.0, maximum=20.0, step=0.1, random_generator=random_generator
+    )
+    operator_factory = OperatorFactory(random_generator=random_generator)
+    validator = ExpressionValidator(minimum=-100, maximum=100)
+    resolver = ExpressionResolver(
+        validator=validator,
+        number_factory=number_factory,
+        operator_factory=operator_factory,
+    )
+    return BacktrackingCrossMath(
+        exp_map=exp_map,
+        number_factory=number_factory,
+        operator_factory=operator_factory,
+        expression_resolver=resolver,
+        random_generator=random_generator,
+    )
+
+
+def test_generate_valid_board():
+    validator = ExpressionValidator(minimum=-100, maximum=100)
+    for seed in range(3):
+        exp_map = ExpressionMap(width=20, height=20)
+        create_cross_math(exp_map, seed).generate()
+        assert exp_map.get_filled_count() > 5
+        assert set(exp_map.get_frontier()) == full_scan_frontier(exp_map)
+        filled = set()
+        for item in exp_map.get_items():
+            values = exp_map.get_values(
+                item.x(), item.y(), item.direction(), item.length()
+            )
+            assert values == item.expression().values()
+            assert validator.validate(Expression.from_list(values))
+            for i in range(item.length()):
+                filled.add(
+                    (item.x() + i, item.y())
+                    if item.is_horizontal()
+                    else (item.x(), item.y() + i)
+                )
+        assert len(filled) == exp_map.get_filled_count()
+
+
+def test_generate_deterministic():
+    boards = []
+    for _ in range(2):
+        exp_map = ExpressionMap(width=20, height=20)
+        create_cross_math(exp_map, 7).generate()
+        boards.append(exp_map.get_cell_arrays())
+    assert boards[0] == boards[1]
+
+
+def test_generate_limits():
+    exp_map = ExpressionMap(width=20, height=20)
+    result = create_cross_math(exp_map, 1).generate(
+        GenerationLimits(max_expressions=6)
+    )
+    assert result.stop_reason == StopReason.MAX_EXPRESSIONS
+    assert len(exp_map.get_items()) == 6
+
+    exp_map = ExpressionMap(width=20, height=20)
+    result = create_cross_math(exp_map, 1).generate(
+        GenerationLimits(max_attempts_without_progress=0)
+    )
+    assert result.stop_reason == StopReason.NO_PROGRESS
+    assert result.expression_count == 1
+
+
+def test_trials_not_flown_back():
+    exp_map = ExpressionMap(width=20, height=20)
+    cross_math = create_cross_math(exp_map, 1)
+    operator_factory = cross_math.get_operator_factory()
+    flown_back = []
+    fly_back = operator_factory.fly_back
+    operator_factory.fly_back = lambda operator: (
+        flown_back.append(operator),
+        fly_back(operator),
+    )
+    cross_math.generate(GenerationLimits(max_expressions=6))
+    # one operator at most per put expression, none per dropped trial
+    assert 0 < len(flown_back) <= len(exp_map.get_items())
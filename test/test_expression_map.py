@@ -0,0 +1,219 @@
+import functools
+
+import pytest
+
+from expression import Expression
+from expression_map_sparse import SparseExpressionMap
+from expression_map import (
+    ExpressionMap,
+    ExpressionItem,
+    Direction,
+    CellKind,
+    ExpressionMapCellValueMissmatch,
+    ExpressionMapException,
+)
+from operator_factory import Operator
+
+
+def map_factories() -> list:
+    factories = [ExpressionMap, functools.partial(SparseExpressionMap, tile_size=3)]
+    try:
+        from expression_map_numpy import NumpyExpressionMap
+
+        factories.append(NumpyExpressionMap)
+    except ImportError:
+        pass
+    return factories
+
+
+def create_expression(values: list) -> Expression:
+    return Expression.from_list(values)
+
+
+@pytest.mark.parametrize("map_factory", map_factories())
+def test_put_and_get(map_factory):
+    exp_map = map_factory(width=10, height=10)
+    expression = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    exp_map.put(ExpressionItem(2, 2, Direction.HORIZONTAL, expression))
+    assert exp_map.get_version() == 1
+    assert exp_map.get(2, 2) == 1.0
+    assert exp_map.get(3, 2) == Operator.ADD
+    assert exp_map.get(1, 2) is None
+    assert exp_map.get_values(2, 2, Direction.HORIZONTAL, 5) == expression.values()
+    assert exp_map.get_values(4, 2, Direction.VERTICAL, 5) == [
+        2.0,
+        None,
+        None,
+        None,
+        None,
+    ]
+
+
+@pytest.mark.parametrize("map_factory", map_factories())
+def test_put_crossing(map_factory):
+    exp_map = map_factory(width=10, height=10)
+    horizontal = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    vertical = create_expression([2.0, Operator.MUL, 3.0, Operator.EQ, 6.0])
+    exp_map.put(ExpressionItem(2, 2, Direction.HORIZONTAL, horizontal))
+    exp_map.put(ExpressionItem(4, 2, Direction.VERTICAL, vertical))
+    assert exp_map.get_values(4, 2, Direction.VERTICAL, 5) == vertical.values()
+    mismatch = create_expression([5.0, Operator.SUB, 2.0, Operator.EQ, 3.0])
+    with pytest.raises(ExpressionMapCellValueMissmatch):
+        exp_map.put(ExpressionItem(2, 2, Direction.VERTICAL, mismatch))
+
+
+@pytest.mark.parametrize("map_factory", map_factories())
+def test_invalid_position(map_factory):
+    exp_map = map_factory(width=10, height=10)
+    with pytest.raises(ValueError):
+        exp_map.get(10, 0)
+    with pytest.raises(ValueError):
+        exp_map.get_values(6, 0, Direction.HORIZONTAL, 5)
+
+
+@pytest.mark.parametrize("map_factory", map_factories())
+def test_frontier(map_factory):
+    exp_map = map_factory(width=10, height=10)
+    expression = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    exp_map.put(ExpressionItem(2, 2, Direction.HORIZONTAL, expression))
+    frontier = exp_map.get_frontier()
+    assert (2, 2, Direction.HORIZONTAL, 5) not in frontier
+    assert (2, 2, Direction.VERTICAL, 5) in frontier
+    assert (4, 0, Direction.VERTICAL, 5) in frontier
+    assert (4, -2, Direction.VERTICAL, 5) not in frontier
+    # x + length reaches the map width
+    assert (6, 0, Direction.VERTICAL, 5) not in frontier
+    assert all(direction.is_vertical() for _, _, direction, _ in frontier)
+
+
+@pytest.mark.parametrize("map_factory", map_factories())
+def test_checkpoint_rollback(map_factory):
+    exp_map = map_factory(width=10, height=10)
+    horizontal = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    vertical = create_expression([2.0, Operator.MUL, 3.0, Operator.EQ, 6.0])
+    exp_map.put(ExpressionItem(2, 2, Direction.HORIZONTAL, horizontal))
+    frontier = exp_map.get_frontier()
+    checkpoint = exp_map.checkpoint()
+    exp_map.put(ExpressionItem(4, 2, Direction.VERTICAL, vertical))
+    assert exp_map.get_filled_count() == 9
+    exp_map.rollback(checkpoint)
+    assert exp_map.get_version() == 3
+    assert exp_map.get_filled_count() == 5
+    assert exp_map.get_fill_ratio() == 0.05
+    assert exp_map.get_frontier() == frontier
+    assert exp_map.get_items()[-1].expression() is horizontal
+    assert exp_map.get(4, 2) == 2.0
+    assert exp_map.get_values(4, 3, Direction.VERTICAL, 4) == [None] * 4
+    assert len(exp_map.get_all_operand_points()) == 3
+    checkpoint = exp_map.checkpoint()
+    exp_map.put(ExpressionItem(4, 2, Direction.VERTICAL, vertical))
+    exp_map.release(checkpoint)
+    assert exp_map.get_filled_count() == 9
+
+
+@pytest.mark.parametrize("map_factory", map_factories())
+def test_nested_rollback(map_factory):
+    exp_map = map_factory(width=12, height=12)
+    exp_map.put(
+        ExpressionItem(
+            2,
+            2,
+            Direction.HORIZONTAL,
+            create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0]),
+        )
+    )
+    frontiers = [exp_map.get_frontier()]
+    outer = exp_map.checkpoint()
+    exp_map.put(
+        ExpressionItem(
+            4,
+            2,
+            Direction.VERTICAL,
+            create_expression([2.0, Operator.MUL, 3.0, Operator.EQ, 6.0]),
+        )
+    )
+    frontiers.append(exp_map.get_frontier())
+    inner = exp_map.checkpoint()
+    exp_map.put(
+        ExpressionItem(
+            4,
+            6,
+            Direction.HORIZONTAL,
+            create_expression([6.0, Operator.SUB, 1.0, Operator.EQ, 5.0]),
+        )
+    )
+    assert exp_map.get_frontier_size() == len(exp_map.get_frontier())
+    # the closed slots are reopened in their place
+    exp_map.rollback(inner)
+    assert exp_map.get_frontier() == frontiers[1]
+    exp_map.rollback(outer)
+    assert exp_map.get_frontier() == frontiers[0]
+
+
+def test_cell_kind():
+    assert CellKind.of(None) == CellKind.EMPTY
+    assert CellKind.of(1.5) == CellKind.NUMBER
+    assert CellKind.of(Operator.DIV) == CellKind.DIV
+    assert CellKind.EQ.operator() == Operator.EQ
+
+
+def test_numpy_views():
+    expression_map_numpy = pytest.importorskip("expression_map_numpy")
+    exp_map = expression_map_numpy.NumpyExpressionMap(width=10, height=10)
+    expression = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    exp_map.put(ExpressionItem(2, 2, Direction.VERTICAL, expression))
+    kinds = exp_map.get_kinds_view(2, 2, Direction.VERTICAL, 5)
+    numbers = exp_map.get_numbers_view(2, 2, Direction.VERTICAL, 5)
+    assert kinds.tolist() == [1, 2, 1, 6, 1]
+    assert numbers.tolist() == [1.0, 0.0, 2.0, 0.0, 3.0]
+    assert kinds.base is not None
+    assert not kinds.flags.writeable
+
+
+@pytest.mark.parametrize(
+    "fixed_point, values",
+    [
+        (False, [1, Operator.ADD, 2, Operator.EQ, 3]),
+        (True, [1.5, Operator.ADD, 2.0, Operator.EQ, 3.5]),
+    ],
+)
+def test_numpy_number_type(fixed_point: bool, values: list):
+    expression_map_numpy = pytest.importorskip("expression_map_numpy")
+    exp_map = expression_map_numpy.NumpyExpressionMap(
+        width=10, height=10, fixed_point=fixed_point
+    )
+    expression = create_expression(values)
+    with pytest.raises(ExpressionMapException):
+        exp_map.put(ExpressionItem(2, 2, Direction.VERTICAL, expression))
+    # nothing is written
+    assert exp_map.get_filled_count() == 0
+    assert exp_map.get(2, 2) is None
+
+
+def test_render_text():
+    exp_map = ExpressionMap(width=11, height=3)
+    expression = create_expression([1.5, Operator.ADD, 12.0, Operator.EQ, 13.5])
+    exp_map.put(ExpressionItem(5, 1, Direction.HORIZONTAL, expression))
+    assert exp_map.render_text().split("\n") == [
+        "   0  1  2  3  4    5  6     7  8     9  10",
+        "0                                          ",
+        "1                 1.5  +  12.0  =  13.5    ",
+        "2                                          ",
+    ]
+
+
+def test_sparse_unbounded():
+    exp_map = SparseExpressionMap(tile_size=4)
+    horizontal = create_expression([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    vertical = create_expression([2.0, Operator.MUL, 3.0, Operator.EQ, 6.0])
+    exp_map.put(ExpressionItem(-1000, -3, Direction.HORIZONTAL, horizontal))
+    exp_map.put(ExpressionItem(-998, -3, Direction.VERTICAL, vertical))
+    assert exp_map.get(-1000, -3) == 1.0
+    assert exp_map.get(5000, 5000) is None
+    assert exp_map.get_values(-998, -3, Direction.VERTICAL, 5) == vertical.values()
+    assert exp_map.get_bounds() == (-1000, -3, -996, 1)
+    assert (exp_map.width(), exp_map.height()) == (5, 5)
+    assert exp_map.get_tile_count() == 3
+    assert exp_map.get_fill_ratio() == 9 / 25
+    assert (-1000, -3, Direction.VERTICAL, 5) in exp_map.get_frontier()
+    assert exp_map.render_text().splitlines()[1].startswith("-3  ")
@@ -0,0 +1,126 @@
+import io
+import json
+import struct
+
+import pytest
+
+from expression import Expression
+from expression_map import Direction, ExpressionItem, ExpressionMap
+from expression_map_sparse import SparseExpressionMap
+from expression_map_io import (
+    BoardCorpus,
+    ExpressionMapFormatException,
+    MappedBoard,
+    dump_binary,
+    dump_jsonl,
+    load_binary,
+    load_jsonl,
+)
+from operator_factory import Operator
+
+
+def create_map(scale: int | None = None) -> ExpressionMap:
+    def number(value: float):
+        return value if scale is None else int(round(value * scale))
+
+    exp_map = ExpressionMap(width=12, height=10)
+    horizontal = Expression.from_list(
+        [number(1.5), Operator.ADD, number(2.0), Operator.EQ, number(3.5)]
+    )
+    vertical = Expression.from_list(
+        [number(3.5), Operator.MUL, number(-2.0), Operator.EQ, number(-7.0)]
+    )
+    exp_map.put(ExpressionItem(1, 2, Direction.HORIZONTAL, horizontal))
+    exp_map.put(ExpressionItem(5, 2, Direction.VERTICAL, vertical))
+    return exp_map
+
+
+def cells(exp_map) -> list:
+    return [
+        [exp_map.get(x, y) for x in range(exp_map.width())]
+        for y in range(exp_map.height())
+    ]
+
+
+def test_binary_round_trip():
+    for scale in (None, 10):
+        exp_map = create_map(scale)
+        buffer = io.BytesIO()
+        dump_binary(exp_map, buffer, scale=scale)
+        assert MappedBoard(buffer.getvalue()).get_scale() == scale
+        loaded = load_binary(buffer.getvalue())
+        assert cells(loaded) == cells(exp_map)
+        assert len(loaded.get_items()) == 2
+
+
+def test_binary_scale():
+    with pytest.raises(ValueError):
+        dump_binary(create_map(10), io.BytesIO())
+    with pytest.raises(ValueError):
+        dump_binary(create_map(10), io.BytesIO(), scale=20)
+    with pytest.raises(ValueError):
+        dump_binary(create_map(), io.BytesIO(), scale=10)
+    buffer = io.BytesIO()
+    dump_binary(create_map(100), buffer, scale=100)
+    assert MappedBoard(buffer.getvalue()).get_scale() == 100
+    # a version 1 record does not know its scale
+    data = bytearray(buffer.getvalue())
+    struct.pack_into("<BBH", data, 4, 1, 1, 0)
+    with pytest.raises(ExpressionMapFormatException):
+        MappedBoard(bytes(data))
+
+
+def test_corpus(tmp_path):
+    path = str(tmp_path / "corpus.bin")
+    maps = [create_map(), create_map(10), ExpressionMap(width=3, height=2)]
+    with open(path, "wb") as f:
+        for exp_map, scale in zip(maps, (None, 10, None)):
+            dump_binary(exp_map, f, scale=scale)
+    with BoardCorpus(path) as corpus:
+        assert len(corpus) == 3
+        assert corpus[1].is_fixed_point()
+        assert corpus[1].get_scale() == 10
+        assert corpus[1].get(1, 2) == 15
+        assert corpus[0].get(2, 2) == Operator.ADD
+        assert corpus[2].width() == 3
+        for board, exp_map in zip(corpus, maps):
+            assert cells(board) == cells(exp_map)
+
+
+def test_jsonl_round_trip():
+    for scale in (None, 10):
+        exp_map = create_map(scale)
+        buffer = io.StringIO()
+        dump_jsonl(exp_map, buffer, scale=scale)
+        assert len(buffer.getvalue().splitlines()) == 3
+        buffer.seek(0)
+        loaded = load_jsonl(buffer, scale=scale)
+        assert cells(loaded) == cells(exp_map)
+
+
+def test_jsonl_scale():
+    with pytest.raises(ValueError):
+        dump_jsonl(create_map(10), io.StringIO())
+    buffer = io.StringIO()
+    dump_jsonl(create_map(100), buffer, scale=100)
+    assert json.loads(buffer.getvalue().splitlines()[0])["decimals"] == 2
+    for scale in (None, 10):
+        buffer.seek(0)
+        with pytest.raises(ExpressionMapFormatException):
+            load_jsonl(buffer, scale=scale)
+
+
+def test_unbounded_map():
+    exp_map = SparseExpressionMap(tile_size=4)
+    expression = Expression.from_list([1.0, Operator.ADD, 2.0, Operator.EQ, 3.0])
+    exp_map.put(ExpressionItem(0, 0, Direction.HORIZONTAL, expression))
+    buffer = io.StringIO()
+    dump_jsonl(exp_map, buffer)
+    buffer.seek(0)
+    assert cells(load_jsonl(buffer)) == cells(exp_map)
+    # the cells would be moved to 0, 0
+    exp_map.put(ExpressionItem(2, -2, Direction.VERTICAL, expression))
+    with pytest.raises(ValueError):
+        dump_jsonl(exp_map, io.StringIO())
+    with pytest.raises(ValueError):
+        dump_binary(exp_map, io.BytesIO())
@@ -1,12 +1,14 @@
 import parametrize_from_file
+import pytest
 
 from expression import Expression, ExpressionValidator
 from operator_factory import Operator, OperatorFactory
+from random_generator import RandomGenerator
 from resolver.expression_resolver import ExpressionResolver
 from number_factory import NumberFactory
 
 
-def expression_from_str(exp: str) -> Expression:
+def expression_from_str(exp: str, scale: int | None = None) -> Expression:
     values = exp.split()
     if len(values) not in Expression.SUPPORTED_LENGTHS:
         raise ValueError("Not supported expression string")
@@ -15,7 +17,8 @@ def expression_from_str(exp: str) -> Expression:
         if values[i] == "?":
             result.append(None)
         elif i % 2 == 0:
-            result.append(float(values[i]))
+            value = float(values[i])
+            result.append(value if scale is None else int(round(value * scale)))
         else:
             result.append(Operator(values[i]))
     return Expression.from_list(result)
@@ -38,3 +41,165 @@ def test_expression_resolver(expression: str, expect: str):
     assert resolved_expression.operator == expected_expression.operator
     assert resolved_expression.operand2 == expected_expression.operand2
     assert resolved_expression.result == expected_expression.result
+
+
+@parametrize_from_file(key="test_expression_resolver")
+def test_expression_resolver_fixed_point(expression: str, expect: str):
+    number_factory = NumberFactory(minimum=1.0, maximum=10.0, fixed_point=True)
+    operator_factory = OperatorFactory()
+    scale = number_factory.get_scale()
+    resolver = ExpressionResolver(
+        validator=ExpressionValidator(scale=scale),
+        number_factory=number_factory,
+        operator_factory=operator_factory,
+    )
+    parsed_expression = expression_from_str(expression, scale)
+    expected_expression = expression_from_str(expect, scale)
+    resolved_expression = resolver.resolve(parsed_expression)
+    assert resolved_expression is not None
+    assert type(resolved_expression.operand1) is int
+    assert type(resolved_expression.result) is int
+    assert resolved_expression.operand1 == expected_expression.operand1
+    assert resolved_expression.operator == expected_expression.operator
+    assert resolved_expression.operand2 == expected_expression.operand2
+    assert resolved_expression.result == expected_expression.result
+
+
+@pytest.mark.parametrize("fixed_point", [False, True])
+def test_validate_many(fixed_point: bool):
+    numpy = pytest.importorskip("numpy")
+    random_generator = RandomGenerator(1)
+    number_factory = NumberFactory(
+        minimum=-3.0,
+        maximum=3.0,
+        step=0.5,
+        random_generator=random_generator,
+        fixed_point=fixed_point,
+    )
+    validator = ExpressionValidator(
+        minimum=-5.0, maximum=5.0, scale=number_factory.get_scale()
+    )
+    operators = Operator.get_operators_without_eq()
+    candidates = []
+    for _ in range(2000):
+        operand1 = number_factory.next()
+        operator = random_generator.choice(operators)
+        operand2 = number_factory.next()
+        # a valid result, off by a step or out of range
+        result = random_generator.choice(
+            [
+                operand1 + operand2,
+                operand1 - operand2,
+                number_factory.next(),
+                number_factory.next() * 3,
+            ]
+        )
+        candidates.append((operand1, operator, operand2, result))
+    dtype = numpy.float64 if not fixed_point else numpy.int64
+    mask = validator.validate_many(
+        numpy.array([candidate[0] for candidate in candidates], dtype=dtype),
+        numpy.array([candidate[1].code for candidate in candidates]),
+        numpy.array([candidate[2] for candidate in candidates], dtype=dtype),
+        numpy.array([candidate[3] for candidate in candidates], dtype=dtype),
+    )
+    expected = [validator.validate_values(*candidate) for candidate in candidates]
+    assert mask.tolist() == expected
+    assert any(expected)
+
+
+def test_validate_many_missing():
+    numpy = pytest.importorskip("numpy")
+    validator = ExpressionValidator()
+    mask = validator.validate_many(
+        numpy.array([1.0, numpy.nan, 2.0, 6.0]),
+        numpy.array([Operator.ADD.code, Operator.ADD.code, -1, Operator.DIV.code]),
+        numpy.array([2.0, 2.0, 2.0, 0.0]),
+        numpy.array([3.0, 2.0, 4.0, 0.0]),
+    )
+    assert mask.tolist() == [True, False, False, False]
+    # the number type must match the validator
+    assert not validator.validate_many([1], [Operator.ADD.code], [2], [3]).any()
+
+
+def test_validate_many_large_range():
+    numpy = pytest.importorskip("numpy")
+    # the products of the range do not fit into int64
+    validator = ExpressionValidator(minimum=-(2**41), maximum=2**41, scale=1)
+    candidates = [
+        (2**40, Operator.MUL, 2**40, 0),
+        (2**40, Operator.MUL, 2, 2**41),
+        (2**41, Operator.DIV, 2**40, 2),
+        (2**40, Operator.ADD, 2**40, 2**41),
+    ]
+    mask = validator.validate_many(
+        *(
+            numpy.array(values, dtype=numpy.int64)
+            for values in (
+                [c[0] for c in candidates],
+                [c[1].code for c in candidates],
+                [c[2] for c in candidates],
+                [c[3] for c in candidates],
+            )
+        )
+    )
+    assert mask.tolist() == [validator.validate_values(*c) for c in candidates]
+    assert mask.tolist() == [False, True, True, True]
+
+
+@pytest.mark.parametrize("fixed_point", [False, True])
+def test_candidates_per_attempt(fixed_point: bool):
+    pytest.importorskip("numpy")
+    number_factory = NumberFactory(
+        minimum=-20.0,
+        maximum=20.0,
+        step=0.1,
+        random_generator=RandomGenerator(3),
+        fixed_point=fixed_point,
+    )
+    validator = ExpressionValidator(
+        minimum=-100, maximum=100, scale=number_factory.get_scale()
+    )
+    resolver = ExpressionResolver(
+        validator=validator,
+        number_factory=number_factory,
+        operator_factory=OperatorFactory(random_generator=RandomGenerator(3)),
+        candidates_per_attempt=8,
+    )
+    operand = number_factory.to_fixed_point(2.0) if fixed_point else 2.0
+    for values in (
+        [None, None, None, Operator.EQ, None],
+        [operand, None, None, Operator.EQ, None],
+        [None, Operator.DIV, operand, Operator.EQ, None],
+    ):
+        expression = Expression.from_list(values)
+        for _ in range(50):
+            resolved_expression = resolver.resolve(expression)
+            assert expression.is_match(resolved_expression)
+            assert validator.validate(resolved_expression)
+
+
+def test_candidates_per_attempt_large_range():
+    pytest.importorskip("numpy")
+    # the scaled products of the range do not fit into int64
+    number_factory = NumberFactory(
+        minimum=0,
+        maximum=1e15,
+        step=0.01,
+        random_generator=RandomGenerator(3),
+        fixed_point=True,
+    )
+    validator = ExpressionValidator(
+        minimum=0, maximum=1e15, scale=number_factory.get_scale()
+    )
+    assert validator.get_array_dtype() is object
+    resolver = ExpressionResolver(
+        validator=validator,
+        number_factory=number_factory,
+        operator_factory=OperatorFactory(random_generator=RandomGenerator(3)),
+        candidates_per_attempt=4,
+    )
+    # the too large products are rejected, the other operators are tried
+    expression = Expression.from_list([None, None, None, Operator.EQ, None])
+    for _ in range(20):
+        resolved_expression = resolver.resolve(expression)
+        assert validator.validate(resolved_expression)
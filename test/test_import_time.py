@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_SEC = 0.3
+
+SCRIPT = """
+import json, sys, time
+start_time = time.perf_counter()
+import crossmath
+elapsed = time.perf_counter() - start_time
+print(json.dumps({
+    "elapsed": elapsed,
+    "pandas": "pandas" in sys.modules,
+    "numpy": "numpy" in sys.modules,
+}))
+"""
+
+
+def test_import_crossmath_is_fast():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result = json.loads(output)
+    assert not result["pandas"]
+    assert not result["numpy"]
+    assert result["elapsed"] < IMPORT_TIME_BUDGET_SEC
@@ -0,0 +1,117 @@
+import pytest
+
+from expression import Expression, ExpressionValidator
+from metrics import GenerationMetrics
+from number_factory import NumberFactory
+from operator_factory import Operator, OperatorFactory
+from resolver.expression_resolver import ExpressionResolver
+from resolver.resolver_exceptions import ExpressionResolverNotResolvable
+from resolver.resolver_negative_cache import NegativeResultCache
+from resolver.resolver_pattern import create_pattern_key
+
+
+def create_resolver(negative_cache: NegativeResultCache) -> ExpressionResolver:
+    return ExpressionResolver(
+        validator=ExpressionValidator(),
+        number_factory=NumberFactory(minimum=1.0, maximum=10.0),
+        operator_factory=OperatorFactory(),
+        negative_cache=negative_cache,
+    )
+
+
+def test_create_key():
+    number_factory = NumberFactory(minimum=-20.0, maximum=20.0, step=0.1)
+    first = Expression.from_list([7.3, None, None, Operator.EQ, -0.4])
+    second = Expression.from_list([7.1 + 0.2, None, None, Operator.EQ, -0.4])
+    key = create_pattern_key(("config",), first, number_factory)
+    assert key == (("config",), 73, None, None, -4)
+    assert create_pattern_key(("config",), second, number_factory) == key
+
+
+def test_maybe_threshold():
+    negative_cache = NegativeResultCache(maybe_threshold=2)
+    negative_cache.add_maybe_not_resolvable("key")
+    assert not negative_cache.is_not_resolvable("key")
+    negative_cache.add_maybe_not_resolvable("key")
+    assert negative_cache.is_not_resolvable("key")
+    negative_cache.add_not_resolvable("other")
+    assert len(negative_cache) == 2
+
+
+def test_resolver_skips_cached_pattern():
+    storage = {}
+    metrics = GenerationMetrics()
+    resolver = create_resolver(NegativeResultCache(storage=storage))
+    resolver.set_metrics(metrics)
+    expression = Expression.from_list([9.0, None, 1.0, Operator.EQ, 5.0])
+    for _ in range(3):
+        with pytest.raises(ExpressionResolverNotResolvable):
+            resolver.resolve(expression)
+    counters = metrics.snapshot()["counters"]
+    assert counters["resolver.OnlyOperatorMissingResolver.attempts"] == 1
+    assert counters["resolver.negative_cache.hits"] == 2
+    # shared by the storage
+    other_resolver = create_resolver(NegativeResultCache(storage=storage))
+    assert not other_resolver.is_resolvable(expression)
+    assert other_resolver.is_resolvable(
+        Expression.from_list([9.0, None, 1.0, Operator.EQ, 8.0])
+    )
+
+
+def test_probe_does_not_cache():
+    negative_cache = NegativeResultCache(maybe_threshold=1)
+    resolver = create_resolver(negative_cache)
+    expression = Expression.from_list([9.0, None, 1.0, Operator.EQ, 5.0])
+    for _ in range(3):
+        assert not resolver.is_resolvable(expression, attempts=2)
+    assert len(negative_cache) == 0
+
+
+class CountingStorage(dict):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get(self, key, default=None):
+        self.reads += 1
+        return super().get(key, default)
+
+
+def test_local_cache():
+    storage = CountingStorage()
+    negative_cache = NegativeResultCache(
+        storage=storage, maybe_threshold=2, local_cache=True, refresh_interval=4
+    )
+    # read once, then 4 lookups from the local copy, then read again
+    for _ in range(6):
+        assert not negative_cache.is_not_resolvable("key")
+    assert storage.reads == 2
+    # the failures of another process are seen after the refresh interval
+    other = NegativeResultCache(storage=storage, maybe_threshold=2)
+    other.add_not_resolvable("key")
+    for _ in range(4):
+        negative_cache.is_not_resolvable("key")
+    assert negative_cache.is_not_resolvable("key")
+    reads = storage.reads
+    for _ in range(10):
+        assert negative_cache.is_not_resolvable("key")
+    assert storage.reads == reads
+    negative_cache.add_maybe_not_resolvable("new")
+    assert not negative_cache.is_not_resolvable("new")
+    negative_cache.add_maybe_not_resolvable("new")
+    assert negative_cache.is_not_resolvable("new")
+
+
+def test_local_capacity():
+    storage = CountingStorage()
+    negative_cache = NegativeResultCache(
+        storage=storage, local_cache=True, local_capacity=2
+    )
+    for key in ("a", "b", "a", "c"):
+        negative_cache.is_not_resolvable(key)
+    assert storage.reads == 3
+    # "b" is the least recently used one
+    negative_cache.is_not_resolvable("a")
+    assert storage.reads == 3
+    negative_cache.is_not_resolvable("b")
+    assert storage.reads == 4
@@ -1,4 +1,7 @@
+import pytest
+
 from number_factory import NumberFactory
+from random_generator import RandomGenerator
 
 
 def eq(a: float, b: float, tolerance: float = 1e-6) -> bool:
@@ -127,4 +130,75 @@ def test_next_with_dividable_by_is_not_dividable_by_step():
         assert str(e) == "Dividable by must be dividable by step: 1 vs 3"
 
 
+def test_zero_not_allowed_narrow_range():
+    number_factory = NumberFactory(minimum=-20, maximum=20, step=0.1)
+    for _ in range(100):
+        result = number_factory.next(minimum=-0.1, maximum=0.1, zero_allowed=False)
+        assert eq_in(result, [-0.1, 0.1])
+
+
+def test_zero_not_allowed_only_zero():
+    number_factory = NumberFactory(minimum=-20, maximum=20, step=0.1)
+    try:
+        number_factory.next(dividable_by=29, zero_allowed=False)
+        assert False
+    except ValueError as e:
+        assert str(e).startswith("Dividable by / step must be less than minimum")
+
+
+def test_full_range_with_dividable_by_and_zero_not_allowed():
+    number_factory = NumberFactory(minimum=-2, maximum=2, step=0.3)
+    variations = set()
+    for _ in range(200):
+        variations.add(number_factory.next(dividable_by=0.6, zero_allowed=False))
+    assert sorted(variations) == [-1.8, -1.2, -0.6, 0.6, 1.2, 1.8]
+
+
+def test_fixed_point_next():
+    number_factory = NumberFactory(minimum=-2, maximum=2, step=0.3, fixed_point=True)
+    assert number_factory.get_scale() == 10
+    variations = set()
+    for _ in range(100):
+        result = number_factory.next(dividable_by=6)
+        assert type(result) is int
+        variations.add(result)
+    assert sorted(variations) == [-18, -12, -6, 0, 6, 12, 18]
+
+
+@pytest.mark.parametrize("fixed_point", [False, True])
+def test_debug_invariants(fixed_point: bool):
+    number_factory = NumberFactory(
+        minimum=-2,
+        maximum=2,
+        step=0.3,
+        random_generator=RandomGenerator(1),
+        fixed_point=fixed_point,
+        debug=True,
+    )
+    release = NumberFactory(
+        minimum=-2,
+        maximum=2,
+        step=0.3,
+        random_generator=RandomGenerator(1),
+        fixed_point=fixed_point,
+    )
+    dividable_by = 6 if fixed_point else 0.6
+    maximum = 9 if fixed_point else 0.9
+    for _ in range(200):
+        assert number_factory.next() == release.next()
+        assert number_factory.next(
+            dividable_by=dividable_by, zero_allowed=False
+        ) == release.next(dividable_by=dividable_by, zero_allowed=False)
+        assert number_factory.next(maximum=maximum) == release.next(maximum=maximum)
+
+
+def test_fixed_point_fix_and_format():
+    number_factory = NumberFactory(step=0.2, fixed_point=True)
+    assert number_factory.fix(14) == 14
+    assert number_factory.fix(15) == 16
+    assert number_factory.fix(-15) == -16
+    assert number_factory.format(-16) == "-1.6"
+    assert NumberFactory(step=0.2).get_scale() is None
+
+
 # expression_resolver.ExpressionResolverNotResolvable: Expression is not resolvable (expression=None None None = None, parent=Dividable by / step must be less than minimum or maximum: 29.0 vs [0.0, 29.0])
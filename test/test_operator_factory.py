@@ -0,0 +1,80 @@
+from collections import Counter
+
+import pytest
+
+from operator_factory import Operator, OperatorFactory, OperatorPolicy
+from random_generator import RandomGenerator
+
+
+def test_usage_order():
+    operator_factory = OperatorFactory(random_generator=RandomGenerator(1))
+    stats = {operator: 0 for operator in operator_factory.operators()}
+    for _ in range(200):
+        operator = operator_factory.next_weighted_operator()
+        for _uses in range(operator.code % 3):
+            operator_factory.fly_back(operator)
+            stats[operator] += 1
+        assert operator_factory.operators_weighted() == sorted(
+            operator_factory.operators(), key=lambda operator: stats[operator]
+        )
+
+
+def test_uniform_draws_by_usage_order():
+    # the draw is the index into the usage order, like a choice of it
+    operator_factory = OperatorFactory(random_generator=RandomGenerator(3))
+    random_generator = RandomGenerator(3)
+    for _ in range(100):
+        operators = operator_factory.operators_weighted(excludes=[Operator.DIV])
+        expected = random_generator.choice(operators)
+        operator = operator_factory.next_weighted_operator(excludes=[Operator.DIV])
+        assert operator is expected
+        operator_factory.fly_back(operator)
+
+
+def test_excludes():
+    operator_factory = OperatorFactory(random_generator=RandomGenerator(5))
+    excludes = [Operator.SUB, Operator.DIV]
+    assert operator_factory.operators_weighted(excludes) == [Operator.ADD, Operator.MUL]
+    for _ in range(50):
+        assert operator_factory.next_weighted_operator(excludes) not in excludes
+    assert list(operator_factory.iter_weighted_operators(excludes)) == [
+        Operator.ADD,
+        Operator.MUL,
+        Operator.ADD,
+        Operator.MUL,
+    ]
+    with pytest.raises(ValueError):
+        operator_factory.next_weighted_operator(operator_factory.operators())
+
+
+def test_balanced():
+    operator_factory = OperatorFactory(
+        random_generator=RandomGenerator(7), policy=OperatorPolicy.BALANCED
+    )
+    operator_factory.fly_back(Operator.ADD)
+    operator_factory.fly_back(Operator.ADD)
+    operator_factory.fly_back(Operator.MUL)
+    assert operator_factory.get_weight(Operator.ADD) == 1
+    assert operator_factory.get_weight(Operator.SUB) == 3
+    assert operator_factory.get_weight(Operator.MUL) == 2
+    counts = Counter()
+    for _ in range(2000):
+        operator = operator_factory.next_weighted_operator()
+        operator_factory.fly_back(operator)
+        counts[operator] += 1
+    # a uniform draw spreads by dozens
+    assert max(counts.values()) - min(counts.values()) <= 10
+
+
+def test_fixed():
+    weights = {Operator.ADD: 6, Operator.SUB: 2, Operator.MUL: 1, Operator.DIV: 1}
+    operator_factory = OperatorFactory(
+        random_generator=RandomGenerator(9),
+        policy=OperatorPolicy.FIXED,
+        weights=weights,
+    )
+    counts = Counter(operator_factory.next_weighted_operator() for _ in range(5000))
+    assert counts[Operator.ADD] / 5000 == pytest.approx(0.6, abs=0.03)
+    assert counts[Operator.SUB] / 5000 == pytest.approx(0.2, abs=0.03)
+    with pytest.raises(ValueError):
+        OperatorFactory(policy=OperatorPolicy.FIXED, weights={Operator.ADD: 1})
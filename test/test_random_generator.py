@@ -0,0 +1,63 @@
+import pytest
+
+from random_generator import (
+    RandomGenerator,
+    RecordingRandomGenerator,
+    ReplayRandomGenerator,
+    RandomReplayException,
+)
+
+
+def test_seeded_stream():
+    first = RandomGenerator(1)
+    second = RandomGenerator(1)
+    assert [first.next_int(100) for _ in range(20)] == [
+        second.next_int(100) for _ in range(20)
+    ]
+
+
+def test_shuffle_and_choice():
+    random_generator = RandomGenerator(1)
+    values = list(range(10))
+    random_generator.shuffle(values)
+    assert sorted(values) == list(range(10))
+    assert random_generator.choice(["a", "b"]) in ["a", "b"]
+    with pytest.raises(IndexError):
+        random_generator.choice([])
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "decisions.bin")
+    recording = RecordingRandomGenerator(RandomGenerator(3))
+    recorded = [recording.next_int(maximum) for maximum in (1, 200, 70000, 0, 5)]
+    recording.save(path)
+    replay = ReplayRandomGenerator.load(path)
+    assert [replay.next_int(maximum) for maximum in (1, 200, 70000, 0, 5)] == recorded
+    assert replay.is_exhausted()
+    with pytest.raises(RandomReplayException):
+        replay.next_int(10)
+
+
+def test_replay_divergence():
+    replay = ReplayRandomGenerator([5])
+    with pytest.raises(RandomReplayException):
+        replay.next_int(4)
+
+
+def test_numpy_seeded_stream():
+    random_generator_numpy = pytest.importorskip("random_generator_numpy")
+    first = random_generator_numpy.NumpyRandomGenerator(
+        1, block_size=8, initial_block_size=2
+    )
+    second = random_generator_numpy.NumpyRandomGenerator(
+        1, block_size=8, initial_block_size=2
+    )
+    maximums = [maximum % 7 for maximum in range(500)]
+    values = [first.next_int(maximum) for maximum in maximums]
+    assert values == [second.next_int(maximum) for maximum in maximums]
+    assert all(0 <= value <= maximum for value, maximum in zip(values, maximums))
+    sixes = {value for value, maximum in zip(values, maximums) if maximum == 6}
+    assert sixes == set(range(7))
+    assert all(type(value) is int for value in values)
+    with pytest.raises(ValueError):
+        first.next_int(-1)
@@ -0,0 +1,190 @@
+import asyncio
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from expression_map_io import load_jsonl
+from server import BoardParameters, BoardPool, BoardServer
+
+
+def parameters(**overrides) -> BoardParameters:
+    values = dict(
+        width=10,
+        height=10,
+        number_factory_min=-20.0,
+        number_factory_max=20.0,
+        number_factory_step=0.1,
+        number_factory_fixed_point=False,
+        validator_min=-100,
+        validator_max=100,
+    )
+    values.update(overrides)
+    return BoardParameters(**values)
+
+
+async def fetch(port: int, target: str, method: str = "GET") -> tuple[int, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b"\r\n\r\n", 1)
+    return int(head.split(b" ", 2)[1]), body
+
+
+async def serve(check, **kwargs):
+    kwargs.setdefault("jobs", 1)
+    board_server = BoardServer(parameters(), seed=1, **kwargs)
+    try:
+        server = await board_server.start(port=0)
+        await check(board_server, server.sockets[0].getsockname()[1])
+    finally:
+        board_server.close()
+
+
+def test_board():
+    async def check(board_server: BoardServer, port: int):
+        status, body = await fetch(port, "/board")
+        assert status == 200
+        exp_map = load_jsonl(io.StringIO(body.decode()))
+        assert (exp_map.width(), exp_map.height()) == (10, 10)
+        assert exp_map.get_items()
+
+        status, body = await fetch(port, "/board?width=8&fixed_point=1")
+        assert status == 200
+        assert json.loads(body.decode().splitlines()[0]) == {
+            "width": 8,
+            "height": 10,
+            "decimals": 1,
+        }
+        exp_map = load_jsonl(io.StringIO(body.decode()), scale=10)
+        for item in exp_map.get_items():
+            # -20.0 to 20.0 in tenths
+            numbers = item.expression().values()[::2]
+            assert all(type(number) is int for number in numbers)
+            assert all(-200 <= number <= 200 for number in numbers[:2])
+
+        # the pools are refilled in the background
+        for _ in range(200):
+            pools = board_server.snapshot()["pools"]
+            if all(pool["depth"] == pool["capacity"] for pool in pools):
+                break
+            await asyncio.sleep(0.05)
+        status, body = await fetch(port, "/metrics")
+        assert status == 200
+        pools = json.loads(body)["pools"]
+        assert [pool["parameters"]["width"] for pool in pools] == [10, 8]
+        for pool in pools:
+            assert pool["depth"] == 2
+            assert pool["refill"]["count"] == 3
+            assert pool["refill"]["mean_sec"] > 0
+            assert pool["counters"]["pool.served"] == 1
+
+    asyncio.run(serve(check, capacity=2))
+
+
+@pytest.mark.parametrize(
+    "method, target, expected",
+    [
+        ("GET", "/nothing", 404),
+        ("POST", "/board", 405),
+        ("GET", "/board?width=0", 400),
+        ("GET", "/board?min=5&max=1", 400),
+        ("GET", "/board?fixed_point=yes", 400),
+        ("GET", "/board?colour=red", 400),
+        ("GET", "/board?step=nan", 400),
+        ("GET", "/board?max=inf", 400),
+        ("GET", "/board?validator_min=-nan", 400),
+        ("GET", "/board?step=0.00001", 400),
+        ("GET", "/board?min=-1000&max=1000&step=0.0001", 400),
+        ("GET", "/board?height=9", 503),
+    ],
+)
+def test_errors(method: str, target: str, expected: int):
+    async def check(board_server: BoardServer, port: int):
+        status, body = await fetch(port, target, method)
+        assert status == expected
+        assert "error" in json.loads(body)
+
+    # the pool of the default parameters is the only one
+    asyncio.run(serve(check, capacity=1, max_pools=1))
+
+
+def test_pool_eviction():
+    async def check(board_server: BoardServer, port: int):
+        for width in (8, 9, 8, 7):
+            status, _ = await fetch(port, f"/board?width={width}")
+            assert status == 200
+        # the least recently used pool is dropped, the default one is kept
+        pools = board_server.snapshot()["pools"]
+        assert [pool["parameters"]["width"] for pool in pools] == [10, 8, 7]
+
+    asyncio.run(serve(check, capacity=1, max_pools=3))
+
+
+def test_job_limit():
+    async def check(board_server: BoardServer, port: int):
+        # the default pool and this one have a generation each
+        evicted = board_server.get_pool(parameters(width=8))
+        assert evicted.snapshot()["pending"] == 1
+        for width in (9, 7):
+            board_server.get_pool(parameters(width=width))
+            assert board_server.snapshot()["jobs"] == {"running": 2, "max": 2}
+        # the generation of the dropped pool is cancelled
+        await asyncio.sleep(0)
+        assert evicted.snapshot()["pending"] == 0
+        pools = board_server.snapshot()["pools"]
+        assert [pool["parameters"]["width"] for pool in pools] == [10, 7]
+        assert board_server.snapshot()["jobs"]["running"] <= 2
+
+    asyncio.run(serve(check, capacity=1, jobs=2, max_pools=2))
+
+
+def test_wait_timeout():
+    async def check(board_server: BoardServer, port: int):
+        pool = board_server.get_pool(parameters())
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.get(timeout=0)
+        # the board of the timed out request is not lost
+        assert await pool.get(timeout=30) is not None
+
+    asyncio.run(serve(check, capacity=1))
+
+
+def test_failing_generation(monkeypatch):
+    monkeypatch.setattr(BoardPool, "RETRY_DELAY_SEC", 0.01)
+    monkeypatch.setattr(BoardPool, "MAX_FAILURES", 2)
+
+    async def check(board_server: BoardServer, port: int):
+        # no number of the step between minimum and maximum
+        target = "/board?min=0.05&max=0.06"
+        status, body = await fetch(port, target)
+        assert status == 503
+        assert "failing" in json.loads(body)["error"]
+        pool = board_server.snapshot()["pools"][-1]
+        assert pool["broken"]
+        assert pool["pending"] == 0
+        assert pool["counters"]["pool.refill_failures"] == 2
+        # the broken pool does not generate until BROKEN_SEC has passed
+        status, _ = await fetch(port, target)
+        assert status == 503
+        assert board_server.snapshot()["pools"][-1]["pending"] == 0
+
+    asyncio.run(serve(check, capacity=1))
+
+
+def test_broken_executor():
+    executor = ProcessPoolExecutor(max_workers=1)
+
+    async def check(board_server: BoardServer, port: int):
+        executor.shutdown(cancel_futures=True)
+        status, body = await fetch(port, "/board?width=8")
+        assert status == 500
+        assert "error" in json.loads(body)
+        pool = board_server.snapshot()["pools"][-1]
+        assert pool["pending"] == 0
+        assert pool["waiting"] == 0
+
+    asyncio.run(serve(check, capacity=1, executor=executor))
@@ -0,0 +1,67 @@
+import pytest
+
+from expression import Expression, ExpressionValidator
+from number_factory import NumberFactory
+from operator_factory import Operator, OperatorFactory
+from resolver.expression_resolver import ExpressionResolver
+from resolver.resolver_exceptions import ExpressionResolverNotResolvable
+from resolver.resolver_solution_index import ExpressionSolutionIndex
+
+
+def create_expression(values: list) -> Expression:
+    return Expression.from_list(values)
+
+
+@pytest.mark.parametrize("fixed_point", [False, True])
+def test_every_solution_is_valid(fixed_point: bool):
+    number_factory = NumberFactory(
+        minimum=-2.0, maximum=2.0, step=0.2, fixed_point=fixed_point
+    )
+    validator = ExpressionValidator(
+        minimum=-10, maximum=10, scale=number_factory.get_scale()
+    )
+    solution_index = ExpressionSolutionIndex(number_factory, validator)
+    assert len(solution_index) > 0
+    for solution in solution_index.get_solutions((None, None, None, None)):
+        assert validator.validate(solution_index.to_expression(solution))
+
+
+def test_solutions_by_pattern():
+    number_factory = NumberFactory(minimum=1.0, maximum=10.0)
+    solution_index = ExpressionSolutionIndex(number_factory, ExpressionValidator())
+    assert sorted(solution_index.get_solutions((None, Operator.MUL, None, 12))) == [
+        (2, Operator.MUL, 6, 12),
+        (3, Operator.MUL, 4, 12),
+        (4, Operator.MUL, 3, 12),
+        (6, Operator.MUL, 2, 12),
+    ]
+    assert solution_index.get_solutions((6, None, 3, 2)) == [
+        (6, Operator.DIV, 3, 2)
+    ]
+    assert solution_index.get_solutions((None, None, None, 97)) == []
+    assert solution_index.to_pattern(create_expression([7.0, None, None, None, 2.5])) is None
+    assert solution_index.to_pattern(create_expression([7.0, None, None, None, 2.0])) == (
+        7,
+        None,
+        None,
+        2,
+    )
+
+
+def test_resolver_with_solution_index():
+    number_factory = NumberFactory(minimum=1.0, maximum=10.0)
+    operator_factory = OperatorFactory()
+    validator = ExpressionValidator()
+    resolver = ExpressionResolver(
+        validator=validator,
+        number_factory=number_factory,
+        operator_factory=operator_factory,
+        solution_index=ExpressionSolutionIndex(number_factory, validator),
+    )
+    for _ in range(20):
+        expression = resolver.resolve(create_expression([None, None, 3.0, None, 12.0]))
+        assert expression.operand2 == 3.0
+        assert expression.result == 12.0
+        assert validator.validate(expression)
+    with pytest.raises(ExpressionResolverNotResolvable):
+        resolver.resolve(create_expression([None, Operator.MUL, None, None, 97.0]))